@@ -22,6 +22,8 @@ CORS_ALLOWED_ORIGINS = [
 ] + [
     f"https://{host}" for host in ALLOWED_HOSTS
 ]
+# Hosts served on top of the above, e.g. 127.0.0.1 when load testing a production configuration
+ALLOWED_HOSTS += [host for host in os.getenv('EXTRA_ALLOWED_HOSTS', '').split(',') if host]
 
 # Application definition
 INSTALLED_APPS = [
@@ -44,12 +46,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'content.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'content.middleware.ConditionalContentMiddleware',
+    'content.middleware.ResponseCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -59,7 +64,7 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -96,11 +101,82 @@ TEMPLATES = [
     },
 ]
 
+# Cache
+# Version stamps, the menu and cached API responses live in the 'content' cache. It has to be
+# shared by all workers in production: CONTENT_CACHE_BACKEND=file (one host) or redis (needs
+# the redis package from requirements.txt, LOCATION a redis:// URL).
+CONTENT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'citrus-content',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CONTENT_CACHE_LOCATION', '/var/tmp/citrus-content-cache'),
+    },
+    'redis': {
+        'BACKEND': 'content.cache_backends.RedisCompatibleCache',
+        'LOCATION': os.getenv('CONTENT_CACHE_LOCATION', 'redis://localhost:6379/1'),
+    },
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'citrus-default',
+    },
+    'content': CONTENT_CACHE_BACKENDS[os.getenv('CONTENT_CACHE_BACKEND', 'locmem')],
+}
+CONTENT_CACHE_ALIAS = 'content'
+CONTENT_RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+CONTENT_RESPONSE_CACHE_LOCK_TIMEOUT = 10
+# Read paths, the first one enabled for a route answers it: detail routes and category products
+# come from the catalog snapshot, list routes from stored documents, and either falls back to the
+# fast path, then to the serializers. The menu has its own cache, see content/menu.py.
+# Render the public read routes from .values() rows instead of serializer instances, see content/fastpath.py
+CONTENT_FAST_READ_PATH = True
+# Keep pre-rendered JSON of every list entry in the Document table and serve it, see content/documents.py
+CONTENT_DOCUMENTS = True
+# Answer detail routes and category products from an in-process snapshot, see content/catalog.py
+CONTENT_CATALOG = True
+CONTENT_GZIP_LEVEL = 6
+CONTENT_BROTLI_QUALITY = 5
+CONTENT_COMPRESS_MIN_SIZE = 200
+# Opt-in: with it, the first request after an edit is answered with the previous body
+CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE = os.getenv('CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE', 'false') == 'true'
+MENU_CACHE_TIMEOUT = None
+CONTENT_ETAG_SALT = os.getenv('CONTENT_ETAG_SALT', '')
+
+# On-demand revalidation of the frontend, see content/revalidation.py. Disabled without a URL.
+FRONTEND_REVALIDATE_URL = os.getenv('FRONTEND_REVALIDATE_URL', '')
+FRONTEND_REVALIDATE_SECRET = os.getenv('REVALIDATE_SECRET', '')
+FRONTEND_REVALIDATE_DEBOUNCE = 2.0
+FRONTEND_REVALIDATE_MAX_WAIT = 10.0
+FRONTEND_REVALIDATE_BATCH_SIZE = 50
+FRONTEND_REVALIDATE_RETRIES = 3
+# Render the API routes of the paths into the response cache before the call; Accept as Next's fetch sends it
+FRONTEND_REVALIDATE_WARM = True
+FRONTEND_REVALIDATE_FETCH_ACCEPT = '*/*'
+
+# POST /api/batch/, see content/batch.py
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# Proxy cache purging by surrogate key, see content/surrogate.py
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+CONTENT_PURGER = {'BACKEND': 'content.surrogate.NullPurger'}
+if os.getenv('CONTENT_PURGE_URL'):
+    CONTENT_PURGER = {
+        'BACKEND': 'content.surrogate.HTTPPurger',
+        'OPTIONS': {'url': os.getenv('CONTENT_PURGE_URL')},
+    }
+
 # Static and media files
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+# manage.py export_static_api writes here, see nginx.conf-sample
+STATIC_API_ROOT = os.getenv('STATIC_API_ROOT', os.path.join(BASE_DIR, 'api_snapshot'))
 
 # REST FRAMEWORK and CORS
 CORS_ALLOW_ALL_ORIGINS = False
@@ -11,7 +11,13 @@ from content.views import (
     ImageViewSet, 
     HomePageViewSet, 
     MenuItemViewSet, 
-    SocialViewSet
+    SocialViewSet,
+    SearchView,
+    SuggestView,
+    BundleView,
+    BatchView,
+    TranslationsView,
+    ObjectTranslationsView
 )
 from content.admin import my_admin_site
 
@@ -44,6 +50,14 @@ urlpatterns = [
     
     path('api/social/', SocialViewSet.as_view({'get': 'retrieve'}), name='social-detail'),
 
+    path('api/batch/', BatchView.as_view(), name='batch'),
+    path('api/translations/', TranslationsView.as_view(), name='translations'),
+    path('api/<str:lang>/translations/<str:kind>/<str:slug>/', ObjectTranslationsView.as_view(), name='object-translations'),
+    path('api/search/', SearchView.as_view(), name='search'),
+    path('api/<str:lang>/search/', SearchView.as_view(), name='search-lang'),
+    path('api/<str:lang>/suggest/', SuggestView.as_view(), name='suggest'),
+    path('api/<str:lang>/bundle/', BundleView.as_view(), name='bundle'),
+
 ]
 
 if settings.DEBUG:
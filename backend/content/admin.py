@@ -13,6 +13,7 @@ from .forms import PageAdminForm, ProductAdminForm
 from .widgets import ImageThumbnailSelectWidget, ImageThumbnailWidget
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.db.models.signals import post_save
 
 # Define a custom order for apps and models
 APP_ORDER = {
@@ -48,6 +49,15 @@ my_admin_site = CustomAdminSite(name='my_admin')
 my_admin_site.register(User, UserAdmin)
 my_admin_site.register(Group, GroupAdmin)
 
+class SortableSignalsMixin(SortableAdminMixin):
+    # adminsortable2 saves drag-and-drop reordering with bulk_update, which skips post_save
+    def _update_order(self, updated_items, extra_model_filters):
+        num_updated = super()._update_order(updated_items, extra_model_filters)
+        pks = [item[0] for item in updated_items]
+        for instance in self.model.objects.filter(pk__in=pks):
+            post_save.send(self.model, instance=instance, created=False, update_fields=[self.default_order_field], raw=False, using=instance._state.db)
+        return num_updated
+
 class BaseImageInline(admin.TabularInline):
     extra = 1
     verbose_name = 'Image'
@@ -76,7 +86,7 @@ class ImageAdmin(admin.ModelAdmin):
     image_display.short_description = 'Image Preview'
 
 
-class ProductAdmin(SortableAdminMixin, admin.ModelAdmin):
+class ProductAdmin(SortableSignalsMixin, admin.ModelAdmin):
     form = ProductAdminForm
     inlines = [ImageInlineProduct]
     readonly_fields = ('image_display',)
@@ -104,7 +114,7 @@ class CategoryAdminForm(forms.ModelForm):
         model = Category
         fields = '__all__'
 
-class CategoryAdmin(SortableAdminMixin, admin.ModelAdmin):
+class CategoryAdmin(SortableSignalsMixin, admin.ModelAdmin):
     form = CategoryAdminForm
     readonly_fields = ('image_display',)
 
@@ -120,7 +130,7 @@ class CategoryAdmin(SortableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'lang', 'image_display', 'order')
     list_filter = ('lang',)
 
-class PageAdmin(SortableAdminMixin, admin.ModelAdmin):
+class PageAdmin(SortableSignalsMixin, admin.ModelAdmin):
     form = PageAdminForm
     inlines = [ImageInlinePage]
     readonly_fields = ('image_display',)
@@ -159,7 +169,7 @@ class MenuItemForm(forms.ModelForm):
         if self.instance.link and self.instance.link.startswith('/api/'):
             self.initial['link'] = self.instance.link[4:]
 
-class MenuItemAdmin(SortableAdminMixin, admin.ModelAdmin):
+class MenuItemAdmin(SortableSignalsMixin, admin.ModelAdmin):
     form = MenuItemForm
     list_display = ('title', 'lang', 'link', 'parent', 'page', 'order')
     fields = ('lang', 'title', 'order', 'parent', 'link', 'page')
@@ -0,0 +1,75 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit, unquote_to_bytes
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+
+# Runs GET sub-requests in-process through the full middleware stack and URL resolver, so auth,
+# throttling, the response cache and ETags behave as for a request that came over the wire.
+
+BATCH_MAX_REQUESTS = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+BATCH_MAX_WORKERS = getattr(settings, 'BATCH_MAX_WORKERS', 4)
+RETURNED_HEADERS = ('ETag', 'Last-Modified', 'X-Cache')
+# Conditional headers of the batch call itself don't apply to its parts, and parts are read uncompressed
+DROPPED_META = (
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_ACCEPT_ENCODING',
+    'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_MATCH', 'HTTP_IF_UNMODIFIED_SINCE',
+)
+
+class SubRequestHandler(BaseHandler):
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+
+_handler = None
+_handler_lock = threading.Lock()
+
+def get_handler():
+    global _handler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                _handler = SubRequestHandler()
+    return _handler
+
+def build_request(path, meta, accept='application/json'):
+    """A GET request for path with the given WSGI environ (cookies, auth and client headers)."""
+    url = urlsplit(path)
+    environ = {key: value for key, value in meta.items() if key not in DROPPED_META}
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': unquote_to_bytes(url.path).decode('iso-8859-1'),
+        'QUERY_STRING': url.query,
+        'HTTP_ACCEPT': accept,
+        'wsgi.input': BytesIO(b''),
+    })
+    return WSGIRequest(environ)
+
+def render(path, meta, accept='application/json'):
+    return get_handler().get_response(build_request(path, meta, accept))
+
+def run_one(request, path):
+    if not isinstance(path, str) or not path.startswith('/') or urlsplit(path).path == request.path:
+        return {'path': path, 'status': 400, 'body': {'detail': 'Expected an absolute path of a GET route.'}}
+    response = render(path, request.META)
+    body = None
+    if response.get('Content-Type', '').startswith('application/json') and response.content:
+        body = json.loads(response.content)
+    headers = {name: response[name] for name in RETURNED_HEADERS if response.has_header(name)}
+    return {'path': path, 'status': response.status_code, 'headers': headers, 'body': body}
+
+def run_in_thread(request, path):
+    try:
+        return run_one(request, path)
+    finally:
+        connections.close_all()
+
+def run_batch(request, paths, parallel=False):
+    if not parallel or len(paths) < 2:
+        return [run_one(request, path) for path in paths]
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(paths))) as pool:
+        return list(pool.map(lambda path: run_in_thread(request, path), paths))
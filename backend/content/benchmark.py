@@ -0,0 +1,168 @@
+import json
+import re
+import subprocess
+import time
+import tracemalloc
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from .cache import content_cache
+from .models import Category, Product, Page, Image, HomePage, MenuItem, Social
+from . import versioning
+
+# Times every API route of config/urls.py against the current database. Each route is requested
+# `repeat` times as a miss (content cache emptied first, version stamps re-seeded, so the view
+# renders) and as a hit of the response cache; one more miss is run to count its SQL queries and
+# one under tracemalloc for its peak allocation. Path parameters are filled with objects from
+# the middle of the catalog.
+
+PARAMETER_RE = re.compile(r'<(?:\w+:)?(?P<name>\w+)>|\(\?P<(?P<group>\w+)>(?:\[[^\]]*\]|[^)])*\)')
+PERCENTILES = (50, 90, 95, 99)
+# Query strings of routes that need one to do any work
+QUERIES = {'search': 'q={word}', 'suggest': 'q={prefix}'}
+# Routes worth timing in another shape as well
+VARIANTS = ('/api/{lang}/products/?page_size=20', '/api/{lang}/products/?search={word}', '/api/{lang}/pages/?page_size=20')
+BATCH_PATHS = 5
+
+def api_routes(patterns=None, prefix=''):
+    """(route, name) of every URL pattern under api/, without the .json style suffix variants."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            if not pattern.namespace:
+                yield from api_routes(pattern.url_patterns, route)
+        elif route.startswith('api/') and 'format' not in pattern.pattern.regex.groupindex:
+            yield route, pattern.name
+
+def middle(queryset):
+    count = queryset.count()
+    return queryset.order_by('pk')[count // 2] if count else None
+
+def sample_values(lang='en'):
+    """Path parameter values, by (preceding path segment, name) or by name alone."""
+    product = middle(Product.objects.filter(lang=lang))
+    page = middle(Page.objects.filter(lang=lang))
+    category = middle(Category.objects.filter(lang=lang))
+    values = {'lang': lang, 'kind': 'product'}
+    if product:
+        values.update({('product', 'slug'): product.slug, ('products', 'slug'): product.slug, ('products', 'pk'): product.pk, ('translations', 'slug'): product.slug})
+        values['word'] = product.title.split()[0].lower()
+        values['prefix'] = values['word'][:3]
+    if page:
+        values.update({('page', 'slug'): page.slug, ('pages', 'slug'): page.slug, ('pages', 'pk'): page.pk})
+    if category:
+        values.update({('category', 'slug'): category.slug, ('categories', 'pk'): category.pk})
+    for segment, model in (('homepage', HomePage), ('menuitems', MenuItem), ('images', Image), ('social', Social)):
+        obj = middle(model.objects.all())
+        if obj:
+            values[segment, 'pk'] = obj.pk
+    return values
+
+def concrete_path(route, values):
+    """The path of a route with its parameters filled in, or None when there is no value for one."""
+    route, missing = route.replace('^', '').replace('$', ''), []
+
+    def fill(match):
+        name = match.group('name') or match.group('group')
+        literals = [segment for segment in PARAMETER_RE.sub('', route[:match.start()]).split('/') if segment]
+        previous = literals[-1] if literals else None
+        value = values.get((previous, name), values.get(name))
+        if value is None:
+            missing.append(name)
+        return str(value)
+
+    path = '/' + PARAMETER_RE.sub(fill, route)
+    if missing:
+        return None
+    query = QUERIES.get(path.rstrip('/').rsplit('/', 1)[-1])
+    return f'{path}?{query.format(**values)}' if query and 'word' in values else path
+
+def benchmark_cases(values):
+    """(name, method, path, body) of every route to time."""
+    cases, seen, posts = [], set(), []
+    for route, name in api_routes():
+        path = concrete_path(route, values)
+        if path is None or path in seen:
+            continue
+        seen.add(path)
+        if name == 'batch':
+            posts.append((name, path))
+        else:
+            cases.append((name, 'GET', path, None))
+    if 'word' in values:
+        cases += [('variant', 'GET', variant.format(**values), None) for variant in VARIANTS]
+    # The batch route bundles the first few GET routes
+    for name, path in posts:
+        cases.append((name, 'POST', path, {'paths': [case[2] for case in cases[:BATCH_PATHS]]}))
+    return cases
+
+def percentiles(timings):
+    ordered = sorted(timings)
+    summary = {f'p{p}': round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 3) for p in PERCENTILES}
+    summary.update(min=round(ordered[0] * 1000, 3), max=round(ordered[-1] * 1000, 3), mean=round(sum(ordered) / len(ordered) * 1000, 3))
+    return summary
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def reset_content_cache():
+    content_cache().clear()
+    for lang in [None] + versioning.languages():
+        versioning.get_version(lang)
+
+class RouteBenchmark:
+    def __init__(self, repeat=10):
+        self.repeat = max(1, repeat)
+        self.client = Client(HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+
+    def request(self, method, path, body):
+        if method == 'POST':
+            return self.client.post(path, json.dumps(body), content_type='application/json')
+        return self.client.get(path)
+
+    def timed(self, method, path, body, miss):
+        if miss:
+            reset_content_cache()
+        started = time.perf_counter()
+        self.request(method, path, body)
+        return time.perf_counter() - started
+
+    def run(self, method, path, body):
+        # Warm up: snapshots, tries and connections are built by the first request after a change
+        response = self.request(method, path, body)
+        result = {'status': response.status_code, 'bytes': len(response.content)}
+        reset_content_cache()
+        with CaptureQueriesContext(connection) as context:
+            self.request(method, path, body)
+        result['queries'] = len(context.captured_queries)
+        reset_content_cache()
+        tracemalloc.start()
+        try:
+            self.request(method, path, body)
+            result['peak_memory_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+        result['miss_ms'] = percentiles([self.timed(method, path, body, miss=True) for _ in range(self.repeat)])
+        if method == 'GET':
+            self.request(method, path, body)
+            result['hit_ms'] = percentiles([self.timed(method, path, body, miss=False) for _ in range(self.repeat)])
+        return result
+
+def compare(previous, current):
+    """Lines of p50/p95 miss latency and query count changes between two result files, per catalog size and path."""
+    def index(results):
+        return {(size['products'], route['path']): route for size in results['catalogs'] for route in size['routes']}
+    before, lines = index(previous), []
+    for key, route in index(current).items():
+        old = before.get(key)
+        if old is None or 'miss_ms' not in old or 'miss_ms' not in route:
+            continue
+        p50, p95 = (route['miss_ms'][p] / old['miss_ms'][p] - 1 if old['miss_ms'][p] else 0 for p in ('p50', 'p95'))
+        queries = route['queries'] - old['queries']
+        lines.append(f'{key[0]:>7} {key[1]:<60} p50 {p50:+7.1%}  p95 {p95:+7.1%}  queries {queries:+d}')
+    return lines
@@ -0,0 +1,53 @@
+import time
+from itertools import islice
+from .documents import documents_enabled, rebuild_documents
+from .menu import invalidate_menu
+from .search import rebuild_index
+from .translations import rebuild_translations
+from .versioning import bump_version
+
+# Loading content in bulk. bulk_create and through-table inserts skip the model signals, so
+# nothing derived from the content (search index, translation links, documents, the cached menu
+# and responses) follows along: load everything, then call rebuild_derived() once.
+
+CHUNK_SIZE = 1000
+
+def chunks(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def insert(model, objects, batch_size=CHUNK_SIZE):
+    """bulk_create an iterable of unsaved instances chunk by chunk. Returns the number inserted."""
+    count = 0
+    for chunk in chunks(objects, batch_size):
+        model.objects.bulk_create(chunk, batch_size=batch_size)
+        count += len(chunk)
+    return count
+
+def link(model, field_name, pairs, batch_size=CHUNK_SIZE):
+    """Insert (pk, related pk) rows into the through table of a many-to-many field of model."""
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+    count = 0
+    for chunk in chunks(pairs, batch_size):
+        through.objects.bulk_create([through(**{source: pk, target: related}) for pk, related in chunk], batch_size=batch_size, ignore_conflicts=True)
+        count += len(chunk)
+    return count
+
+def rebuild_derived(log=None):
+    """Rebuild everything the content signals keep up to date, then move every version stamp."""
+    steps = [('search index', rebuild_index), ('translation links', rebuild_translations)]
+    if documents_enabled():
+        steps.append(('documents', rebuild_documents))
+    for name, rebuild in steps:
+        started = time.monotonic()
+        rebuild()
+        if log:
+            log(f'Rebuilt {name} in {time.monotonic() - started:.1f}s')
+    invalidate_menu()
+    bump_version()
@@ -0,0 +1,42 @@
+from .fastpath import fast_path_enabled, category_details, homepages
+from .menu import get_menu_tree
+from .models import Category, HomePage, Social
+from .planner import plan_queryset
+from .serializers import CategorySerializer, HomePageSerializer, SocialSerializer
+from .surrogate import collection_key
+
+# The site chrome a page render needs, in one response. Every part has the same shape as its own
+# route (/api/menuitems/?lang=, /api/<lang>/categories/, /api/social/, /api/<lang>/homepage/)
+# and a fixed number of queries, whatever the size of the catalog.
+
+def menu_part(lang, context):
+    context['surrogate_keys'].add(collection_key('menu', lang))
+    return get_menu_tree(lang)
+
+def categories_part(lang, context):
+    context['surrogate_keys'].add(collection_key('categories', lang))
+    if fast_path_enabled():
+        return category_details(Category.objects.filter(lang=lang), context['surrogate_keys'])
+    queryset = plan_queryset(Category.objects.filter(lang=lang), CategorySerializer)
+    return CategorySerializer(queryset, many=True, context=context).data
+
+def social_part(lang, context):
+    context['surrogate_keys'].add(collection_key('social'))
+    return SocialSerializer(Social.objects.all(), many=True, context=context).data
+
+def homepage_part(lang, context):
+    context['surrogate_keys'].add(collection_key('homepages', lang))
+    if fast_path_enabled():
+        return homepages(HomePage.objects.filter(lang=lang), context['surrogate_keys'])
+    queryset = plan_queryset(HomePage.objects.filter(lang=lang), HomePageSerializer)
+    return HomePageSerializer(queryset, many=True, context=context).data
+
+BUNDLE_PARTS = {
+    'menu': menu_part,
+    'categories': categories_part,
+    'social': social_part,
+    'homepage': homepage_part,
+}
+
+def build_bundle(lang, parts, context):
+    return {name: BUNDLE_PARTS[name](lang, context) for name in parts}
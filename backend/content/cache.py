@@ -0,0 +1,6 @@
+from django.conf import settings
+from django.core.cache import caches
+
+def content_cache():
+    """The cache shared by all workers for version stamps, the menu and cached responses."""
+    return caches[getattr(settings, 'CONTENT_CACHE_ALIAS', 'default')]
@@ -0,0 +1,77 @@
+import pickle
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+def redis_client(url):
+    try:
+        from redis import Redis
+    except ImportError:
+        raise ImproperlyConfigured('CONTENT_CACHE_BACKEND=redis needs the redis package, see requirements.txt')
+    return Redis.from_url(url)
+
+class RedisCompatibleCache(BaseCache):
+    """
+    Cache backend for any client speaking the redis-py command subset used here
+    (get, set with nx/px, mget, delete, exists, pexpire, persist, flushdb).
+    OPTIONS['CLIENT_FACTORY'] is a dotted path to a callable taking LOCATION; it defaults to
+    redis.Redis.from_url, and tests point it at an in-process stand-in.
+    """
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._server = server
+        factory = params.get('OPTIONS', {}).get('CLIENT_FACTORY')
+        self._factory = import_string(factory) if factory else redis_client
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._factory(self._server)
+        return self._client
+
+    def _expiry(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else int(timeout * 1000)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expiry = self._expiry(timeout)
+        if expiry is not None and expiry <= 0:
+            return False
+        return bool(self.client.set(key, pickle.dumps(value), nx=True, px=expiry))
+
+    def get(self, key, default=None, version=None):
+        value = self.client.get(self.make_and_validate_key(key, version=version))
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expiry = self._expiry(timeout)
+        if expiry is not None and expiry <= 0:
+            self.client.delete(key)
+        else:
+            self.client.set(key, pickle.dumps(value), px=expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self.client.persist(key))
+        return bool(self.client.pexpire(key, expiry))
+
+    def delete(self, key, version=None):
+        return bool(self.client.delete(self.make_and_validate_key(key, version=version)))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self.make_and_validate_key(key, version=version) for key in keys]
+        return {key: pickle.loads(value) for key, value in zip(keys, self.client.mget(made)) if value is not None}
+
+    def has_key(self, key, version=None):
+        return bool(self.client.exists(self.make_and_validate_key(key, version=version)))
+
+    def clear(self):
+        self.client.flushdb()
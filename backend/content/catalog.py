@@ -0,0 +1,161 @@
+import threading
+from types import MappingProxyType
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from .fastpath import category_items, product_items, page_items
+from .models import Category, Product, Page
+from .serializers import sparse_fieldset_requested
+from .versioning import changes_since, get_version
+
+# In-process snapshot of the whole catalog: products, pages and categories of every language,
+# rendered as their detail routes show them (images embedded). Each worker builds it in one pass
+# (a handful of queries) and keeps it until the shared all-languages version stamp moves. It then
+# catches up from the change log kept with the stamps (see content/versioning.py), rendering
+# again only the records named by, or embedding an object named by, the changed surrogate keys,
+# and swaps the module reference, so readers always see one consistent snapshot and never wait
+# on the database. Snapshots are never modified once built; treat records and their data as
+# read-only.
+
+# Above this many records to render again, an update reads everything in one pass instead
+MAX_UPDATED_RECORDS = 500
+
+class Record:
+    __slots__ = ('kind', 'id', 'lang', 'slug', 'langslug', 'order', 'categories', 'data', 'keys')
+
+    def __init__(self, kind, row, data, keys, categories=()):
+        self.kind = kind
+        self.id = row['id']
+        self.lang = row['lang']
+        self.slug = row['slug']
+        self.langslug = row['langslug']
+        self.order = row['order']
+        self.categories = categories
+        self.data = data
+        self.keys = frozenset(keys)
+
+    def __repr__(self):
+        return f'<Record {self.kind}:{self.id} {self.lang}/{self.slug}>'
+
+class Catalog:
+    __slots__ = ('version', 'changes', 'by_slug', 'by_category', 'by_langslug')
+
+    def __init__(self, version, changes, records):
+        # changes: the position in the change log the snapshot is current with, None when unknown
+        self.version = version
+        self.changes = changes
+        by_slug, by_category, by_langslug = {}, {}, {}
+        for record in sorted(records, key=lambda record: (record.order, record.id)):
+            by_slug[record.kind, record.lang, record.slug] = record
+            if record.langslug:
+                by_langslug.setdefault((record.kind, record.langslug), []).append(record)
+            for slug in record.categories:
+                by_category.setdefault(slug, []).append(record)
+        self.by_slug = MappingProxyType(by_slug)
+        self.by_category = MappingProxyType({slug: tuple(products) for slug, products in by_category.items()})
+        self.by_langslug = MappingProxyType({key: tuple(matches) for key, matches in by_langslug.items()})
+
+    def records(self):
+        return self.by_slug.values()
+
+    def get(self, kind, slug, lang=None):
+        if lang is not None:
+            return self.by_slug.get((kind, lang, slug))
+        # Slugs are unique per model, whatever the language
+        for code, _ in settings.LANGUAGES:
+            record = self.by_slug.get((kind, code, slug))
+            if record is not None:
+                return record
+        return None
+
+    def category_products(self, slug):
+        """Products of the category with the given slug in product order, or None for an unknown category."""
+        if not any(self.by_slug.get(('category', code, slug)) for code, _ in settings.LANGUAGES):
+            return None
+        return self.by_category.get(slug, ())
+
+    def translations(self, kind, langslug):
+        return self.by_langslug.get((kind, langslug), ())
+
+def render_records(products, pages, categories):
+    records = []
+    for row, data, keys in product_items(products):
+        records.append(Record('product', row, data, keys, tuple(category['slug'] for category in data['categories'])))
+    for row, data, keys in page_items(pages):
+        records.append(Record('page', row, data, keys))
+    for row, data, keys in category_items(categories):
+        records.append(Record('category', row, data, keys))
+    return records
+
+def build_catalog(version, changes=None):
+    return Catalog(version, changes, render_records(Product.objects.all(), Page.objects.all(), Category.objects.all()))
+
+def update_catalog(catalog, version, changes, keys):
+    """A snapshot with the records of the objects named by the surrogate keys, and of those embedding them, read again."""
+    stale = {'product': set(), 'page': set(), 'category': set()}
+    for key in keys:
+        name, _, pk = key.partition(':')
+        if name in stale and pk.isdigit():
+            stale[name].add(int(pk))
+    keys, kept = frozenset(keys), []
+    for record in catalog.records():
+        if record.id in stale[record.kind] or not record.keys.isdisjoint(keys):
+            stale[record.kind].add(record.id)
+        else:
+            kept.append(record)
+    if sum(len(pks) for pks in stale.values()) > MAX_UPDATED_RECORDS:
+        return build_catalog(version, changes)
+    # Objects that are gone simply don't come back
+    return Catalog(version, changes, kept + render_records(
+        Product.objects.filter(pk__in=stale['product']), Page.objects.filter(pk__in=stale['page']), Category.objects.filter(pk__in=stale['category']),
+    ))
+
+def catalog_enabled():
+    return getattr(settings, 'CONTENT_CATALOG', True)
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """The current snapshot, brought up to date first when the content version has moved since it was built."""
+    global _catalog
+    # Read before building: an edit during the build moves the stamp again and triggers another.
+    # Changes are logged before the stamp moves, so the log read next covers this version.
+    version = get_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            if _catalog is None or _catalog.version != version:
+                keys, changes = changes_since(_catalog.changes if _catalog is not None else None)
+                _catalog = build_catalog(version, changes) if keys is None else update_catalog(_catalog, version, changes, keys)
+            catalog = _catalog
+    return catalog
+
+class CatalogReadMixin:
+    """View mixin answering by_slug and category product lists from the snapshot."""
+    catalog_kind = None
+
+    def use_catalog(self):
+        return catalog_enabled() and not sparse_fieldset_requested(self.request)
+
+    def catalog_response(self, records, many=True):
+        keys = getattr(self, 'surrogate_keys', None)
+        if keys is not None:
+            for record in records:
+                keys |= record.keys
+        return Response([record.data for record in records] if many else records[0].data)
+
+    def catalog_detail(self, slug):
+        """The response for slug, or None when the snapshot is not used for this request."""
+        if self.catalog_kind is None or not self.use_catalog():
+            return None
+        record = get_catalog().get(self.catalog_kind, slug, self.kwargs.get('lang'))
+        if record is None:
+            return Response({"detail": "Not found."}, status=404)
+        return self.catalog_response([record], many=False)
+
+    def catalog_category_products(self, slug):
+        records = get_catalog().category_products(slug)
+        if records is None:
+            raise NotFound()
+        return self.catalog_response(records)
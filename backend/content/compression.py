@@ -0,0 +1,72 @@
+import gzip
+import time
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content-Encoding negotiation for JSON API responses. Cached responses keep one compressed copy
+# per encoding next to the body, so they are compressed once per content version.
+
+def available_encodings():
+    # In order of preference
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'CONTENT_BROTLI_QUALITY', 5))
+    return gzip.compress(content, compresslevel=getattr(settings, 'CONTENT_GZIP_LEVEL', 6), mtime=0)
+
+def compressible(response):
+    return (
+        not response.streaming
+        and not response.has_header('Content-Encoding')
+        and response.get('Content-Type', '').startswith('application/json')
+        and len(response.content) >= getattr(settings, 'CONTENT_COMPRESS_MIN_SIZE', 200)
+    )
+
+def compress_all(content):
+    """Every available encoding of content, and the seconds spent compressing."""
+    started = time.perf_counter()
+    variants = {encoding: compress(content, encoding) for encoding in available_encodings()}
+    return variants, time.perf_counter() - started
+
+def negotiate(accept_encoding, encodings):
+    """The preferred encoding of encodings the Accept-Encoding header allows, or None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+def add_server_timing(response, seconds, description=None):
+    metric = 'compress;dur=%.3f' % (seconds * 1000)
+    if description:
+        metric += ';desc="%s"' % description
+    existing = response.get('Server-Timing')
+    response['Server-Timing'] = f'{existing}, {metric}' if existing else metric
+
+def apply_encoding(response, request, variants):
+    """Swap in the compressed copy the client accepts, if any."""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), [name for name in available_encodings() if name in variants])
+    if encoding is None:
+        return response
+    response.content = variants[encoding]
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(response.content))
+    return response
@@ -0,0 +1,125 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from .fastpath import category_items, product_card_items, page_card_items, homepage_items
+from .models import Category, Product, Page, HomePage, Document, DocumentKey
+
+# Materialized read model. Every product, page, category and homepage is stored pre-rendered
+# as the list routes show it (products and pages as their cards) in the Document table, with the
+# surrogate keys of everything it embeds in DocumentKey. An edit re-renders, inside its own
+# transaction, the documents of the edited object and every document carrying its key, so a
+# category rename or an image swap reaches all products showing them. List routes then send
+# stored bodies joined together, without building a model instance or a serializer. Detail
+# routes are answered by the catalog snapshot (content/catalog.py), or the fast path without it.
+# After loading data with signals off, rebuild with manage.py rebuild_documents.
+
+KINDS = {
+    'product_card': (Product, product_card_items),
+    'page_card': (Page, page_card_items),
+    'category': (Category, category_items),
+    'homepage': (HomePage, homepage_items),
+}
+MODEL_KINDS = defaultdict(list)
+for _kind, (_model, _) in KINDS.items():
+    MODEL_KINDS[_model._meta.model_name].append(_kind)
+CHUNK_SIZE = 500
+
+_renderer = JSONRenderer()
+
+def documents_enabled():
+    return getattr(settings, 'CONTENT_DOCUMENTS', True)
+
+def write_documents(kind, pks):
+    """Re-render the documents of kind for the given pks, dropping those of objects that no longer exist."""
+    model, items = KINDS[kind]
+    DocumentKey.objects.filter(kind=kind, object_id__in=pks).delete()
+    Document.objects.filter(kind=kind, object_id__in=pks).delete()
+    documents, document_keys = [], []
+    for row, item, keys in items(model.objects.filter(pk__in=pks)):
+        documents.append(Document(
+            kind=kind, object_id=row['id'], lang=row.get('lang') or '', slug=row.get('slug') or '', order=row.get('order') or 0,
+            body=_renderer.render(item).decode(), keys=' '.join(sorted(keys)),
+        ))
+        document_keys += [DocumentKey(kind=kind, object_id=row['id'], key=key) for key in keys]
+    Document.objects.bulk_create(documents)
+    DocumentKey.objects.bulk_create(document_keys, batch_size=CHUNK_SIZE)
+    return len(documents)
+
+def refresh_documents(keys):
+    """Re-render every document of, or embedding, an object named by the surrogate keys."""
+    targets = defaultdict(set)
+    for key in keys:
+        name, _, pk = key.partition(':')
+        if pk.isdigit():
+            for kind in MODEL_KINDS.get(name, ()):
+                targets[kind].add(int(pk))
+    object_keys = [key for key in keys if key.partition(':')[2].isdigit()]
+    if not object_keys:
+        return
+    # A category or image can be embedded by thousands of products; chunks keep every IN list
+    # under SQLite's bound parameter limit
+    for start in range(0, len(object_keys), CHUNK_SIZE):
+        embedding = DocumentKey.objects.filter(key__in=object_keys[start:start + CHUNK_SIZE])
+        for kind, object_id in embedding.values_list('kind', 'object_id').distinct():
+            targets[kind].add(object_id)
+    with transaction.atomic():
+        for kind, pks in targets.items():
+            pks = sorted(pks)
+            for start in range(0, len(pks), CHUNK_SIZE):
+                write_documents(kind, pks[start:start + CHUNK_SIZE])
+
+def rebuild_documents():
+    """Render every document from scratch in one transaction. Returns the number of documents."""
+    count = 0
+    with transaction.atomic():
+        DocumentKey.objects.all().delete()
+        Document.objects.all().delete()
+        for kind, (model, _) in KINDS.items():
+            pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(pks), CHUNK_SIZE):
+                count += write_documents(kind, pks[start:start + CHUNK_SIZE])
+    return count
+
+def documents_response(rows):
+    """A JSON list response of stored (body, keys) rows."""
+    content = '[' + ','.join(body for body, _ in rows) + ']'
+    return HttpResponse(content.encode(), content_type='application/json')
+
+class DocumentReadMixin:
+    """
+    Viewset mixin serving the actions in document_kinds from the Document table. Only plain JSON
+    requests are: anything with a query string (pagination, ?search=, sparse fieldsets) or another
+    renderer goes through the regular views.
+    """
+    document_kinds = {}
+    language_scoped = True
+
+    def document_kind(self):
+        request = self.request
+        if not documents_enabled() or request.query_params or getattr(request.accepted_renderer, 'format', None) != 'json':
+            return None
+        if set(self.kwargs) - {'lang', 'slug'}:
+            return None
+        return self.document_kinds.get(getattr(self, 'action', 'list'))
+
+    def documents(self, kind):
+        documents = Document.objects.filter(kind=kind)
+        if self.language_scoped and 'lang' in self.kwargs:
+            documents = documents.filter(lang=self.kwargs['lang'])
+        return documents
+
+    def add_document_keys(self, rows):
+        keys = getattr(self, 'surrogate_keys', None)
+        if keys is not None:
+            for _, document_keys in rows:
+                keys.update(document_keys.split())
+
+    def list(self, request, *args, **kwargs):
+        kind = self.document_kind()
+        if kind is None:
+            return super().list(request, *args, **kwargs)
+        rows = list(self.documents(kind).order_by('order', 'object_id').values_list('body', 'keys'))
+        self.add_document_keys(rows)
+        return documents_response(rows)
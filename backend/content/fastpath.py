@@ -0,0 +1,215 @@
+from collections import defaultdict
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Case, IntegerField, When
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+from .models import Product, Page, HomePage
+from .serializers import sparse_fieldset_requested
+
+# Read-only fast path for the public routes. Rows are read with .values() and nested images and
+# categories with one query per relation, then assembled as plain dicts in exactly the shape (and
+# key order) of the serializers in content/serializers.py, without building serializer fields.
+# Every renderer takes a queryset and the view's surrogate key set (or None) and returns a list.
+# Sparse fieldsets (?fields=, ?omit=) still go through the serializers.
+
+_datetime = DateTimeField()
+
+def fast_path_enabled():
+    return getattr(settings, 'CONTENT_FAST_READ_PATH', True)
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+def add_key(keys, model_name, pk):
+    if pk is not None:
+        keys.add(f'{model_name}:{pk}')
+
+def related_rows(model, field_name, pks, columns):
+    """{pk: [row, ...]} of a many-to-many field for the given pks, in the related model's ordering."""
+    field = model._meta.get_field(field_name)
+    lookup = field.related_query_name()
+    rows = defaultdict(list)
+    if pks:
+        for row in field.related_model.objects.filter(**{f'{lookup}__in': pks}).values(lookup, *columns):
+            rows[row.pop(lookup)].append(row)
+    return rows
+
+def image_dict(row, keys):
+    add_key(keys, 'image', row['id'])
+    return {'id': row['id'], 'image': image_url(row['image']), 'alt_text': row['alt_text']}
+
+def category_dict(row, keys):
+    add_key(keys, 'category', row['id'])
+    add_key(keys, 'image', row['image_id'])
+    return {
+        'title': row['title'], 'lang': row['lang'], 'slug': row['slug'], 'langslug': row['langslug'],
+        'categoryinfo': row['categoryinfo'], 'content': row['content'], 'image': image_url(row['image__image']),
+    }
+
+def category_card_dict(row, keys):
+    add_key(keys, 'category', row['id'])
+    return {'title': row['title'], 'lang': row['lang'], 'slug': row['slug']}
+
+IMAGE_COLUMNS = ('id', 'image', 'alt_text')
+CATEGORY_COLUMNS = ('id', 'title', 'lang', 'slug', 'langslug', 'categoryinfo', 'content', 'image_id', 'image__image')
+CATEGORY_CARD_COLUMNS = ('id', 'title', 'lang', 'slug')
+PRODUCT_CARD_COLUMNS = ('id', 'title', 'slug', 'langslug', 'lang', 'pageinfo', 'order', 'image_id', 'image__image')
+
+def collect(items, keys):
+    data = []
+    for row, item, item_keys in items:
+        data.append(item)
+        if keys is not None:
+            keys |= item_keys
+    return data
+
+# The *_items generators yield (row, rendered item, surrogate keys of the item) per object
+
+def category_items(queryset):
+    for row in queryset.values(*CATEGORY_COLUMNS, 'order'):
+        keys = set()
+        yield row, category_dict(row, keys), keys
+
+def product_items(queryset):
+    rows = list(queryset.values(
+        'id', 'title', 'slug', 'langslug', 'pageinfo', 'content', 'shoplink', 'date_posted', 'lang', 'order', 'image_id', 'image__image',
+    ))
+    pks = [row['id'] for row in rows]
+    categories = related_rows(Product, 'categories', pks, CATEGORY_COLUMNS)
+    images = related_rows(Product, 'images', pks, IMAGE_COLUMNS)
+    for row in rows:
+        keys = set()
+        add_key(keys, 'product', row['id'])
+        add_key(keys, 'image', row['image_id'])
+        yield row, {
+            'id': row['id'],
+            'categories': [category_dict(category, keys) for category in categories[row['id']]],
+            'images': [image_dict(image, keys) for image in images[row['id']]],
+            'image': image_url(row['image__image']),
+            'title': row['title'], 'slug': row['slug'], 'langslug': row['langslug'], 'pageinfo': row['pageinfo'],
+            'content': row['content'], 'shoplink': row['shoplink'], 'date_posted': _datetime.to_representation(row['date_posted']),
+            'lang': row['lang'], 'order': row['order'],
+        }, keys
+
+def product_card_row_items(rows):
+    categories = related_rows(Product, 'categories', list({row['id'] for row in rows}), CATEGORY_CARD_COLUMNS)
+    for row in rows:
+        keys = set()
+        add_key(keys, 'product', row['id'])
+        add_key(keys, 'image', row['image_id'])
+        yield row, {
+            'id': row['id'], 'title': row['title'], 'slug': row['slug'], 'langslug': row['langslug'], 'lang': row['lang'],
+            'pageinfo': row['pageinfo'], 'image': image_url(row['image__image']), 'order': row['order'],
+            'categories': [category_card_dict(category, keys) for category in categories[row['id']]],
+        }, keys
+
+def page_items(queryset):
+    rows = list(queryset.values('id', 'title', 'slug', 'langslug', 'pageinfo', 'content', 'lang', 'order', 'image_id', 'image__image'))
+    images = related_rows(Page, 'images', [row['id'] for row in rows], IMAGE_COLUMNS)
+    for row in rows:
+        keys = set()
+        add_key(keys, 'page', row['id'])
+        add_key(keys, 'image', row['image_id'])
+        yield row, {
+            'id': row['id'],
+            'images': [image_dict(image, keys) for image in images[row['id']]],
+            'image': image_url(row['image__image']),
+            'title': row['title'], 'slug': row['slug'], 'langslug': row['langslug'], 'pageinfo': row['pageinfo'],
+            'content': row['content'], 'lang': row['lang'], 'order': row['order'],
+        }, keys
+
+def page_card_items(queryset):
+    for row in queryset.values('id', 'title', 'slug', 'langslug', 'lang', 'pageinfo', 'order', 'image_id', 'image__image'):
+        keys = set()
+        add_key(keys, 'page', row['id'])
+        add_key(keys, 'image', row['image_id'])
+        yield row, {
+            'id': row['id'], 'title': row['title'], 'slug': row['slug'], 'langslug': row['langslug'], 'lang': row['lang'],
+            'pageinfo': row['pageinfo'], 'image': image_url(row['image__image']), 'order': row['order'],
+        }, keys
+
+def homepage_items(queryset):
+    rows = list(queryset.values('id', 'title', 'pageinfo', 'content', 'lang'))
+    pks = [row['id'] for row in rows]
+    images = related_rows(HomePage, 'images', pks, IMAGE_COLUMNS)
+    products = related_rows(HomePage, 'products', pks, PRODUCT_CARD_COLUMNS)
+    cards = {
+        card_row['id']: (card, card_keys)
+        for card_row, card, card_keys in product_card_row_items([product for selected in products.values() for product in selected])
+    }
+    for row in rows:
+        keys = set()
+        add_key(keys, 'homepage', row['id'])
+        for product in products[row['id']]:
+            keys |= cards[product['id']][1]
+        yield row, {
+            'id': row['id'],
+            'images': [image_dict(image, keys) for image in images[row['id']]],
+            'title': row['title'], 'pageinfo': row['pageinfo'], 'content': row['content'], 'lang': row['lang'],
+            'products': [cards[product['id']][0] for product in products[row['id']]],
+        }, keys
+
+def product_card_items(queryset):
+    return product_card_row_items(list(queryset.values(*PRODUCT_CARD_COLUMNS)))
+
+def category_details(queryset, keys=None):
+    return collect(category_items(queryset), keys)
+
+def product_details(queryset, keys=None):
+    return collect(product_items(queryset), keys)
+
+def product_cards(queryset, keys=None):
+    return collect(product_card_items(queryset), keys)
+
+def page_details(queryset, keys=None):
+    return collect(page_items(queryset), keys)
+
+def page_cards(queryset, keys=None):
+    return collect(page_card_items(queryset), keys)
+
+def homepages(queryset, keys=None):
+    return collect(homepage_items(queryset), keys)
+
+def in_order(render, model, instances, keys=None):
+    """Render a page of instances (as returned by a paginator) in the order given."""
+    pks = [instance.pk for instance in instances]
+    if not pks:
+        return []
+    position = Case(*[When(pk=pk, then=i) for i, pk in enumerate(pks)], output_field=IntegerField())
+    return render(model.objects.filter(pk__in=pks).order_by(position), keys)
+
+class FastReadMixin:
+    """
+    Viewset mixin that renders the actions listed in fast_renderers with the renderers above
+    instead of the serializers. Viewsets filter in get_base_queryset, see QueryPlannerMixin.
+    """
+    fast_renderers = {}
+
+    def fast_renderer(self):
+        if not fast_path_enabled() or sparse_fieldset_requested(self.request):
+            return None
+        return self.fast_renderers.get(getattr(self, 'action', 'list'))
+
+    def fast_detail(self, queryset):
+        """The response for the single object of queryset, or None when the fast path is off."""
+        render = self.fast_renderer()
+        if render is None:
+            return None
+        data = render(queryset, getattr(self, 'surrogate_keys', None))
+        if not data:
+            return Response({"detail": "Not found."}, status=404)
+        return Response(data[0])
+
+    def list(self, request, *args, **kwargs):
+        render = self.fast_renderer()
+        if render is None:
+            return super().list(request, *args, **kwargs)
+        keys = getattr(self, 'surrogate_keys', None)
+        queryset = self.filter_queryset(self.get_base_queryset())
+        # The paginator only needs the columns its cursor is made of
+        ordering = getattr(self.paginator, 'ordering', None)
+        page = self.paginate_queryset(queryset.only(*ordering) if ordering else queryset)
+        if page is not None:
+            return self.get_paginated_response(in_order(render, queryset.model, page, keys))
+        return Response(render(queryset, keys))
@@ -0,0 +1,196 @@
+import gzip
+import json
+from collections import Counter
+from contextlib import contextmanager
+from django.apps import apps
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.python import Deserializer
+from django.db import connection, reset_queries, transaction
+from django.db.models import Prefetch
+from django.utils.text import slugify
+from .bulk import CHUNK_SIZE, chunks, link, rebuild_derived
+from .models import Category, Product, Page, Image, HomePage, MenuItem
+from .search import body_fields, kind_for, search_key
+
+# Streaming fixture import. A dumpdata JSON array or a file of JSON lines is decoded one object
+# at a time and goes through Django's deserializer (field conversion, foreign keys and
+# many-to-many pks as loaddata does it), then is bulk inserted a chunk per model at a time.
+# Objects that exist already are updated by pk and their relations replaced. Dumped timestamps
+# are kept, as loaddata keeps them. What the content models' save() and signals would compute
+# is filled in per chunk and once at the end, in the same transaction, instead of per row.
+#
+# The export writes the same objects as JSON lines, a chunk of rows at a time with the
+# many-to-many pks of the chunk prefetched, so either side holds one chunk in memory.
+
+READ_SIZE = 1 << 16
+SEPARATORS = ' \t\r\n,[]'
+SEARCHABLE = (Product, Category, Page)
+# In an order that needs no forward references
+EXPORT_MODELS = (Image, Category, Page, Product, HomePage, MenuItem)
+
+def open_fixture(path, mode='rt'):
+    """A fixture file, gzipped when it ends in .gz."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def read_objects(stream, read_size=READ_SIZE):
+    """The objects of a JSON array or of JSON lines, decoded one at a time from a text stream."""
+    decoder, buffer, eof = json.JSONDecoder(), '', False
+    while True:
+        buffer = buffer.lstrip(SEPARATORS)
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            return
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer += chunk
+
+def timestamp_fields(model):
+    return [field for field in model._meta.concrete_fields if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+
+def complete(model, instances):
+    """Set the fields the model's save() derives from the others, and timestamps older dumps don't have."""
+    stamps = timestamp_fields(model)
+    for instance in instances:
+        for field in stamps:
+            if getattr(instance, field.attname) is None:
+                field.pre_save(instance, add=True)
+    if model not in SEARCHABLE:
+        return
+    fields = body_fields(kind_for(model))
+    for instance in instances:
+        if not instance.slug:
+            instance.slug = slugify(instance.title)
+        # dumpdata writes search_key out; only dumps from before it existed need it computed
+        if not instance.search_key:
+            instance.search_key = search_key(instance.title, *(getattr(instance, name) for name in fields))
+
+@contextmanager
+def dumped_timestamps(model, instances):
+    """
+    Write the auto_now and auto_now_add fields back as the objects have them, as loaddata does, once
+    bulk_create has stamped them with the current time. The model's fields are left as they are,
+    so saves in other threads keep stamping.
+    """
+    names = [field.name for field in timestamp_fields(model)]
+    dumped = [(instance, [getattr(instance, name) for name in names]) for instance in instances]
+    yield
+    if not names:
+        return
+    for instance, values in dumped:
+        for name, value in zip(names, values):
+            setattr(instance, name, value)
+    model._base_manager.bulk_update([instance for instance, _ in dumped if instance.pk is not None], names, batch_size=CHUNK_SIZE)
+
+def upsert(model, instances):
+    """Insert rows with their pks as they are, updating the rows that exist already."""
+    update_fields = [field.name for field in model._meta.local_concrete_fields if not field.primary_key]
+    model._base_manager.bulk_create(instances, update_conflicts=True, unique_fields=['pk'], update_fields=update_fields)
+
+def insert(model, batch):
+    """Insert, or update by pk, a chunk of deserialized objects of one model and replace their relations."""
+    instances = [deserialized.object for deserialized in batch]
+    complete(model, instances)
+    meta = model._meta
+    with dumped_timestamps(model, instances):
+        upsert(model, [instance for instance in instances if instance.pk is not None])
+        # Objects dumped without a pk are new, their pks come back from bulk_create where the database can return them
+        model._base_manager.bulk_create([instance for instance in instances if instance.pk is None])
+    for field in meta.many_to_many:
+        related = [(deserialized.object.pk, deserialized.m2m_data[field.name]) for deserialized in batch if field.name in deserialized.m2m_data]
+        if not related:
+            continue
+        if any(pk is None for pk, pks in related if pks):
+            raise ValueError(f'{meta.label} objects without a pk can\'t have {field.name}')
+        through = field.remote_field.through
+        through._base_manager.filter(**{f'{field.m2m_field_name()}__in': [pk for pk, _ in related]}).delete()
+        link(model, field.name, ((pk, other) for pk, pks in related for other in pks))
+
+def load_objects(objects, chunk_size=CHUNK_SIZE, ignorenonexistent=False, log=None):
+    """Load the objects of a fixture stream. Returns the number loaded per model label."""
+    counts, pending = Counter(), {}
+
+    def flush(model):
+        batch = pending.pop(model)
+        insert(model, batch)
+        # With DEBUG on every query is kept, the inserted content with it
+        reset_queries()
+        counts[model._meta.label] += len(batch)
+        if log:
+            log(f'{model._meta.label}: {counts[model._meta.label]}')
+
+    for deserialized in Deserializer(objects, ignorenonexistent=ignorenonexistent):
+        model = type(deserialized.object)
+        pending.setdefault(model, []).append(deserialized)
+        if len(pending[model]) >= chunk_size:
+            flush(model)
+    for model in list(pending):
+        flush(model)
+    return counts
+
+def refresh_menu_links():
+    """Point menu items on a page at the page, as MenuItem.save() does."""
+    changed = []
+    for item in MenuItem.objects.filter(page__isnull=False).select_related('page'):
+        link = item.page_link()
+        if item.link != link:
+            item.link = link
+            changed.append(item)
+    MenuItem.objects.bulk_update(changed, ['link'], batch_size=CHUNK_SIZE)
+    return len(changed)
+
+def load_fixtures(paths, chunk_size=CHUNK_SIZE, ignorenonexistent=False, log=None):
+    """Load fixture files and rebuild what the content signals keep up to date, all in one transaction."""
+    counts = Counter()
+    with transaction.atomic():
+        # As loaddata: rows may refer to rows further down, the constraints are checked at the end
+        with connection.constraint_checks_disabled():
+            for path in paths:
+                with open_fixture(path) as stream:
+                    counts.update(load_objects(read_objects(stream), chunk_size, ignorenonexistent, log))
+        models = [apps.get_model(label) for label in counts]
+        connection.check_constraints(table_names=[
+            table for model in models
+            for table in [model._meta.db_table] + [field.remote_field.through._meta.db_table for field in model._meta.many_to_many]
+        ])
+        refresh_menu_links()
+        # In the same transaction, so a failure leaves the database as it was
+        rebuild_derived(log)
+    return counts
+
+def export_querysets(lang=None, since=None):
+    """The querysets of the exported models, filtered to a language and to rows modified since a datetime."""
+    for model in EXPORT_MODELS:
+        queryset = model._base_manager.order_by('pk')
+        # Images are shared between the languages
+        if lang and model is not Image:
+            queryset = queryset.filter(lang=lang)
+        if since:
+            queryset = queryset.filter(updated_at__gte=since)
+        yield queryset
+
+def dump_objects(queryset, chunk_size=CHUNK_SIZE):
+    """The objects of a queryset as dumpdata writes them, many-to-many fields as pk lists."""
+    related = [Prefetch(field.name, queryset=field.related_model._base_manager.only('pk')) for field in queryset.model._meta.many_to_many]
+    for chunk in chunks(queryset.prefetch_related(*related).iterator(chunk_size=chunk_size), chunk_size):
+        yield from serializers.serialize('python', chunk)
+        reset_queries()
+
+def write_objects(stream, objects):
+    """Write objects as JSON lines. Returns the number written."""
+    count = 0
+    for obj in objects:
+        stream.write(json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+        count += 1
+    return count
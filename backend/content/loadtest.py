@@ -0,0 +1,289 @@
+import http.client
+import importlib.util
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from .benchmark import percentiles
+from .models import Category, Product, Page
+from .synthetic import sentence
+
+# Load tests against a real server. The app is started under gunicorn (WSGI, as deployed) or
+# uvicorn (config/asgi.py) on a free local port, against a database file and a file based content
+# cache of the load test's own. Reader threads replay the frontend's page views, each one the API
+# fetches its page makes; writer threads save objects the way the admin does, through the ORM of
+# this process, so SQLite locking between the server's workers and an admin is part of the picture.
+
+HOST = '127.0.0.1'
+SERVERS = ('gunicorn', 'uvicorn')
+STARTUP_TIMEOUT = 30
+REQUEST_TIMEOUT = 30
+HEADERS = {'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate, br'}
+# Every page renders the Header and the LocaleSwitcher, which both fetch the menu
+LAYOUT_FETCHES = ('/api/menuitems/', '/api/menuitems/')
+# Page views of the frontend (src/app/[locale]/...), how often each is visited and what it fetches.
+# Detail paths are fetched without a trailing slash, as the pages do, and follow the redirect;
+# on detail pages the LocaleSwitcher asks for the object's translations.
+PAGE_VIEWS = {
+    'home': (15, ('/api/{lang}/homepage/', '/api/categories/')),
+    'product': (35, ('/api/{lang}/product/{product}', '/api/{lang}/translations/product/{product}/')),
+    'products': (10, ('/api/{lang}/products/',)),
+    'category': (15, ('/api/categories/', '/api/products/', '/api/{lang}/translations/category/{category}/')),
+    'categories': (5, ('/api/categories/',)),
+    'page': (10, ('/api/{lang}/page/{page}', '/api/{lang}/translations/page/{page}/')),
+    'search': (10, ('/api/products?search={word}', '/api/categories?search={word}')),
+}
+# A few products, pages and categories draw most of the views
+POPULARITY = 3
+WRITE_MODELS = (Product, Product, Product, Category, Page)
+
+def parse_mix(value):
+    """Page view weights from 'product=50,search=5'; views left out keep their default weight."""
+    weights = {name: weight for name, (weight, _) in PAGE_VIEWS.items()}
+    for item in filter(None, (item.strip() for item in (value or '').split(','))):
+        name, _, weight = item.partition('=')
+        if name not in PAGE_VIEWS:
+            raise ValueError(f'Unknown page view {name!r}, one of {", ".join(PAGE_VIEWS)}')
+        weights[name] = float(weight)
+    return weights
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+def popular(rng, items):
+    return items[int(len(items) * rng.random() ** POPULARITY)]
+
+class TrafficMix:
+    """Page views with their parameters drawn from the database."""
+    def __init__(self, weights):
+        self.names = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.names]
+        self.slugs = {}
+        for key, model in (('product', Product), ('category', Category), ('page', Page)):
+            for lang, slug in model.objects.order_by('?').values_list('lang', 'slug'):
+                self.slugs.setdefault(lang, {}).setdefault(key, []).append(slug)
+        self.words = sorted({word.lower() for title in Product.objects.values_list('title', flat=True)[:1000] for word in title.split() if word.isalpha()}) or ['a']
+        self.langs = sorted(self.slugs)
+        if not self.langs:
+            raise ValueError('There is no content to load test against')
+
+    def page_view(self, rng):
+        """The page view's name and the (route, path) of each fetch it makes."""
+        name = rng.choices(self.names, self.weights)[0]
+        lang = rng.choice(self.langs)
+        values = {'lang': lang, 'word': quote(rng.choice(self.words))}
+        for key, slugs in self.slugs[lang].items():
+            values[key] = quote(popular(rng, slugs))
+        fetches = LAYOUT_FETCHES + PAGE_VIEWS[name][1]
+        return name, [(route, route.format(**values)) for route in fetches]
+
+class Client:
+    """One keep-alive connection, as the frontend server holds one to the API."""
+    def __init__(self, port, host_header):
+        self.port, self.host_header, self.connection = port, host_header, None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, path):
+        # A connection the server closed in between is retried once on a fresh one
+        for retry in (True, False):
+            if self.connection is None:
+                self.connection, retry = http.client.HTTPConnection(HOST, self.port, timeout=REQUEST_TIMEOUT), False
+            try:
+                self.connection.request('GET', path, headers=dict(HEADERS, Host=self.host_header))
+                response = self.connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                self.close()
+                if not retry or not isinstance(exc, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    raise
+                continue
+            if response.will_close:
+                self.close()
+            return response, body
+
+    def fetch(self, path):
+        """(status, X-Cache, size, redirects) of a GET, following redirects like fetch() does."""
+        for redirects in range(5):
+            response, body = self.request(path)
+            location = response.getheader('Location')
+            if response.status not in (301, 302, 307, 308) or not location:
+                return response.status, response.getheader('X-Cache'), len(body), redirects
+            location = urlsplit(location)
+            path = location.path + (f'?{location.query}' if location.query else '')
+        return response.status, None, len(body), redirects
+
+def admin_save(model, pk, text):
+    """Change and save an object the way the admin change form does: one transaction, the object, then its relations."""
+    with transaction.atomic():
+        obj = model.objects.get(pk=pk)
+        setattr(obj, 'categoryinfo' if model is Category else 'pageinfo', text)
+        obj.save()
+        for field in model._meta.many_to_many:
+            related = getattr(obj, field.name)
+            related.set(list(related.all()))
+
+class Server:
+    """gunicorn or uvicorn serving the app in a subprocess."""
+    def __init__(self, kind, workers, threads, environment, log_path):
+        if kind not in SERVERS:
+            raise ValueError(f'Unknown server {kind!r}, one of {", ".join(SERVERS)}')
+        if importlib.util.find_spec(kind) is None:
+            raise ValueError(f'{kind} is not installed')
+        self.kind, self.workers, self.threads, self.environment, self.log_path = kind, workers, threads, environment, log_path
+        self.port, self.process = free_port(), None
+
+    def command(self):
+        if self.kind == 'gunicorn':
+            return [
+                sys.executable, '-m', 'gunicorn', 'config.wsgi:application', '--bind', f'{HOST}:{self.port}',
+                '--workers', str(self.workers), '--threads', str(self.threads), '--log-level', 'warning',
+            ]
+        # Sync views run one at a time per worker under ASGI, threads don't apply
+        return [
+            sys.executable, '-m', 'uvicorn', 'config.asgi:application', '--host', HOST, '--port', str(self.port),
+            '--workers', str(self.workers), '--no-access-log', '--log-level', 'warning',
+        ]
+
+    def start(self, host_header):
+        env = dict(os.environ, PYTHONUNBUFFERED='1', **self.environment)
+        self.log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(self.command(), cwd=settings.BASE_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        client, deadline = Client(self.port, host_header), time.monotonic() + STARTUP_TIMEOUT
+        try:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    break
+                try:
+                    if client.fetch(LAYOUT_FETCHES[0])[0] == 200:
+                        return
+                except (OSError, http.client.HTTPException):
+                    pass
+                time.sleep(0.2)
+        finally:
+            client.close()
+        self.stop()
+        raise RuntimeError(f'{self.kind} did not come up, see its log:\n{self.log_tail()}')
+
+    def log_tail(self, lines=20):
+        with open(self.log_path) as log:
+            return ''.join(log.readlines()[-lines:])
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.process is not None:
+            self.log.close()
+
+class LoadTest:
+    def __init__(self, port, host_header, mix, concurrency=16, duration=30, warmup=5, writers=0, write_interval=1.0, seed=0):
+        self.port, self.host_header, self.mix = port, host_header, mix
+        self.concurrency, self.duration, self.warmup = concurrency, duration, warmup
+        self.writers, self.write_interval, self.seed = writers, write_interval, seed
+        self.stopping = threading.Event()
+        # (route, status, seconds, X-Cache, redirects, error), appended from every reader thread
+        self.samples, self.page_views, self.writes = [], Counter(), []
+        self.write_pks = {model: list(model.objects.values_list('pk', flat=True)) for model in set(WRITE_MODELS)}
+
+    def reader(self, rng):
+        client = Client(self.port, self.host_header)
+        try:
+            while not self.stopping.is_set():
+                view, fetches = self.mix.page_view(rng)
+                for route, path in fetches:
+                    started = time.perf_counter()
+                    try:
+                        status, cache, _, redirects = client.fetch(path)
+                        error = None if status < 400 else f'HTTP {status}'
+                    except (OSError, http.client.HTTPException) as exc:
+                        status, cache, redirects, error = None, None, 0, type(exc).__name__
+                    if time.monotonic() >= self.measured_from:
+                        self.samples.append((route, status, time.perf_counter() - started, cache, redirects, error))
+                if time.monotonic() >= self.measured_from:
+                    self.page_views[view] += 1
+        finally:
+            client.close()
+
+    def writer(self, rng):
+        words = self.mix.words
+        try:
+            while not self.stopping.wait(self.write_interval * rng.uniform(0.5, 1.5)):
+                model = rng.choice(WRITE_MODELS)
+                if not self.write_pks[model]:
+                    continue
+                started = time.perf_counter()
+                try:
+                    admin_save(model, rng.choice(self.write_pks[model]), sentence(rng, words))
+                    error = None
+                except DatabaseError as exc:
+                    error = str(exc) or type(exc).__name__
+                if time.monotonic() >= self.measured_from:
+                    self.writes.append((model._meta.model_name, time.perf_counter() - started, error))
+        finally:
+            connection.close()
+
+    def run(self):
+        self.measured_from = time.monotonic() + self.warmup
+        threads = [threading.Thread(target=self.reader, args=(random.Random(f'{self.seed}-r{n}'),), daemon=True) for n in range(self.concurrency)]
+        threads += [threading.Thread(target=self.writer, args=(random.Random(f'{self.seed}-w{n}'),), daemon=True) for n in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(self.warmup + self.duration)
+        self.measured_until = time.monotonic()
+        self.stopping.set()
+        for thread in threads:
+            thread.join(REQUEST_TIMEOUT)
+        return self.report()
+
+    def report(self):
+        elapsed, samples = self.measured_until - self.measured_from, self.samples
+        return {
+            'seconds': round(elapsed, 2),
+            'page_views': dict(self.page_views),
+            **summarize(samples, elapsed),
+            'routes': [dict(route=route, **summarize([sample for sample in samples if sample[0] == route], elapsed)) for route in sorted({sample[0] for sample in samples})],
+            'writes': summarize_writes(self.writes, elapsed),
+        }
+
+def summarize(samples, elapsed):
+    errors = [sample for sample in samples if sample[5]]
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'errors': len(errors),
+        'error_rate': round(len(errors) / len(samples), 4) if samples else 0,
+        'latency_ms': percentiles([sample[2] for sample in samples]) if samples else None,
+        'statuses': dict(Counter(str(sample[1]) for sample in samples)),
+        'cache': dict(Counter(sample[3] or '-' for sample in samples)),
+        'redirected': sum(1 for sample in samples if sample[4]),
+        'error_kinds': dict(Counter(sample[5] for sample in errors)),
+    }
+
+def summarize_writes(writes, elapsed):
+    errors = [write for write in writes if write[2]]
+    return {
+        'writes': len(writes),
+        'per_second': round(len(writes) / elapsed, 2) if elapsed else 0,
+        'errors': len(errors),
+        'error_rate': round(len(errors) / len(writes), 4) if writes else 0,
+        'latency_ms': percentiles([write[1] for write in writes]) if writes else None,
+        'by_model': dict(Counter(write[0] for write in writes)),
+        'error_kinds': dict(Counter(write[2] for write in errors)),
+    }
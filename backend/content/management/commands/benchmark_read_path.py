@@ -0,0 +1,45 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from content import fastpath, serializers
+from content.models import Category, Product, Page, HomePage
+from content.planner import plan_queryset
+
+CASES = (
+    ('products (cards)', Product, serializers.ProductCardSerializer, fastpath.product_cards),
+    ('products', Product, serializers.ProductSerializer, fastpath.product_details),
+    ('pages (cards)', Page, serializers.PageCardSerializer, fastpath.page_cards),
+    ('pages', Page, serializers.PageSerializer, fastpath.page_details),
+    ('categories', Category, serializers.CategorySerializer, fastpath.category_details),
+    ('homepages', HomePage, serializers.HomePageSerializer, fastpath.homepages),
+)
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compare the serializers with the fast read path (content/fastpath.py) on the current catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per case; the median is reported')
+        parser.add_argument('--lang', help='Only render objects of this language')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        for name, model, serializer_class, render in CASES:
+            queryset = model.objects.all()
+            if options['lang']:
+                queryset = queryset.filter(lang=options['lang'])
+            slow = median_ms(lambda: serializer_class(plan_queryset(queryset.all(), serializer_class), many=True, context={'surrogate_keys': set()}).data, repeat)
+            fast = median_ms(lambda: render(queryset.all(), set()), repeat)
+            self.stdout.write(
+                f'{name:<18} {queryset.count():>7} rows  serializer {slow:9.2f} ms  fast path {fast:9.2f} ms  '
+                f'{slow / fast if fast else 0:5.1f}x'
+            )
@@ -0,0 +1,104 @@
+import json
+import logging
+import platform
+import re
+import resource
+import tempfile
+import time
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+from content.benchmark import RouteBenchmark, benchmark_cases, compare, current_commit, sample_values
+from content.bulk import rebuild_derived
+from content.synthetic import generate_catalog
+
+# Each catalog size gets a throwaway database (a file for SQLite, 100k products don't fit in
+# memory) and a private in-memory cache, so neither the real data nor a shared cache is touched.
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-default'},
+    'content': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-content'},
+}
+FLAGS = ('CONTENT_CATALOG', 'CONTENT_DOCUMENTS', 'CONTENT_FAST_READ_PATH', 'CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE')
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic catalogs and time every API route against them; results are written as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,10000,100000', help='Comma separated catalog sizes, in products over all languages')
+        parser.add_argument('--repeat', type=int, default=10, help='Requests per route and mode; percentiles are taken over them')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', help='Only time paths matching this regular expression')
+        parser.add_argument('--output', default='benchmark.json', help='Where to write the results')
+        parser.add_argument('--compare', help='A previous result file to print the changes against')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes takes comma separated integers')
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as results:
+                previous = json.load(results)
+
+        results = {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'settings': {flag: getattr(settings, flag, None) for flag in FLAGS},
+            'repeat': options['repeat'],
+            'catalogs': [],
+        }
+        # Detail routes by pk are shadowed by the slug routes and answer 404; don't log each one
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        setup_test_environment()
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES, CONTENT_CACHE_ALIAS='content'), tempfile.TemporaryDirectory() as directory:
+                for size in sizes:
+                    results['catalogs'].append(self.run_size(size, directory, options))
+        finally:
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        if previous:
+            for line in compare(previous, results):
+                self.stdout.write(line)
+
+    def run_size(self, size, directory, options):
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = f'{directory}/benchmark-{size}.sqlite3'
+        databases = setup_databases(verbosity=0, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            started = time.monotonic()
+            rows = generate_catalog(size, seed=options['seed'])
+            generated = time.monotonic() - started
+            started = time.monotonic()
+            rebuild_derived()
+            rebuilt = time.monotonic() - started
+            self.stdout.write(f'{size} products: generated in {generated:.1f}s, derived data rebuilt in {rebuilt:.1f}s')
+
+            benchmark = RouteBenchmark(options['repeat'])
+            routes = []
+            for name, method, path, body in benchmark_cases(sample_values()):
+                if options['only'] and not re.search(options['only'], path):
+                    continue
+                result = dict(name=name, method=method, path=path, **benchmark.run(method, path, body))
+                routes.append(result)
+                self.stdout.write(
+                    f'  {method:<4} {path:<60} {result["status"]}  p50 {result["miss_ms"]["p50"]:9.2f} ms  '
+                    f'p95 {result["miss_ms"]["p95"]:9.2f} ms  {result["queries"]:>3} queries  {result["peak_memory_kb"]:>9.1f} kB'
+                )
+            return {
+                'products': size, 'rows': rows, 'generate_seconds': round(generated, 2), 'rebuild_seconds': round(rebuilt, 2),
+                'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'routes': routes,
+            }
+        finally:
+            teardown_databases(databases, verbosity=0)
@@ -0,0 +1,58 @@
+import gzip
+import sys
+from datetime import datetime, time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from content.bulk import CHUNK_SIZE
+from content.fixtures import dump_objects, export_querysets, open_fixture, write_objects
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream products, pages, categories, images, menu items and homepages as JSON lines in the dumpdata format, '
+        'many-to-many fields as pk lists; import_content reads it back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default='-', help='File to write, gzipped when it ends in .gz; standard output by default')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output whatever its name')
+        parser.add_argument('--lang', choices=[code for code, _ in settings.LANGUAGES], help='Only objects in this language (and every image)')
+        parser.add_argument('--since', help='Only objects modified at or after this date or datetime (ISO 8601)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched at a time')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options['since']) if options['since'] else None
+        except ValueError:
+            raise CommandError(f'--since takes an ISO 8601 date or datetime, not {options["since"]!r}')
+
+        output = options['output']
+        if output == '-':
+            stream = gzip.open(sys.stdout.buffer, 'wt', encoding='utf-8') if options['gzip'] else self.stdout
+        elif options['gzip'] and not output.endswith('.gz'):
+            stream = gzip.open(output, 'wt', encoding='utf-8')
+        else:
+            stream = open_fixture(output, 'wt')
+
+        counts = {}
+        try:
+            for queryset in export_querysets(options['lang'], since):
+                counts[queryset.model._meta.label] = write_objects(stream, dump_objects(queryset, max(1, options['chunk_size'])))
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+        if options['verbosity'] > 0:
+            summary = ', '.join(f'{count} {label}' for label, count in counts.items())
+            self.stderr.write(f'Exported {summary}')
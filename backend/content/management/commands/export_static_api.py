@@ -0,0 +1,25 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from content.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Pre-render every read-only API route to .json and .json.gz files for nginx to serve directly'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.STATIC_API_ROOT, help='Directory to write the snapshot to')
+        parser.add_argument('--incremental', action='store_true', help='Only re-render files affected by objects changed since the last run')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Number of processes to render with')
+        parser.add_argument('--host', default=(settings.ALLOWED_HOSTS or ['localhost'])[0], help='Host the routes are rendered for')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = export_snapshot(options['output'], options['host'], incremental=options['incremental'], processes=options['processes'])
+        for path, status in result['failed']:
+            self.stderr.write(f'{path}: HTTP {status}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {result['rendered']}, unchanged {result['unchanged']}, removed {result['removed']} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
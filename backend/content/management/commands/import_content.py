@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DatabaseError
+from content.bulk import CHUNK_SIZE
+from content.fixtures import load_fixtures
+
+
+class Command(BaseCommand):
+    help = (
+        'Load dumpdata JSON or JSON lines fixtures (.gz as well) in bulk, streaming them, and rebuild the search index, '
+        'translation links and documents once at the end'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+', help='Fixture files, e.g. datadump.json')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Objects of a model inserted at a time')
+        parser.add_argument('-i', '--ignorenonexistent', action='store_true', help='Ignore fields the models no longer have')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        log = self.stdout.write if options['verbosity'] > 0 else None
+        try:
+            counts = load_fixtures(options['fixtures'], max(1, options['chunk_size']), options['ignorenonexistent'], log)
+        except (OSError, ValueError, DeserializationError, DatabaseError) as exc:
+            raise CommandError(f'Import failed, nothing was loaded: {exc}')
+        total = sum(counts.values())
+        if options['verbosity'] > 0:
+            self.stdout.write(self.style.SUCCESS(f'Loaded {total} objects in {time.monotonic() - started:.1f}s'))
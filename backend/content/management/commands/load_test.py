@@ -0,0 +1,141 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from content.benchmark import current_commit
+from content.bulk import rebuild_derived
+from content.loadtest import HOST, SERVERS, LoadTest, Server, TrafficMix, parse_mix
+from content.synthetic import generate_catalog
+
+
+class Command(BaseCommand):
+    help = 'Start the app under gunicorn or uvicorn on a throwaway database and replay the frontend\'s traffic against it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=SERVERS, default='gunicorn')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker (gthread above 1)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Simultaneous clients, each with one keep-alive connection')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds measured')
+        parser.add_argument('--warmup', type=float, default=5, help='Seconds run before measuring')
+        parser.add_argument('--products', type=int, default=1000, help='Size of the synthetic catalog')
+        parser.add_argument('--database', help='Load test a copy of this SQLite file instead of a synthetic catalog')
+        parser.add_argument('--writers', type=int, default=0, help='Threads saving objects like an admin while the readers run')
+        parser.add_argument('--write-interval', type=float, default=1.0, help='Mean seconds between the saves of a writer')
+        parser.add_argument('--mix', help='Page view weights, e.g. product=50,search=5')
+        parser.add_argument('--debug', action='store_true', help='Run the server with DEBUG on (ENVIRONMENT=local)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='loadtest.json', help='Where to write the results')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('load_test runs against a SQLite database file')
+        try:
+            weights = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        name = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            path, cache = os.path.join(directory, 'loadtest.sqlite3'), os.path.join(directory, 'cache')
+            # The server's workers and this process share the database and the content cache,
+            # so the writers' version bumps reach the workers as an admin's would
+            caches = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'loadtest-default'},
+                'content': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache},
+            }
+            connection.close()
+            connection.settings_dict['NAME'] = path
+            try:
+                with override_settings(CACHES=caches, CONTENT_CACHE_ALIAS='content'):
+                    results = self.run(path, cache, directory, weights, options)
+            finally:
+                connection.close()
+                connection.settings_dict['NAME'] = name
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+    def run(self, path, cache, directory, weights, options):
+        try:
+            server = Server(options['server'], options['workers'], options['threads'], {
+                'SQLITE_PATH': path,
+                'CONTENT_CACHE_BACKEND': 'file',
+                'CONTENT_CACHE_LOCATION': cache,
+                'ENVIRONMENT': 'local' if options['debug'] else 'loadtest',
+                'EXTRA_ALLOWED_HOSTS': HOST,
+            }, os.path.join(directory, 'server.log'))
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options['database']:
+            shutil.copyfile(options['database'], path)
+        call_command('migrate', verbosity=0, interactive=False)
+        if not options['database']:
+            rows = generate_catalog(options['products'], seed=options['seed'])
+            self.stdout.write(f'Generated {rows["products"]} products')
+        rebuild_derived()
+        try:
+            mix = TrafficMix(weights)
+        except ValueError as exc:
+            raise CommandError(exc)
+        test = LoadTest(
+            server.port, HOST, mix, concurrency=options['concurrency'], duration=options['duration'], warmup=options['warmup'],
+            writers=options['writers'], write_interval=options['write_interval'], seed=options['seed'],
+        )
+        try:
+            server.start(HOST)
+        except RuntimeError as exc:
+            raise CommandError(exc)
+        self.stdout.write(f'{options["server"]} up on port {server.port}, running {options["warmup"]:g}s + {options["duration"]:g}s')
+        try:
+            report = test.run()
+        finally:
+            server.stop()
+        self.print_report(report)
+        if report['errors'] or report['writes']['errors']:
+            self.stdout.write(f'Server log:\n{server.log_tail()}')
+        return {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'settings': {flag: getattr(settings, flag, None) for flag in ('CONTENT_CATALOG', 'CONTENT_DOCUMENTS', 'CONTENT_FAST_READ_PATH')},
+            'options': {key: options[key] for key in (
+                'server', 'workers', 'threads', 'concurrency', 'duration', 'warmup', 'products', 'database', 'writers', 'write_interval', 'seed',
+            )},
+            'mix': weights,
+            **report,
+        }
+
+    def print_report(self, report):
+        def line(label, summary):
+            latency = summary['latency_ms'] or {}
+            return (
+                f'{label:<48} {summary["requests"]:>7} req {summary["rps"]:>8.1f}/s  p50 {latency.get("p50", 0):8.2f}  '
+                f'p95 {latency.get("p95", 0):8.2f}  p99 {latency.get("p99", 0):8.2f}  max {latency.get("max", 0):8.2f} ms  '
+                f'errors {summary["error_rate"]:.2%}'
+            )
+        self.stdout.write(line('all', report))
+        for route in report['routes']:
+            self.stdout.write(line(route['route'], route))
+        if report['error_kinds']:
+            self.stdout.write(f'Errors: {report["error_kinds"]}')
+        writes = report['writes']
+        if writes['writes']:
+            latency = writes['latency_ms']
+            self.stdout.write(
+                f'{"admin saves":<48} {writes["writes"]:>7}     {writes["per_second"]:>8.2f}/s  p50 {latency["p50"]:8.2f}  '
+                f'p95 {latency["p95"]:8.2f}  p99 {latency["p99"]:8.2f}  max {latency["max"]:8.2f} ms  errors {writes["error_rate"]:.2%}'
+            )
+            if writes['error_kinds']:
+                self.stdout.write(f'Save errors: {writes["error_kinds"]}')
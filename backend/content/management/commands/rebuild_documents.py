@@ -0,0 +1,12 @@
+import time
+from django.core.management.base import BaseCommand
+from content.documents import rebuild_documents
+
+
+class Command(BaseCommand):
+    help = 'Re-render the pre-rendered JSON documents of every product, page, category and homepage'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_documents()
+        self.stdout.write(self.style.SUCCESS(f'Rendered {count} documents in {time.monotonic() - started:.1f}s'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from content.models import Translation
+from content.translations import rebuild_translations
+
+
+class Command(BaseCommand):
+    help = 'Resolve the translation links (langslug) of every product, page and category and report dangling ones'
+
+    def handle(self, *args, **options):
+        changed, dangling = rebuild_translations()
+        for kind, lang, slug, langslug, reason in dangling:
+            self.stdout.write(self.style.WARNING(f'{kind} {lang}/{slug}: {langslug!r} {reason}'))
+        self.stdout.write(self.style.SUCCESS(f'Stored {Translation.objects.count()} links, {len(dangling)} dangling'))
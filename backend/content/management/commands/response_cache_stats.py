@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from content.middleware import response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show the hit, miss, stale and coalesced counters of the API response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reading them')
+
+    def handle(self, *args, **options):
+        for name, value in response_cache_stats(reset=options['reset']).items():
+            self.stdout.write(f'{name}: {value}')
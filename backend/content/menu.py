@@ -0,0 +1,45 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from .models import MenuItem
+from .serializers import MenuItemChildSerializer
+from .cache import content_cache
+
+MENU_CACHE_KEY = 'content:menu:{lang}'
+MENU_CACHE_TIMEOUT = getattr(settings, 'MENU_CACHE_TIMEOUT', None)
+
+def _cache_key(lang):
+    return MENU_CACHE_KEY.format(lang=lang or 'all')
+
+def build_menu_tree(lang=None):
+    # One query for the whole menu, the tree is put together in memory
+    items = MenuItem.objects.select_related('page')
+    children = defaultdict(list)
+    for item in items:
+        children[item.parent_id].append(item)
+    roots = children[None]
+    if lang:
+        roots = [item for item in roots if item.lang == lang]
+    serializer = MenuItemChildSerializer(roots, many=True, context={'menu_children': children})
+    return serializer.data
+
+def get_menu_tree(lang=None):
+    if lang and lang not in dict(settings.LANGUAGES):
+        return []
+    key = _cache_key(lang)
+    cache = content_cache()
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_menu_tree(lang)
+        cache.set(key, tree, MENU_CACHE_TIMEOUT)
+    return tree
+
+def _delete_trees():
+    # Children are not filtered by language, so every cached tree is dropped
+    keys = [_cache_key(None)] + [_cache_key(code) for code, _ in settings.LANGUAGES]
+    content_cache().delete_many(keys)
+
+def invalidate_menu():
+    # Again on commit, or a tree built from the rows before it would be kept until the next edit
+    _delete_trees()
+    transaction.on_commit(_delete_trees)
@@ -0,0 +1,261 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.views import APIView
+from .cache import content_cache
+from .compression import add_server_timing, apply_encoding, available_encodings, compress, compress_all, compressible, negotiate
+from .surrogate import SURROGATE_KEY_HEADER
+from .versioning import get_version, version_timestamp
+
+def api_view_class(view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if isinstance(view_class, type) and issubclass(view_class, APIView):
+        return view_class
+    return None
+
+def request_language(request, view_func, view_kwargs):
+    # Views serving every language whatever the URL says set language_scoped = False
+    if not getattr(api_view_class(view_func), 'language_scoped', True):
+        return None
+    lang = view_kwargs.get('lang') or request.GET.get('lang')
+    return lang if lang in dict(settings.LANGUAGES) else None
+
+def request_version(request, view_func, view_kwargs):
+    # Read once per request, so the ETag and the cached body always come from the same version
+    if not hasattr(request, '_content_version'):
+        lang = request_language(request, view_func, view_kwargs)
+        request._content_version = (lang, get_version(lang))
+    return request._content_version
+
+def content_validators(request, version):
+    """ETag and Last-Modified (Unix time) of the request's URL at the given content version."""
+    salt = getattr(settings, 'CONTENT_ETAG_SALT', '')
+    key = '\n'.join([salt, str(version), request.get_full_path(), request.META.get('HTTP_ACCEPT', '')])
+    return '"%s"' % sha256(key.encode()).hexdigest()[:40], int(version_timestamp(version))
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Accept',))
+
+class ConditionalContentMiddleware:
+    """
+    Strong ETag and Last-Modified for every read-only API route, derived from the content version
+    of the route's language (or of all languages), so a matching If-None-Match or If-Modified-Since
+    is answered with 304 before the view or any serializer runs.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        validators = getattr(request, '_content_validators', None)
+        if validators and response.status_code == 200 and not response.has_header('ETag'):
+            set_validators(response, *validators)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or api_view_class(view_func) is None:
+            return None
+        lang, version = request_version(request, view_func, view_kwargs)
+        etag, last_modified = content_validators(request, version)
+        request._content_validators = (etag, last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            set_validators(response, etag, last_modified)
+        return response
+
+RESPONSE_CACHE_KEY = 'content:response:{lang}:{digest}'
+RESPONSE_LOCK_KEY = 'content:response-lock:{version}:{key}'
+RESPONSE_STATS_KEY = 'content:response-stats:{name}'
+RESPONSE_STATS = ('hit', 'miss', 'stale', 'coalesced')
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow', 'Content-Language', SURROGATE_KEY_HEADER)
+
+def response_cache_key(full_path, accept, lang):
+    digest = sha256('\n'.join([full_path, accept]).encode()).hexdigest()
+    return RESPONSE_CACHE_KEY.format(lang=lang or 'all', digest=digest)
+
+def response_lock_key(key, version):
+    return RESPONSE_LOCK_KEY.format(version=version, key=key)
+
+def count(name):
+    cache, key = content_cache(), RESPONSE_STATS_KEY.format(name=name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr; losing one count is fine
+        pass
+
+def response_cache_stats(reset=False):
+    cache = content_cache()
+    keys = {RESPONSE_STATS_KEY.format(name=name): name for name in RESPONSE_STATS}
+    found = cache.get_many(keys)
+    if reset:
+        cache.delete_many(keys)
+    return {name: found.get(key, 0) for key, name in keys.items()}
+
+def detached_request(request):
+    """A copy of a GET request to render on another thread, as the original stays with its own."""
+    return WSGIRequest(dict(request.META, **{'wsgi.input': BytesIO(b'')}))
+
+refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='response-cache')
+
+class ResponseCacheMiddleware:
+    """
+    Caches rendered JSON responses of read-only API routes in the content cache, keyed on the
+    route's language, the full path with query string and the Accept header. Each entry records
+    the content version it was rendered at, so the version bump done by the content signals is
+    the invalidation.
+
+    Concurrent misses for one URL and version are coalesced: the worker that takes the lock
+    renders, the others wait for its entry. With CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE
+    an entry of an older version is served right away (X-Cache: STALE) while the lock holder
+    re-renders it on a background thread.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.timeout = getattr(settings, 'CONTENT_RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24)
+        self.lock_timeout = getattr(settings, 'CONTENT_RESPONSE_CACHE_LOCK_TIMEOUT', 10)
+        self.stale_while_revalidate = getattr(settings, 'CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE', False)
+        self.poll_interval = 0.05
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or api_view_class(view_func) is None:
+            return None
+        cache = content_cache()
+        lang, version = request_version(request, view_func, view_kwargs)
+        key = response_cache_key(request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), lang)
+        request._response_cache = (key, version, None)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            count('hit')
+            return self.build_response(entry, 'HIT', request)
+
+        lock = response_lock_key(key, version)
+        acquired = cache.add(lock, 1, self.lock_timeout)
+        # In-process renders that must be current (e.g. the static snapshot) set this environ key
+        if entry is not None and self.stale_while_revalidate and not request.META.get('content.require_fresh'):
+            if acquired:
+                self.run_in_background(self.refresh, detached_request(request), view_func, view_args, view_kwargs, key, version, lock)
+            count('stale')
+            response = self.build_response(entry, 'STALE', request)
+            set_validators(response, *content_validators(request, entry[0]))
+            return response
+        if acquired:
+            request._response_cache = (key, version, lock)
+        else:
+            entry = self.wait_for(key, version, lock)
+            if entry is not None:
+                count('coalesced')
+                return self.build_response(entry, 'COALESCED', request)
+        count('miss')
+        return None
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            key, version, lock = getattr(request, '_response_cache', (None, None, None))
+            if lock is not None:
+                content_cache().delete(lock)
+        if key is None or response.has_header('X-Cache'):
+            return response
+        entry, seconds = self.store(key, version, response)
+        if entry is not None:
+            apply_encoding(response, request, entry[4])
+            add_server_timing(response, seconds)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def wait_for(self, key, version, lock):
+        cache = content_cache()
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = cache.get(key)
+            if entry is not None and entry[0] == version:
+                return entry
+            if not cache.has_key(lock):
+                # The lock holder is done but left nothing usable (an error, or not cacheable)
+                return None
+        return None
+
+    def refresh(self, request, view_func, view_args, view_kwargs, key, version, lock):
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, 'render'):
+                response = response.render()
+            self.store(key, version, response)
+        finally:
+            content_cache().delete(lock)
+
+    def run_in_background(self, func, *args):
+        def run():
+            try:
+                func(*args)
+            finally:
+                connections.close_all()
+        refresher.submit(run)
+
+    def cacheable(self, response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and response.get('Content-Type', '').startswith('application/json')
+        )
+
+    def store(self, key, version, response):
+        """Cache the response with its compressed copies. Returns the entry and the seconds spent compressing."""
+        if not self.cacheable(response):
+            return None, 0
+        variants, seconds = compress_all(response.content) if compressible(response) else ({}, 0)
+        headers = [(name, response[name]) for name in CACHED_HEADERS if response.has_header(name)]
+        entry = (version, response.status_code, response.content, headers, variants)
+        content_cache().set(key, entry, self.timeout)
+        return entry, seconds
+
+    def build_response(self, entry, state, request):
+        version, status, content, headers, variants = entry
+        response = HttpResponse(content, status=status)
+        for name, value in headers:
+            response[name] = value
+        response['X-Cache'] = state
+        if variants:
+            apply_encoding(response, request, variants)
+            add_server_timing(response, 0, 'cached')
+        return response
+
+class CompressionMiddleware:
+    """
+    gzip (and brotli when installed) for JSON responses, negotiated by Accept-Encoding. Responses
+    from the response cache arrive already encoded; everything else is compressed here. Only JSON
+    is compressed, so no page carrying a CSRF token is exposed to BREACH.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if compressible(response):
+            patch_vary_headers(response, ('Accept-Encoding',))
+            encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), available_encodings())
+            if encoding is not None:
+                started = time.perf_counter()
+                response.content = compress(response.content, encoding)
+                add_server_timing(response, time.perf_counter() - started)
+                response['Content-Encoding'] = encoding
+                response['Content-Length'] = str(len(response.content))
+        etag = response.get('ETag', '')
+        if response.has_header('Content-Encoding') and etag.startswith('"'):
+            # The encoded bytes differ from the identity body the strong ETag was computed for
+            response['ETag'] = 'W/' + etag
+        return response
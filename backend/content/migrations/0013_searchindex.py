@@ -0,0 +1,50 @@
+from html import unescape
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Frozen copies of content.search as of this migration, so later changes there don't alter it
+SEARCH_TABLE = 'content_searchindex'
+KIND_CODES = {'product': 1, 'category': 2, 'page': 3}
+KIND_STRIDE = 4
+
+
+def strip_html(value):
+    return ' '.join(unescape(strip_tags(value or '')).split())
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, lang UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    for model_name, body_fields in (('product', ('pageinfo', 'content')), ('category', ('categoryinfo', 'content')), ('page', ('pageinfo', 'content'))):
+        model = apps.get_model('content', model_name)
+        for row in model.objects.values('pk', 'lang', 'title', *body_fields).iterator():
+            schema_editor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, lang, title, body) VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    row['pk'] * KIND_STRIDE + KIND_CODES[model_name], model_name, row['pk'], row['lang'],
+                    strip_html(row['title']), strip_html(' '.join(row[field] or '' for field in body_fields)),
+                ],
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0012_alter_product_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
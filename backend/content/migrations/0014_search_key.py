@@ -0,0 +1,96 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:21
+
+import re
+import unicodedata
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Frozen copies of content.search as of this migration, so later changes there don't alter it
+SEARCH_TABLE = 'content_searchindex'
+KIND_CODES = {'product': 1, 'category': 2, 'page': 3}
+KIND_STRIDE = 4
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+TURKISH_UPPER = str.maketrans({'I': 'ı', 'İ': 'i'})
+TRIGRAM_MAX_TERM_LENGTH = 64
+
+
+def strip_html(value):
+    return ' '.join(unescape(strip_tags(value or '')).split())
+
+
+def normalize(value):
+    text = strip_html(value).translate(TURKISH_UPPER).lower()
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.replace('ı', 'i')))
+
+
+def search_key(*values):
+    return normalize(' '.join(value or '' for value in values))
+
+
+def trigrams(term):
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def fill_search_keys(apps, schema_editor):
+    SearchTrigram = apps.get_model('content', 'SearchTrigram')
+    sqlite = schema_editor.connection.vendor == 'sqlite'
+    terms = set()
+    for model_name, body_fields in (('product', ('pageinfo', 'content')), ('category', ('categoryinfo', 'content')), ('page', ('pageinfo', 'content'))):
+        model = apps.get_model('content', model_name)
+        for obj in model.objects.all().iterator():
+            body = search_key(*[getattr(obj, field) for field in body_fields])
+            obj.search_key = search_key(obj.title, body)
+            model.objects.filter(pk=obj.pk).update(search_key=obj.search_key)
+            terms.update(term for term in obj.search_key.split() if 3 <= len(term) <= TRIGRAM_MAX_TERM_LENGTH and not term.isdigit())
+            if sqlite:
+                # Re-index with normalized text so queries and documents fold the same way
+                schema_editor.execute(
+                    f'UPDATE {SEARCH_TABLE} SET title = %s, body = %s WHERE rowid = %s',
+                    [normalize(obj.title), body, obj.pk * KIND_STRIDE + KIND_CODES[model_name]],
+                )
+    SearchTrigram.objects.bulk_create(
+        [SearchTrigram(trigram=trigram, term=term) for term in terms for trigram in trigrams(term)],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0013_searchindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='search_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='search_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('term', models.CharField(db_index=True, max_length=64)),
+            ],
+            options={
+                'unique_together': {('trigram', 'term')},
+            },
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+    ]
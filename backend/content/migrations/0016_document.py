@@ -0,0 +1,42 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0015_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('key', models.CharField(db_index=True, max_length=64)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='content_dockey_doc')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('lang', models.CharField(blank=True, max_length=7)),
+                ('slug', models.CharField(blank=True, max_length=255)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('body', models.TextField()),
+                ('keys', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'lang', 'order', 'object_id'], name='content_doc_list'), models.Index(fields=['kind', 'slug'], name='content_doc_slug')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0016_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Translation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('lang', models.CharField(max_length=7)),
+                ('slug', models.CharField(max_length=255)),
+                ('target_lang', models.CharField(max_length=7)),
+                ('target_slug', models.CharField(max_length=255)),
+            ],
+            options={
+                'unique_together': {('kind', 'lang', 'slug', 'target_lang')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0017_translation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='homepage',
+            name='lang',
+            field=models.CharField(blank=True, choices=[('en', 'English'), ('tr', 'Turkish')], db_index=True, default='en', max_length=7, verbose_name='Language'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['lang', 'order', 'id'], name='content_category_lang_order'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['kind', 'order', 'object_id'], name='content_doc_list_all'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['lang', 'order'], name='content_menu_lang_order'),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['lang', 'order', 'id'], name='content_page_lang_order'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['lang', 'order', 'id'], name='content_product_lang_order'),
+        ),
+        # Products of a category (categories__slug, categories=) read the through table by
+        # category; the auto-created table only has (product_id, category_id) and category_id
+        migrations.RunSQL(
+            'CREATE INDEX content_product_categories_category_product ON content_product_categories (category_id, product_id)',
+            'DROP INDEX content_product_categories_category_product',
+        ),
+    ]
@@ -6,10 +6,12 @@ from django.utils.translation import gettext_lazy as _
 from ckeditor.fields import RichTextField
 from django.utils.html import format_html
 from django.core.validators import URLValidator
+from .search import search_key
 
 class Image(models.Model):
     image = models.ImageField(upload_to='images/')
     alt_text = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.alt_text
@@ -26,9 +28,11 @@ class MenuItem(models.Model):
     newtab = models.BooleanField(default=False, verbose_name="Open in new Tab")
     order = models.PositiveIntegerField(default=0, db_index=True)
     lang = models.CharField(max_length=7, choices=settings.LANGUAGES, default='en', blank=True, verbose_name="Language")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['lang', 'order'], name='content_menu_lang_order')]
 
     def __str__(self):
         return self.title
@@ -37,9 +41,12 @@ class MenuItem(models.Model):
     def is_submenu(self):
         return True if self.parent else False
 
+    def page_link(self):
+        return reverse('page-detail', kwargs={'lang': self.page.lang, 'slug': self.page.slug})
+
     def save(self, *args, **kwargs):
         if self.page:
-            self.link = reverse('page-detail', kwargs={'lang': self.page.lang, 'slug': self.page.slug})
+            self.link = self.page_link()
         super().save(*args, **kwargs)
 
 class Tag(models.Model):
@@ -63,13 +70,18 @@ class Category(models.Model):
     image = models.ForeignKey('Image', on_delete=models.SET_NULL, blank=True, null=True, verbose_name="Selected Image", related_name="category_image")
     lang = models.CharField(max_length=7, choices=settings.LANGUAGES, default='en', blank=True, verbose_name="Language")
     order = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    search_key = models.TextField(blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order']
+        # Language lists in keyset order, see KeysetCursorPagination
+        indexes = [models.Index(fields=['lang', 'order', 'id'], name='content_category_lang_order')]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self.search_key = search_key(self.title, self.categoryinfo, self.content)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -98,13 +110,18 @@ class Product(models.Model):
     categories = models.ManyToManyField(Category, blank=True)
     lang = models.CharField(max_length=7, choices=settings.LANGUAGES, default='en', blank=True, verbose_name="Language")
     order = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    search_key = models.TextField(blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order']
+        # Language lists in keyset order, see KeysetCursorPagination
+        indexes = [models.Index(fields=['lang', 'order', 'id'], name='content_product_lang_order')]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self.search_key = search_key(self.title, self.pageinfo, self.content)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -131,14 +148,19 @@ class Page(models.Model):
     images = models.ManyToManyField('Image', blank=True, verbose_name="Select Content Images", related_name="page_images")
     lang = models.CharField(max_length=7, choices=settings.LANGUAGES, default='en', blank=True, verbose_name="Language")
     order = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    search_key = models.TextField(blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     
     class Meta:
         ordering = ['order']
+        # Language lists in keyset order, see KeysetCursorPagination
+        indexes = [models.Index(fields=['lang', 'order', 'id'], name='content_page_lang_order')]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self.search_key = search_key(self.title, self.pageinfo, self.content)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -154,13 +176,25 @@ class Page(models.Model):
     def image_urls(self):
         return [image.image.url for image in self.images.all()]
 
+class SearchTrigram(models.Model):
+    # Trigrams of every normalized term in the search index, used to correct misspelled queries
+    trigram = models.CharField(max_length=3)
+    term = models.CharField(max_length=64, db_index=True)
+
+    class Meta:
+        unique_together = ('trigram', 'term')
+
+    def __str__(self):
+        return f'{self.trigram} {self.term}'
+
 class HomePage(models.Model):
     title = models.CharField(max_length=255, verbose_name="Site Title")
     pageinfo = models.TextField(blank=True, verbose_name="Site Description")
     content = RichTextField()
     images = models.ManyToManyField('Image', blank=True, verbose_name="Select Content Images", related_name="home_images")
     products = models.ManyToManyField('Product', blank=True, verbose_name="Select Products to display on Homepage")
-    lang = models.CharField(max_length=7, choices=settings.LANGUAGES, default='en', blank=True, verbose_name="Language")
+    lang = models.CharField(max_length=7, choices=settings.LANGUAGES, default='en', blank=True, verbose_name="Language", db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -190,4 +224,51 @@ class Social(models.Model):
     @classmethod
     def load(cls):
         obj, created = cls.objects.get_or_create(pk=1)
-        return obj
\ No newline at end of file
+        return obj
+
+class Document(models.Model):
+    # Pre-rendered JSON of one object as a public route shows it, see content/documents.py
+    kind = models.CharField(max_length=16)
+    object_id = models.PositiveIntegerField()
+    lang = models.CharField(max_length=7, blank=True)
+    slug = models.CharField(max_length=255, blank=True)
+    order = models.PositiveIntegerField(default=0)
+    body = models.TextField()
+    keys = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+        indexes = [
+            models.Index(fields=['kind', 'lang', 'order', 'object_id'], name='content_doc_list'),
+            models.Index(fields=['kind', 'order', 'object_id'], name='content_doc_list_all'),
+            models.Index(fields=['kind', 'slug'], name='content_doc_slug'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
+
+class DocumentKey(models.Model):
+    # Surrogate keys of everything a document embeds, to find the documents an edit invalidates
+    kind = models.CharField(max_length=16)
+    object_id = models.PositiveIntegerField()
+    key = models.CharField(max_length=64, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['kind', 'object_id'], name='content_dockey_doc')]
+
+    def __str__(self):
+        return self.key
+
+class Translation(models.Model):
+    # Resolved langslug links: the slug of an object's counterpart in each language, see content/translations.py
+    kind = models.CharField(max_length=16)
+    lang = models.CharField(max_length=7)
+    slug = models.CharField(max_length=255)
+    target_lang = models.CharField(max_length=7)
+    target_slug = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('kind', 'lang', 'slug', 'target_lang')
+
+    def __str__(self):
+        return f'{self.kind} {self.lang}/{self.slug} -> {self.target_lang}/{self.target_slug}'
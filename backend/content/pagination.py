@@ -0,0 +1,111 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .search import RANK_ANNOTATION
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Opt-in keyset pagination over a unique composite ordering, e.g. ('order', 'id').
+    Without ?cursor= or ?page_size= the full list is returned as before. The cursor holds the
+    ordering values of the edge row, so each page is one indexed range query of page_size + 1
+    rows, and rows moved by admin reordering never shift the pages that follow. Results of
+    FullTextSearchFilter are paged over their rank instead, so the best hits come first.
+    """
+    ordering = ('order', 'id')
+    search_ordering = (RANK_ANNOTATION, 'id')
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            # Every ordering column is an integer; anything else would reach the query as is
+            position, reverse = [int(value) for value in data['p']], bool(data['r'])
+            if len(position) != len(self.ordering):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def position_of(self, row):
+        return [getattr(row, field) for field in self.ordering]
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return replace_query_param(self.base_url, self.cursor_query_param, urlsafe_b64encode(data.encode('ascii')).decode('ascii'))
+
+    def after(self, position, reverse):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {self.ordering[j]: position[j] for j in range(i)}
+            condition |= Q(**equal, **{f'{field}__{lookup}': position[i]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        if RANK_ANNOTATION in queryset.query.annotations:
+            self.ordering = self.search_ordering
+        size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [f'-{field}' for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        self.next_link = self.previous_link = None
+        if rows:
+            if has_more or reverse:
+                self.next_link = self.encode_cursor(self.position_of(rows[-1]), reverse=False)
+            if (has_more and reverse) or (position is not None and not reverse):
+                self.previous_link = self.encode_cursor(self.position_of(rows[0]), reverse=True)
+        elif position is not None:
+            # Empty page past either end; offer a way back from the same position
+            if reverse:
+                self.next_link = self.encode_cursor(position, reverse=False)
+            else:
+                self.previous_link = self.encode_cursor(position, reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+class IdCursorPagination(KeysetCursorPagination):
+    ordering = ('id',)
+
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
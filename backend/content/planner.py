@@ -0,0 +1,113 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from .serializers import sparse_fieldset_requested
+
+# Derives select_related/prefetch_related for a queryset from the serializer tree that will render it.
+# Nested serializers are followed recursively. SerializerMethodFields can't be inspected, so serializers
+# declare what their methods touch with `select_related` / `prefetch_related` on their Meta, either as
+# a list or as {field name: lookups} so the lookups are dropped along with the field (see ?fields=).
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+def _walk(model, fields, hints):
+    select, prefetch = [], []
+
+    def add_select(path, related_model, child=None):
+        select.append(path)
+        if child is not None:
+            sub_select, sub_prefetch = _spec_for(related_model, child)
+            select.extend(f'{path}__{lookup}' for lookup in sub_select)
+            prefetch.extend((f'{path}__{lookup}', sub_model, sub_spec) for lookup, sub_model, sub_spec in sub_prefetch)
+
+    for name in hints.get('select_related', ()):
+        add_select(name, None)
+    for name in hints.get('prefetch_related', ()):
+        prefetch.append((name, None, None))
+
+    for field in fields.values():
+        if field.source == '*' or not field.source_attrs:
+            continue
+        relation = _relation(model, field.source_attrs[0])
+        if relation is None:
+            continue
+        many = relation.many_to_many or relation.one_to_many
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+            prefetch.append((field.source_attrs[0], relation.related_model, _spec_for(relation.related_model, field.child)))
+        elif isinstance(field, serializers.ModelSerializer):
+            if many:
+                prefetch.append((field.source_attrs[0], relation.related_model, _spec_for(relation.related_model, field)))
+            else:
+                add_select(field.source_attrs[0], relation.related_model, field)
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.append((field.source_attrs[0], None, None))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField) and len(field.source_attrs) == 1:
+            # The pk is read from the local <name>_id column, no join needed
+            continue
+        elif many:
+            prefetch.append((field.source_attrs[0], None, None))
+        else:
+            add_select(field.source_attrs[0], relation.related_model)
+    return tuple(dict.fromkeys(select)), tuple(prefetch)
+
+def _hints(value, fields):
+    if isinstance(value, dict):
+        return [lookup for name, lookups in value.items() if name in fields for lookup in lookups]
+    return list(value)
+
+def _spec_for(model, serializer):
+    meta = getattr(serializer, 'Meta', None)
+    fields = serializer.fields
+    hints = {
+        'select_related': _hints(getattr(meta, 'select_related', ()), fields),
+        'prefetch_related': _hints(getattr(meta, 'prefetch_related', ()), fields),
+    }
+    return _walk(model, fields, hints)
+
+@lru_cache(maxsize=None)
+def _class_spec(model, serializer_class):
+    return _spec_for(model, serializer_class())
+
+def get_plan(model, serializer):
+    if isinstance(serializer, type):
+        return _class_spec(model, serializer)
+    return _spec_for(model, serializer)
+
+def _build(queryset, spec):
+    select, prefetch = spec
+    if select:
+        queryset = queryset.select_related(*select)
+    lookups = []
+    for path, related_model, sub_spec in prefetch:
+        if related_model is None:
+            lookups.append(path)
+        else:
+            lookups.append(Prefetch(path, queryset=_build(related_model._default_manager.all(), sub_spec)))
+    if lookups:
+        queryset = queryset.prefetch_related(*lookups)
+    return queryset
+
+def plan_queryset(queryset, serializer):
+    """Apply the select_related/prefetch_related a serializer (class or instance) needs to a queryset."""
+    return _build(queryset, get_plan(queryset.model, serializer))
+
+class QueryPlannerMixin:
+    """
+    Viewset mixin that plans the queryset for the serializer it is rendered with, including any
+    ?fields= / ?omit= sparse fieldset. Viewsets with their own filtering override get_base_queryset
+    instead of get_queryset.
+    """
+    def get_base_queryset(self):
+        return super().get_queryset()
+
+    def get_queryset(self):
+        serializer = self.get_serializer_class()
+        if sparse_fieldset_requested(getattr(self, 'request', None)):
+            serializer = self.get_serializer()
+        return plan_queryset(self.get_base_queryset(), serializer)
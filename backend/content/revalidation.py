@@ -0,0 +1,202 @@
+import logging
+import re
+import threading
+import time
+import requests
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from .batch import render
+from .models import Category, Product, Page, Image, HomePage, MenuItem, Social
+from .snapshot import request_meta
+
+# On-demand revalidation of the Next.js frontend. Content signals work out which frontend paths an
+# edit changes and queue them; a background thread waits for the edits to settle (debounce) and
+# POSTs the paths in batches to FRONTEND_REVALIDATE_URL, retrying failed calls.
+# Paths are the frontend's internal routes, /<lang>/product/<slug> and so on.
+#
+# The frontend keeps what it fetches while re-rendering a path until the next revalidation, so
+# before the call the API routes those pages fetch are rendered at the new content version into
+# the response cache, so the frontend is never handed a body from before the edit (an entry served
+# stale-while-revalidate).
+
+logger = logging.getLogger(__name__)
+
+# The API routes the frontend's server components fetch per path (frontend/src/app/[locale]),
+# after the redirect to the trailing slash, as the response cache keys them
+FRONTEND_FETCHES = (
+    (re.compile(r'/(?P<lang>[\w-]+)'), ('/api/{lang}/homepage/', '/api/categories/')),
+    (re.compile(r'/(?P<lang>[\w-]+)/product/(?P<slug>[^/]+)'), ('/api/{lang}/product/{slug}/',)),
+    (re.compile(r'/(?P<lang>[\w-]+)/products'), ('/api/{lang}/products/',)),
+    (re.compile(r'/(?P<lang>[\w-]+)/category/(?P<slug>[^/]+)'), ('/api/categories/', '/api/products/')),
+    (re.compile(r'/(?P<lang>[\w-]+)/categories'), ('/api/categories/',)),
+    (re.compile(r'/(?P<lang>[\w-]+)/page/(?P<slug>[^/]+)'), ('/api/{lang}/page/{slug}/',)),
+    (re.compile(r'/(?P<lang>[\w-]+)/pages'), ('/api/{lang}/pages/',)),
+)
+
+def revalidation_enabled():
+    return bool(getattr(settings, 'FRONTEND_REVALIDATE_URL', None))
+
+def home_path(lang):
+    return f'/{lang}'
+
+def product_paths(product):
+    paths = {f'/{product.lang}/product/{product.slug}', f'/{product.lang}/products'}
+    paths |= {f'/{lang}/category/{slug}' for lang, slug in product.categories.values_list('lang', 'slug')}
+    paths |= {home_path(lang) for lang in product.homepage_set.values_list('lang', flat=True)}
+    return paths
+
+def category_paths(category):
+    # Product pages and cards show the names of their categories
+    paths = {f'/{category.lang}/category/{category.slug}', f'/{category.lang}/categories'}
+    for lang, slug in category.product_set.values_list('lang', 'slug'):
+        paths |= {f'/{lang}/product/{slug}', f'/{lang}/products'}
+    return paths
+
+def page_paths(page):
+    return {f'/{page.lang}/page/{page.slug}', f'/{page.lang}/pages'}
+
+def image_paths(image):
+    paths = set()
+    for product in Product.objects.filter(Q(image=image) | Q(images=image)).distinct():
+        paths |= product_paths(product)
+    for page in Page.objects.filter(Q(image=image) | Q(images=image)).distinct():
+        paths |= page_paths(page)
+    for category in Category.objects.filter(image=image):
+        paths.add(f'/{category.lang}/category/{category.slug}')
+        paths.add(f'/{category.lang}/categories')
+    paths |= {home_path(lang) for lang in image.home_images.values_list('lang', flat=True)}
+    return paths
+
+def affected_paths(instance):
+    """Frontend paths rendering the instance, and whether the shared layout (menu, social links) changed."""
+    if isinstance(instance, Product):
+        return product_paths(instance), False
+    if isinstance(instance, Category):
+        return category_paths(instance), False
+    if isinstance(instance, Page):
+        # Menu items link to their page by slug
+        return page_paths(instance), MenuItem.objects.filter(page=instance.pk).exists()
+    if isinstance(instance, HomePage):
+        return {home_path(instance.lang)}, False
+    if isinstance(instance, Image):
+        return image_paths(instance), False
+    if isinstance(instance, (MenuItem, Social)):
+        return set(), True
+    return set(), False
+
+def fetched_routes(paths):
+    """The API routes the frontend fetches to render the paths, in a stable order."""
+    routes = []
+    for path in sorted(paths):
+        for pattern, fetches in FRONTEND_FETCHES:
+            match = pattern.fullmatch(path)
+            if match:
+                routes += [route.format(**match.groupdict()) for route in fetches]
+                break
+    return list(dict.fromkeys(routes))
+
+class RevalidationQueue:
+    """
+    Collects paths and sends them from one background thread once no new path arrived for the
+    debounce interval, or at the latest MAX_WAIT seconds after the first one.
+    """
+    def __init__(self):
+        self.paths = set()
+        self.layout = False
+        self.condition = threading.Condition()
+        self.thread = None
+        self.first_added = self.last_added = 0.0
+
+    def setting(self, name, default):
+        return getattr(settings, f'FRONTEND_REVALIDATE_{name}', default)
+
+    def add(self, paths, layout=False):
+        with self.condition:
+            if not self.paths and not self.layout:
+                self.first_added = time.monotonic()
+            self.paths |= set(paths)
+            self.layout = self.layout or layout
+            self.last_added = time.monotonic()
+            if self.thread is None or not self.thread.is_alive():
+                # Started lazily, so every forked gunicorn worker gets its own
+                self.thread = threading.Thread(target=self.run, name='frontend-revalidation', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def take(self):
+        with self.condition:
+            paths, layout = self.paths, self.layout
+            self.paths, self.layout = set(), False
+        return paths, layout
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.paths and not self.layout:
+                    self.condition.wait()
+                debounce, max_wait = self.setting('DEBOUNCE', 2.0), self.setting('MAX_WAIT', 10.0)
+                while True:
+                    now = time.monotonic()
+                    remaining = min(self.last_added + debounce, self.first_added + max_wait) - now
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            try:
+                self.flush()
+            except Exception:
+                # The thread has to outlive a failed batch, or every later edit would be dropped
+                logger.exception('Frontend revalidation failed')
+
+    def flush(self):
+        paths, layout = self.take()
+        if not paths and not layout:
+            return
+        try:
+            self.warm(paths)
+        except Exception:
+            # A stale first fetch beats no revalidation at all
+            logger.exception('Warming before revalidation failed')
+        paths, size = sorted(paths), self.setting('BATCH_SIZE', 50)
+        batches = [paths[start:start + size] for start in range(0, len(paths), size)] or [[]]
+        for i, batch in enumerate(batches):
+            self.send({'paths': batch, 'layout': layout and i == 0})
+
+    def warm(self, paths):
+        """Render the routes behind the paths at the current content version into the response cache."""
+        if not self.setting('WARM', True):
+            return
+        meta, accept = request_meta((settings.ALLOWED_HOSTS or ['localhost'])[0]), self.setting('FETCH_ACCEPT', '*/*')
+        try:
+            for route in fetched_routes(paths):
+                response = render(route, meta, accept)
+                if response.status_code >= 500:
+                    logger.error('Warming %s before revalidation failed with %s', route, response.status_code)
+        finally:
+            connections.close_all()
+
+    def send(self, payload):
+        url, retries = settings.FRONTEND_REVALIDATE_URL, self.setting('RETRIES', 3)
+        headers = {'X-Revalidate-Secret': self.setting('SECRET', '')}
+        for attempt in range(retries + 1):
+            try:
+                response = requests.post(url, json=payload, headers=headers, timeout=self.setting('TIMEOUT', 5))
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return True
+            except requests.HTTPError:
+                # 4xx: a wrong secret or URL won't fix itself
+                logger.exception('Frontend revalidation rejected')
+                return False
+            except requests.RequestException:
+                pass
+            if attempt < retries:
+                time.sleep(self.setting('BACKOFF', 1.0) * 2 ** attempt)
+        logger.error('Frontend revalidation failed after %s attempts: %s', retries + 1, payload['paths'])
+        return False
+
+revalidator = RevalidationQueue()
+
+def schedule_revalidation(paths, layout=False):
+    if paths or layout:
+        transaction.on_commit(lambda: revalidator.add(paths, layout))
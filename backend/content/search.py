@@ -0,0 +1,266 @@
+import re
+import unicodedata
+from html import unescape
+from django.db import connection, transaction
+from django.db.models import Case, Count, When, IntegerField
+from django.utils.html import strip_tags
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+# Full-text index over products, categories and pages, backed by an SQLite FTS5 virtual table
+# (created in migration 0013). Each object has a fixed rowid derived from its kind and pk,
+# so updating or removing it is a rowid lookup rather than a scan.
+# Indexed text and queries both go through normalize(), so matching is Turkish-aware and
+# accent-insensitive. Misspelled words are corrected against a trigram index of the indexed
+# vocabulary (SearchTrigram) before falling back to no results.
+
+SEARCH_TABLE = 'content_searchindex'
+KIND_CODES = {'product': 1, 'category': 2, 'page': 3}
+KIND_STRIDE = 4
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+TURKISH_UPPER = str.maketrans({'I': 'ı', 'İ': 'i'})
+TRIGRAM_MIN_SIMILARITY = 0.3
+TRIGRAM_MAX_TERM_LENGTH = 64
+REBUILD_CHUNK_SIZE = 500
+# Position of a row among the hits of ?search=, which KeysetCursorPagination pages over
+RANK_ANNOTATION = 'search_rank'
+
+def strip_html(value):
+    return ' '.join(unescape(strip_tags(value or '')).split())
+
+def normalize(value):
+    """Strip HTML, fold case the Turkish way (I -> ı, İ -> i), drop diacritics and collapse to words."""
+    text = strip_html(value).translate(TURKISH_UPPER).lower()
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.replace('ı', 'i')))
+
+def search_key(*values):
+    return normalize(' '.join(value or '' for value in values))
+
+def trigrams(term):
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+def kind_for(model):
+    return model._meta.model_name
+
+def _rowid(kind, pk):
+    return pk * KIND_STRIDE + KIND_CODES[kind]
+
+def body_fields(kind):
+    return ('categoryinfo', 'content') if kind == 'category' else ('pageinfo', 'content')
+
+def document_for(instance):
+    kind = kind_for(type(instance))
+    return {
+        'rowid': _rowid(kind, instance.pk),
+        'kind': kind,
+        'object_id': instance.pk,
+        'lang': instance.lang,
+        'title': normalize(instance.title),
+        'body': search_key(*[getattr(instance, field) for field in body_fields(kind)]),
+    }
+
+def terms_of(text):
+    return {term for term in text.split() if 3 <= len(term) <= TRIGRAM_MAX_TERM_LENGTH and not term.isdigit()}
+
+def store_terms(terms):
+    from .models import SearchTrigram
+    SearchTrigram.objects.bulk_create(
+        [SearchTrigram(trigram=trigram, term=term) for term in terms for trigram in trigrams(term)],
+        batch_size=REBUILD_CHUNK_SIZE, ignore_conflicts=True,
+    )
+
+def indexed(term):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s LIMIT 1', ['"%s"' % term])
+        return cursor.fetchone() is not None
+
+def update_terms(previous, current):
+    """Store the terms of a changed search key the vocabulary lacks, and drop those no indexed object has anymore."""
+    from .models import SearchTrigram
+    old, new = terms_of(previous or ''), terms_of(current or '')
+    added, removed = sorted(new - old), old - new
+    for start in range(0, len(added), REBUILD_CHUNK_SIZE):
+        chunk = added[start:start + REBUILD_CHUNK_SIZE]
+        known = set(SearchTrigram.objects.filter(term__in=chunk).values_list('term', flat=True).distinct())
+        store_terms(set(chunk) - known)
+    # Run after the object's row is replaced or deleted, so only the other objects count
+    orphaned = sorted(term for term in removed if not indexed(term))
+    for start in range(0, len(orphaned), REBUILD_CHUNK_SIZE):
+        SearchTrigram.objects.filter(term__in=orphaned[start:start + REBUILD_CHUNK_SIZE]).delete()
+
+INSERT_SQL = f'INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, lang, title, body) VALUES (%s, %s, %s, %s, %s, %s)'
+
+def document_row(document):
+    return [document['rowid'], document['kind'], document['object_id'], document['lang'], document['title'], document['body']]
+
+def index_object(instance):
+    if not search_available():
+        return
+    document = document_for(instance)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [document['rowid']])
+        cursor.execute(INSERT_SQL, document_row(document))
+    # The search key the row had before the save, see signals.remember_search_key; None for new objects
+    previous = getattr(instance, '_previous_search_key', None)
+    if previous != instance.search_key:
+        update_terms(previous, instance.search_key)
+
+def remove_object(instance):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [_rowid(kind_for(type(instance)), instance.pk)])
+    update_terms(instance.search_key, None)
+
+def rebuild_index():
+    from .models import Product, Category, Page, SearchTrigram
+    if not search_available():
+        return 0
+    # One transaction, rows inserted in batches and the vocabulary stored once at the end
+    count, terms = 0, set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        SearchTrigram.objects.all().delete()
+        for model in (Product, Category, Page):
+            fields = ('lang', 'title', 'search_key') + body_fields(kind_for(model))
+            rows = []
+            for instance in model.objects.only(*fields).iterator(chunk_size=REBUILD_CHUNK_SIZE):
+                rows.append(document_row(document_for(instance)))
+                terms |= terms_of(instance.search_key)
+                if len(rows) == REBUILD_CHUNK_SIZE:
+                    cursor.executemany(INSERT_SQL, rows)
+                    count, rows = count + len(rows), []
+            if rows:
+                cursor.executemany(INSERT_SQL, rows)
+                count += len(rows)
+        store_terms(terms)
+    return count
+
+def build_match(words, prefix=True):
+    """Turn normalized words into an FTS5 MATCH expression: every word must match, the last one as a prefix."""
+    if not words:
+        return None
+    terms = ['"%s"' % word for word in words]
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+def correct_term(term):
+    """Return the indexed term closest to `term` by trigram similarity, or None."""
+    from .models import SearchTrigram
+    if SearchTrigram.objects.filter(term=term).exists():
+        return term
+    query_trigrams = trigrams(term)
+    candidates = (
+        SearchTrigram.objects.filter(trigram__in=query_trigrams)
+        .values('term').annotate(shared=Count('trigram')).order_by('-shared', 'term')[:20]
+    )
+    best, best_similarity = None, TRIGRAM_MIN_SIMILARITY
+    for candidate in candidates:
+        shared = candidate['shared']
+        similarity = shared / (len(query_trigrams) + len(trigrams(candidate['term'])) - shared)
+        if similarity > best_similarity:
+            best, best_similarity = candidate['term'], similarity
+    return best
+
+def resolve_match(query, kinds=None, lang=None):
+    """Exact (prefix) match when it finds anything, otherwise the query with misspelled words corrected."""
+    words = normalize(query).split()
+    match = build_match(words)
+    if match is None or not search_available() or count(match, kinds, lang):
+        return match
+    corrected = [correct_term(word) if len(word) >= 3 else word for word in words]
+    if None in corrected or corrected == words:
+        return match
+    return build_match(corrected, prefix=False)
+
+def _where(match, kinds, lang):
+    clauses = [f'{SEARCH_TABLE} MATCH %s']
+    params = [match]
+    if kinds:
+        clauses.append('kind IN (%s)' % ', '.join(['%s'] * len(kinds)))
+        params.extend(kinds)
+    if lang:
+        clauses.append('lang = %s')
+        params.append(lang)
+    return ' AND '.join(clauses), params
+
+def search(match, kinds=None, lang=None, limit=None, offset=0):
+    """Return BM25-ordered hits as dicts with kind, object_id, lang, rank and a highlighted snippet."""
+    if match is None or not search_available():
+        return []
+    where, params = _where(match, kinds, lang)
+    sql = (
+        f"SELECT kind, object_id, lang, bm25({SEARCH_TABLE}, 0, 0, 0, %s, %s) AS rank, "
+        f"snippet({SEARCH_TABLE}, 4, '<mark>', '</mark>', '…', 12) "
+        f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY rank"
+    )
+    params = [TITLE_WEIGHT, BODY_WEIGHT] + params
+    if limit is not None:
+        sql += ' LIMIT %s OFFSET %s'
+        params += [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {'kind': kind, 'object_id': object_id, 'lang': row_lang, 'rank': rank, 'snippet': snippet}
+        for kind, object_id, row_lang, rank, snippet in rows
+    ]
+
+def count(match, kinds=None, lang=None):
+    if match is None or not search_available():
+        return 0
+    where, params = _where(match, kinds, lang)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}', params)
+        return cursor.fetchone()[0]
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter that answers ?search= from the FTS5 index and orders by rank.
+    Falls back to icontains on `search_fields` when the database has no FTS5 index.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if not search_available():
+            return SearchFilter().filter_queryset(request, queryset, view)
+        kinds = [kind_for(queryset.model)]
+        ids = [hit['object_id'] for hit in search(resolve_match(query, kinds), kinds)]
+        if not ids:
+            return queryset.none()
+        position = Case(*[When(pk=pk, then=i) for i, pk in enumerate(ids)], output_field=IntegerField())
+        return queryset.filter(pk__in=ids).annotate(**{RANK_ANNOTATION: position}).order_by(RANK_ANNOTATION)
+
+class SearchHits:
+    """Lazy, sliceable result set so DRF paginators can page through index hits with LIMIT/OFFSET."""
+    def __init__(self, query, kinds=None, lang=None):
+        self.match = resolve_match(query, kinds, lang)
+        self.kinds = kinds
+        self.lang = lang
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = count(self.match, self.kinds, self.lang)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        return search(self.match, self.kinds, self.lang, limit=max(stop - start, 0), offset=start)
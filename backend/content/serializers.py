@@ -1,6 +1,64 @@
 from rest_framework import serializers, generics
 from urllib.parse import urlparse
 from .models import Category, Tag, Product, Page, Image, HomePage, MenuItem, Social
+from .surrogate import object_key
+
+def parse_fieldset(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+def sparse_fieldset_requested(request):
+    return request is not None and ('fields' in request.query_params or 'omit' in request.query_params)
+
+class SparseFieldsetMixin:
+    """
+    Honour ?fields=title,categories.slug and ?omit=content on the root serializer, passing dotted
+    paths down to nested serializers. Fields are dropped in get_fields, before anything is rendered,
+    so the query planner never prefetches relations that were not asked for.
+    """
+    def sparse_fieldset(self):
+        if hasattr(self, '_sparse_fieldset'):
+            return self._sparse_fieldset
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        request = self.context.get('request')
+        if parent is None and sparse_fieldset_requested(request):
+            return parse_fieldset(request.query_params.get('fields')), parse_fieldset(request.query_params.get('omit'))
+        return set(), set()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, omit = self.sparse_fieldset()
+        if not only and not omit:
+            return fields
+        top_level = {path.split('.', 1)[0] for path in only}
+        for name in list(fields):
+            if (only and name not in top_level) or name in omit:
+                del fields[name]
+                continue
+            nested = fields[name].child if isinstance(fields[name], serializers.ListSerializer) else fields[name]
+            if isinstance(nested, SparseFieldsetMixin):
+                prefix = f'{name}.'
+                nested._sparse_fieldset = (
+                    set() if name in only else {path[len(prefix):] for path in only if path.startswith(prefix)},
+                    {path[len(prefix):] for path in omit if path.startswith(prefix)},
+                )
+        return fields
+
+class SurrogateKeyMixin:
+    """
+    Adds the surrogate key of every rendered object, and of the foreign keys in
+    surrogate_relations, to the view's keys (see content/surrogate.py).
+    """
+    surrogate_relations = ()
+
+    def to_representation(self, instance):
+        keys = self.context.get('surrogate_keys')
+        if keys is not None:
+            keys.add(object_key(instance))
+            for name in self.surrogate_relations:
+                related_id = getattr(instance, f'{name}_id')
+                if related_id is not None:
+                    keys.add(f'{instance._meta.get_field(name).related_model._meta.model_name}:{related_id}')
+        return super().to_representation(instance)
 
 class FilteredEmptyDictListSerializer(serializers.ListSerializer):
     def to_representation(self, data):
@@ -26,8 +84,11 @@ class MenuItemChildSerializer(serializers.ModelSerializer):
         return obj.link
 
     def get_children(self, obj):
-        # Get all child items for this parent
-        children = MenuItem.objects.filter(parent=obj.id)
+        # Get all child items for this parent, from the prebuilt map when the tree is built in one query
+        if 'menu_children' in self.context:
+            children = self.context['menu_children'].get(obj.id)
+        else:
+            children = MenuItem.objects.filter(parent=obj.id)
         if children:
             # Serialize the child items recursively
             serializer = MenuItemChildSerializer(children, many=True, context=self.context)
@@ -44,12 +105,14 @@ class MenuItemSerializer(MenuItemChildSerializer):
             return {}
         return super(MenuItemSerializer, self).to_representation(instance)
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    surrogate_relations = ('image',)
 
     class Meta:
         model = Category
         fields = ['title', 'lang', 'slug', 'langslug', 'categoryinfo', 'content', 'image']
+        select_related = {'image': ['image']}
 
     def get_image(self, obj):
         if obj.image:
@@ -61,51 +124,102 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ['title', 'slug']
 
-class ImageSerializer(serializers.ModelSerializer):
+class ImageSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Image
-        fields = '__all__'
+        fields = ['id', 'image', 'alt_text']
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         request = self.context.get('request')
-        if representation['image']:
+        if representation.get('image'):
             representation['image'] = instance.image.url
         return representation
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     images = ImageSerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField() 
+    surrogate_relations = ('image',)
 
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['search_key', 'updated_at']
+        select_related = {'image': ['image']}
 
     def get_image(self, obj):
         return obj.image_url
 
-class PageSerializer(serializers.ModelSerializer):
+class CategoryCardSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['title', 'lang', 'slug']
+
+class ProductCardSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    # Compact representation for list routes and the homepage, without content HTML or content images
+    categories = CategoryCardSerializer(many=True, read_only=True)
+    image = serializers.SerializerMethodField()
+    surrogate_relations = ('image',)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'slug', 'langslug', 'lang', 'pageinfo', 'image', 'order', 'categories']
+        select_related = {'image': ['image']}
+
+    def get_image(self, obj):
+        return obj.image_url
+
+class PageSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     images = ImageSerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    surrogate_relations = ('image',)
+
+    class Meta:
+        model = Page
+        exclude = ['search_key', 'updated_at']
+        select_related = {'image': ['image']}
+
+    def get_image(self, obj):
+        return obj.image_url
+
+class PageCardSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    image = serializers.SerializerMethodField()
+    surrogate_relations = ('image',)
 
     class Meta:
         model = Page
-        fields = '__all__'
+        fields = ['id', 'title', 'slug', 'langslug', 'lang', 'pageinfo', 'image', 'order']
+        select_related = {'image': ['image']}
 
     def get_image(self, obj):
         return obj.image_url
 
-class HomePageSerializer(serializers.ModelSerializer):
-    products = ProductSerializer(many=True, read_only=True)
+class HomePageSerializer(SurrogateKeyMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    products = ProductCardSerializer(many=True, read_only=True)
     images = ImageSerializer(many=True, read_only=True) 
     class Meta:
         model = HomePage
         fields = ['id', 'images', 'title', 'pageinfo', 'content', 'lang', 'products']
 
+class SearchHitSerializer(serializers.Serializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    title = serializers.CharField(source='object.title')
+    slug = serializers.CharField(source='object.slug')
+    lang = serializers.CharField()
+    image = serializers.CharField(source='object.image_url', allow_null=True)
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
+
+    def to_representation(self, instance):
+        keys = self.context.get('surrogate_keys')
+        if keys is not None:
+            keys.add(f"{instance['kind']}:{instance['object_id']}")
+        return super().to_representation(instance)
+
 class CategoryProductsView(generics.ListAPIView):
     serializer_class = ProductSerializer
 
@@ -122,7 +236,7 @@ class TagProductsView(generics.ListAPIView):
         tag = Tag.objects.get(slug=slug)
         return Product.objects.filter(tags=tag)
 
-class SocialSerializer(serializers.ModelSerializer):
+class SocialSerializer(SurrogateKeyMixin, serializers.ModelSerializer):
     class Meta:
         model = Social
         fields = '__all__' 
\ No newline at end of file
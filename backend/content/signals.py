@@ -0,0 +1,142 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, Product, Page, Image, HomePage, MenuItem, Social
+from .menu import invalidate_menu
+from .versioning import bump_version, affected_languages
+from .surrogate import schedule_purge, changed_keys, relation_keys, menu_keys, collection_key
+from .revalidation import revalidation_enabled, affected_paths, schedule_revalidation
+from .documents import documents_enabled, refresh_documents
+from .translations import LINK_FIELDS, TRANSLATABLE, link_changed, update_translations
+from . import search
+
+CONTENT_MODELS = (Category, Product, Page, Image, HomePage, MenuItem, Social)
+M2M_THROUGH = (Product.categories.through, Product.images.through, Page.images.through, HomePage.images.through, HomePage.products.through)
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def menuitem_changed(sender, instance, **kwargs):
+    invalidate_menu()
+
+@receiver(post_save, sender=Page)
+def page_saved(sender, instance, **kwargs):
+    # Menu items show the slug of their linked page
+    if MenuItem.objects.filter(page=instance.pk).exists():
+        invalidate_menu()
+        schedule_purge(menu_keys())
+
+@receiver(post_delete, sender=Page)
+def page_deleted(sender, instance, **kwargs):
+    # Linked menu items have already been set to NULL without a signal
+    invalidate_menu()
+    schedule_purge(menu_keys())
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Page)
+def remember_search_key(sender, instance, **kwargs):
+    # The vocabulary only changes by the terms the search key gains or loses
+    if instance.pk is not None and search.search_available():
+        instance._previous_search_key = sender.objects.filter(pk=instance.pk).values_list('search_key', flat=True).first()
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Page)
+def update_search_index(sender, instance, **kwargs):
+    search.index_object(instance)
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Page)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+def content_changed(sender, instance, **kwargs):
+    keys = changed_keys(instance)
+    if documents_enabled():
+        refresh_documents(keys)
+    bump_version(affected_languages(instance), keys)
+    schedule_purge(keys)
+
+def relations_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        keys = relation_keys(instance, model, pk_set, reverse)
+        if documents_enabled():
+            refresh_documents(keys)
+        bump_version(affected_languages(instance), keys)
+        schedule_purge(keys)
+
+def relation_owners(sender, instance, reverse, model, pk_set):
+    """The rows holding the many-to-many field, e.g. the products of a product.categories change."""
+    if not reverse:
+        return type(instance).objects.filter(pk=instance.pk)
+    if pk_set is not None:
+        return model.objects.filter(pk__in=pk_set)
+    field = next(field for field in model._meta.many_to_many if field.remote_field.through is sender)
+    return model.objects.filter(**{field.name: instance})
+
+def touch_relation_owners(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # A relation is part of its owner's row for updated_at readers, e.g. export_content --since.
+    # A reverse clear has no pk_set, so its owners are looked up before they are unlinked.
+    if action == 'pre_clear' and reverse:
+        instance._cleared_owners = list(relation_owners(sender, instance, reverse, model, None).values_list('pk', flat=True))
+    elif action == 'post_clear' and reverse:
+        model.objects.filter(pk__in=getattr(instance, '_cleared_owners', ())).update(updated_at=timezone.now())
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        relation_owners(sender, instance, reverse, model, pk_set).update(updated_at=timezone.now())
+
+def remember_links(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._previous_links = sender.objects.filter(pk=instance.pk).values_list(*LINK_FIELDS).first()
+
+def translations_changed(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_save and not link_changed(instance):
+        return
+    # A link shows up on the routes of every language in its group, not only the instance's
+    changed = update_translations(instance)
+    if changed:
+        keys = {collection_key('translations')}
+        bump_version(changed, keys)
+        schedule_purge(keys)
+
+def remember_previous_paths(sender, instance, raw=False, **kwargs):
+    # A new slug or language moves the object, and the old path has to be revalidated too
+    if raw or instance.pk is None or not revalidation_enabled():
+        return
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous is not None and (previous.slug, previous.lang) != (instance.slug, instance.lang):
+        instance._previous_paths = affected_paths(previous)[0]
+
+def revalidate_saved(sender, instance, raw=False, **kwargs):
+    if raw or not revalidation_enabled():
+        return
+    paths, layout = affected_paths(instance)
+    schedule_revalidation(paths | getattr(instance, '_previous_paths', set()), layout)
+
+def revalidate_deleted(sender, instance, **kwargs):
+    # Before the delete, while the relations needed to find the paths still exist
+    if revalidation_enabled():
+        schedule_revalidation(*affected_paths(instance))
+
+def revalidate_relations(sender, instance, action, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not revalidation_enabled():
+        return
+    paths, layout = affected_paths(instance)
+    for related in model.objects.filter(pk__in=pk_set):
+        paths |= affected_paths(related)[0]
+    schedule_revalidation(paths, layout)
+
+for model in CONTENT_MODELS:
+    post_save.connect(content_changed, sender=model, dispatch_uid=f'content_version_save_{model.__name__}')
+    post_delete.connect(content_changed, sender=model, dispatch_uid=f'content_version_delete_{model.__name__}')
+    post_save.connect(revalidate_saved, sender=model, dispatch_uid=f'content_revalidate_save_{model.__name__}')
+    pre_delete.connect(revalidate_deleted, sender=model, dispatch_uid=f'content_revalidate_delete_{model.__name__}')
+for model in (Category, Product, Page):
+    pre_save.connect(remember_previous_paths, sender=model, dispatch_uid=f'content_revalidate_previous_{model.__name__}')
+for model in TRANSLATABLE.values():
+    pre_save.connect(remember_links, sender=model, dispatch_uid=f'content_translations_previous_{model.__name__}')
+    post_save.connect(translations_changed, sender=model, dispatch_uid=f'content_translations_save_{model.__name__}')
+    post_delete.connect(translations_changed, sender=model, dispatch_uid=f'content_translations_delete_{model.__name__}')
+for through in M2M_THROUGH:
+    m2m_changed.connect(relations_changed, sender=through, dispatch_uid=f'content_version_m2m_{through.__name__}')
+    m2m_changed.connect(touch_relation_owners, sender=through, dispatch_uid=f'content_touch_m2m_{through.__name__}')
+    m2m_changed.connect(revalidate_relations, sender=through, dispatch_uid=f'content_revalidate_m2m_{through.__name__}')
@@ -0,0 +1,162 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from multiprocessing import get_context
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .batch import render
+from .models import Category, Product, Page, Image, HomePage, MenuItem
+from .surrogate import SURROGATE_KEY_HEADER, changed_keys, menu_keys
+
+# Static snapshot of the read-only API: every route rendered to <root>/<path>/index.json plus a
+# gzipped copy, for nginx to serve with try_files before falling back to Django. A manifest keeps
+# the surrogate keys of every file, so an incremental run re-renders only the files whose keys
+# belong to objects changed (or deleted) since the previous run.
+#
+# Between runs, edits delete the files that render the changed objects once they commit (see
+# surrogate.schedule_purge), so nginx passes those routes to Django until the next run rewrites them.
+
+MANIFEST_NAME = '.manifest.json'
+GLOBAL_ROUTES = ['/api/menuitems/', '/api/products/', '/api/pages/', '/api/categories/', '/api/homepage/', '/api/images/', '/api/social/']
+LANGUAGE_ROUTES = ['/api/{lang}/homepage/', '/api/{lang}/products/', '/api/{lang}/pages/', '/api/{lang}/categories/', '/api/{lang}/bundle/']
+DETAIL_ROUTES = ((Product, '/api/{lang}/product/{slug}/'), (Page, '/api/{lang}/page/{slug}/'), (Category, '/api/{lang}/category/{slug}/'))
+TRACKED_MODELS = (Category, Product, Page, Image, HomePage, MenuItem)
+
+def snapshot_routes():
+    paths = list(GLOBAL_ROUTES)
+    for code, _ in settings.LANGUAGES:
+        paths += [route.format(lang=code) for route in LANGUAGE_ROUTES]
+    for model, route in DETAIL_ROUTES:
+        paths += [route.format(lang=lang, slug=slug) for lang, slug in model.objects.values_list('lang', 'slug')]
+    return list(dict.fromkeys(paths))
+
+def file_for(root, path):
+    return os.path.join(root, path.strip('/'), 'index.json')
+
+def write_atomic(filename, content):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    temporary = f'{filename}.tmp{os.getpid()}'
+    with open(temporary, 'wb') as f:
+        f.write(content)
+    os.replace(temporary, filename)
+
+def remove(root, path):
+    for filename in (file_for(root, path), file_for(root, path) + '.gz'):
+        if os.path.exists(filename):
+            os.remove(filename)
+
+def request_meta(host):
+    return {
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SCRIPT_NAME': '', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.url_scheme': 'http', 'content.require_fresh': True,
+    }
+
+def export_paths(root, host, paths):
+    """Render paths to files. Returns (path, status, surrogate keys) for each."""
+    meta, results = request_meta(host), []
+    for path in paths:
+        response = render(path, meta)
+        if response.status_code == 200:
+            write_atomic(file_for(root, path), response.content)
+            write_atomic(file_for(root, path) + '.gz', gzip.compress(response.content, compresslevel=9, mtime=0))
+        else:
+            remove(root, path)
+        results.append((path, response.status_code, response.get(SURROGATE_KEY_HEADER, '').split()))
+    return results
+
+def _export_chunk(args):
+    return export_paths(*args)
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+_key_index = {}
+
+def files_by_key(root):
+    """The snapshot's routes per surrogate key, from the manifest, read again when a run rewrote it."""
+    try:
+        mtime = os.stat(os.path.join(root, MANIFEST_NAME)).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _key_index.get(root)
+    if cached is None or cached[0] != mtime:
+        index = defaultdict(list)
+        for path, keys in (load_manifest(root) or {'files': {}})['files'].items():
+            for key in keys:
+                index[key].append(path)
+        cached = _key_index[root] = (mtime, index)
+    return cached[1]
+
+def remove_changed(root, keys):
+    """Delete the files rendering any of the keys. Returns their routes."""
+    # The manifest is left as is: the next incremental run re-renders them, their objects changed since it started
+    index = files_by_key(root)
+    paths = {path for key in keys for path in index.get(key, ())}
+    for path in paths:
+        remove(root, path)
+    return paths
+
+def changed_since(since, exported_keys):
+    """Surrogate keys of objects changed since the given time, or exported before and deleted since."""
+    keys = {'social'}  # Social has no updated_at and is tiny
+    for model in TRACKED_MODELS:
+        for instance in model.objects.filter(updated_at__gt=since):
+            keys |= changed_keys(instance)
+            if isinstance(instance, Page):
+                keys |= menu_keys()
+    exported = defaultdict(set)
+    for key in exported_keys:
+        name, _, pk = key.partition(':')
+        if pk.isdigit():
+            exported[name].add(int(pk))
+    for model in TRACKED_MODELS:
+        name = model._meta.model_name
+        if exported[name]:
+            existing = set(model.objects.filter(pk__in=exported[name]).values_list('pk', flat=True))
+            keys |= {f'{name}:{pk}' for pk in exported[name] - existing}
+    return keys
+
+def stale_routes(routes, manifest):
+    """Routes that are new since the manifest was written, or render an object changed since."""
+    files = manifest['files']
+    keys = changed_since(parse_datetime(manifest['started_at']), {key for path_keys in files.values() for key in path_keys})
+    return [path for path in routes if path not in files or keys.intersection(files[path])]
+
+def export_snapshot(root, host, incremental=False, processes=1, chunk_size=50):
+    started_at = timezone.now()
+    previous = load_manifest(root)
+    routes = snapshot_routes()
+    render_paths = stale_routes(routes, previous) if incremental and previous else routes
+    removed = [path for path in (previous or {}).get('files', {}) if path not in set(routes)]
+
+    chunk_size = max(1, min(chunk_size, -(-len(render_paths) // processes)))
+    chunks = [(root, host, render_paths[start:start + chunk_size]) for start in range(0, len(render_paths), chunk_size)]
+    if processes > 1 and len(chunks) > 1:
+        # Forked workers open their own database connections
+        connections.close_all()
+        with get_context('fork').Pool(processes) as pool:
+            results = [result for chunk in pool.imap_unordered(_export_chunk, chunks) for result in chunk]
+    else:
+        results = [result for chunk in chunks for result in _export_chunk(chunk)]
+
+    files = dict(previous['files']) if incremental and previous else {}
+    for path in removed:
+        remove(root, path)
+        files.pop(path, None)
+    failed = []
+    for path, status, keys in results:
+        if status == 200:
+            files[path] = keys
+        else:
+            files.pop(path, None)
+            failed.append((path, status))
+    os.makedirs(root, exist_ok=True)
+    write_atomic(os.path.join(root, MANIFEST_NAME), json.dumps({'started_at': started_at.isoformat(), 'files': files}, indent=1).encode())
+    return {'rendered': len(results) - len(failed), 'removed': len(removed), 'failed': failed, 'unchanged': len(routes) - len(render_paths)}
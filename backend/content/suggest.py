@@ -0,0 +1,94 @@
+import threading
+from django.conf import settings
+from .models import Product, Category, Page
+from .search import normalize
+from .versioning import get_version
+
+# Typeahead suggestions answered from a per-process prefix trie of product, category and page
+# titles. Every word start of a title is a key, so "so" finds "Tomato Soup". Each node keeps
+# its best MAX_SUGGESTIONS records, so a lookup costs one step per typed character.
+
+MAX_SUGGESTIONS = 10
+TYPE_PRIORITY = {'product': 0, 'category': 1, 'page': 2}
+
+class PrefixTrie:
+    __slots__ = ('root',)
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, rank, record):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            best = node.setdefault(None, [])
+            if record in (item for _, item in best):
+                continue
+            best.append((rank, record))
+            if len(best) > MAX_SUGGESTIONS:
+                best.sort(key=lambda item: item[0])
+                del best[MAX_SUGGESTIONS:]
+
+    def freeze(self):
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    node[None] = tuple(record for _, record in sorted(child, key=lambda item: item[0]))
+                else:
+                    stack.append(child)
+        return self
+
+    def lookup(self, prefix, limit=MAX_SUGGESTIONS):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return ()
+        return node.get(None, ())[:limit]
+
+def build_trie(lang):
+    trie = PrefixTrie()
+    sources = (
+        ('product', Product.objects.filter(lang=lang)),
+        ('category', Category.objects.filter(lang=lang)),
+        ('page', Page.objects.filter(lang=lang)),
+    )
+    for kind, queryset in sources:
+        for title, slug, order in queryset.values_list('title', 'slug', 'order'):
+            record = {'title': title, 'slug': slug, 'type': kind}
+            words = normalize(title).split()
+            for start in range(len(words)):
+                rank = (start, TYPE_PRIORITY[kind], order, len(title))
+                trie.insert(' '.join(words[start:]), rank, record)
+    return trie.freeze()
+
+class SuggestionIndex:
+    """Lazily builds one trie per language and rebuilds it when the language's content version moves."""
+    def __init__(self):
+        self._tries = {}
+        self._lock = threading.Lock()
+
+    def get(self, lang):
+        # A trie and a version stamp are kept per language, so only configured ones get them
+        if lang not in dict(settings.LANGUAGES):
+            raise KeyError(lang)
+        version = get_version(lang)
+        built = self._tries.get(lang)
+        if built is not None and built[0] == version:
+            return built[1]
+        with self._lock:
+            built = self._tries.get(lang)
+            if built is None or built[0] != version:
+                built = (version, build_trie(lang))
+                self._tries[lang] = built
+        return built[1]
+
+    def suggest(self, lang, query, limit=MAX_SUGGESTIONS):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        return list(self.get(lang).lookup(prefix, limit))
+
+suggestions = SuggestionIndex()
@@ -0,0 +1,156 @@
+import logging
+import threading
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Surrogate keys name the objects an API response contains, so a proxy cache in front of /api can
+# drop exactly the responses an admin edit touched. A response carries the key of every object it
+# renders, nested ones included ("product:12 category:3 image:7"), plus a collection key for list
+# routes ("products:en") because a new object changes a list it isn't in yet.
+
+logger = logging.getLogger(__name__)
+
+SURROGATE_KEY_HEADER = getattr(settings, 'SURROGATE_KEY_HEADER', 'Surrogate-Key')
+COLLECTIONS = {
+    'category': 'categories',
+    'product': 'products',
+    'page': 'pages',
+    'image': 'images',
+    'homepage': 'homepages',
+    'social': 'social',
+}
+SEARCHABLE = ('category', 'product', 'page')
+
+def languages():
+    return [code for code, _ in settings.LANGUAGES]
+
+def object_key(instance):
+    return f'{instance._meta.model_name}:{instance.pk}'
+
+def collection_key(name, lang=None):
+    return f'{name}:{lang}' if lang else name
+
+def menu_keys():
+    # Children are not filtered by language, so a change can show up in every tree
+    return {collection_key('menu')} | {collection_key('menu', lang) for lang in languages()}
+
+def search_keys(lang=None):
+    return {collection_key('search')} | ({collection_key('search', lang)} if lang else {collection_key('search', code) for code in languages()})
+
+def changed_keys(instance):
+    """Keys of every response that may change when the instance is saved or deleted."""
+    name = instance._meta.model_name
+    lang = getattr(instance, 'lang', None)
+    keys = {object_key(instance)}
+    if name in COLLECTIONS:
+        keys.add(collection_key(COLLECTIONS[name]))
+        if hasattr(instance, 'lang'):
+            keys |= {collection_key(COLLECTIONS[name], code) for code in ([lang] if lang else languages())}
+    if name in SEARCHABLE:
+        keys |= search_keys(lang)
+    if name == 'menuitem':
+        keys |= menu_keys()
+    return keys
+
+def relation_keys(instance, model, pk_set, reverse):
+    """Keys to purge for an m2m_changed signal. The forward side is the one whose responses render the relation."""
+    if not reverse:
+        return changed_keys(instance)
+    # Responses that rendered the relation carry the instance's key too; objects in pk_set
+    # may also have just joined a filtered list (e.g. a category's products)
+    keys = {object_key(instance)}
+    name = model._meta.model_name
+    keys |= {f'{name}:{pk}' for pk in pk_set or ()}
+    if pk_set and name in COLLECTIONS:
+        keys |= {collection_key(COLLECTIONS[name], lang) for lang in [None] + languages()}
+    return keys
+
+class BasePurger:
+    def __init__(self, **options):
+        self.options = options
+
+    def purge(self, keys):
+        raise NotImplementedError
+
+class NullPurger(BasePurger):
+    def purge(self, keys):
+        pass
+
+class HTTPPurger(BasePurger):
+    """
+    Sends the keys, space separated in one header, to a purge endpoint. The defaults match Varnish
+    with the xkey vmod; set method and header in OPTIONS for Fastly or an nginx cache-tag purge location.
+    """
+    def __init__(self, url, method='PURGE', header='xkey-purge', batch_size=100, timeout=5, **options):
+        super().__init__(**options)
+        self.url, self.method, self.header = url, method, header
+        self.batch_size, self.timeout = batch_size, timeout
+
+    def purge(self, keys):
+        keys = sorted(keys)
+        for start in range(0, len(keys), self.batch_size):
+            batch = ' '.join(keys[start:start + self.batch_size])
+            requests.request(self.method, self.url, headers={self.header: batch}, timeout=self.timeout).raise_for_status()
+
+def get_purger():
+    config = getattr(settings, 'CONTENT_PURGER', None) or {'BACKEND': 'content.surrogate.NullPurger'}
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+_pending = threading.local()
+
+def _flush():
+    keys = getattr(_pending, 'keys', None)
+    _pending.keys = set()
+    if not keys:
+        return
+    try:
+        get_purger().purge(keys)
+    except Exception:
+        # The proxy keeps serving the old response until it expires; saving must not fail over it
+        logger.exception('Purging surrogate keys failed')
+    # nginx serves the static snapshot ahead of Django, see content/snapshot.py
+    from .snapshot import remove_changed
+    try:
+        remove_changed(settings.STATIC_API_ROOT, keys)
+    except OSError:
+        logger.exception('Removing changed snapshot files failed')
+
+def schedule_purge(keys):
+    """Purge the keys once the current transaction commits, batched with every other key it touched."""
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    _pending.keys.update(keys)
+    transaction.on_commit(_flush)
+
+class SurrogateKeyViewMixin:
+    """
+    Collects the keys of everything a view renders and sends them in the Surrogate-Key header.
+    Serializers with SurrogateKeyMixin add their object's key through the serializer context;
+    list routes add the collection key of surrogate_collection, per language when the route is.
+    """
+    surrogate_collection = None
+
+    def get_surrogate_keys(self):
+        if self.surrogate_collection is None or getattr(self, 'action', 'list') != 'list':
+            return set()
+        # Routes listing every language whatever their <lang> change with an object in any of them
+        lang = self.kwargs.get('lang') if getattr(self, 'language_scoped', True) else None
+        return {collection_key(self.surrogate_collection, lang)}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.surrogate_keys = self.get_surrogate_keys()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['surrogate_keys'] = getattr(self, 'surrogate_keys', None)
+        return context
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        keys = getattr(self, 'surrogate_keys', None)
+        if keys and response.status_code == 200:
+            response[SURROGATE_KEY_HEADER] = ' '.join(sorted(keys))
+        return response
@@ -0,0 +1,185 @@
+import json
+import random
+import re
+from django.conf import settings
+from django.utils.text import slugify
+from .bulk import CHUNK_SIZE, insert, link
+from .models import Category, Product, Page, Image, HomePage, MenuItem, Social
+from .search import search_key
+
+# Synthetic catalogs for benchmarks and load tests, shaped after datadump.json: the same
+# languages, categories per product, products on the homepage and menu roots, with text drawn
+# from the fixture's words. Products are split evenly between the languages and linked to their
+# counterpart (langslug); categories and pages grow with the catalog, bodies are CKEditor sized
+# (headings, lists, links, figures) and the menu is three levels deep. Rows are bulk inserted, so
+# run content.bulk.rebuild_derived() afterwards.
+
+DATADUMP = settings.BASE_DIR / 'datadump.json'
+PRODUCTS_PER_CATEGORY = 100
+PRODUCTS_PER_PAGE = 500
+PRODUCTS_PER_IMAGE = 20
+MENU_CATEGORIES = 8
+MENU_PRODUCTS = 3
+
+def load_shape(path=DATADUMP):
+    """The proportions and vocabulary of a fixture."""
+    with open(path, encoding='utf-8') as fixture:
+        objects = json.load(fixture)
+    by_model = {}
+    for obj in objects:
+        by_model.setdefault(obj['model'], []).append(obj['fields'])
+    langs = [code for code, _ in settings.LANGUAGES]
+    text = ' '.join(
+        re.sub(r'<[^>]+>|&\w+;', ' ', str(fields.get(name) or ''))
+        for model in ('content.product', 'content.category', 'content.page', 'content.homepage')
+        for fields in by_model.get(model, ())
+        for name in ('title', 'pageinfo', 'categoryinfo', 'content')
+    )
+    products = by_model.get('content.product') or [{}]
+    homepages = by_model.get('content.homepage') or [{}]
+    menu = by_model.get('content.menuitem', [])
+    return {
+        'langs': langs,
+        'words': sorted({word.lower() for word in re.findall(r'[^\W\d_]{3,}', text)}) or ['lorem', 'ipsum', 'dolor'],
+        'categories': max(1, len(by_model.get('content.category', [])) // len(langs)),
+        'categories_per_product': max(1, round(sum(len(fields.get('categories', [])) for fields in products) / len(products))),
+        'pages': max(1, len(by_model.get('content.page', [])) // len(langs)),
+        'homepage_products': max(1, round(sum(len(fields.get('products', [])) for fields in homepages) / len(homepages))),
+        'menu_roots': {lang: [fields['title'] for fields in menu if fields['lang'] == lang and not fields['parent']] for lang in langs},
+    }
+
+def sentence(rng, words, size=(6, 16)):
+    text = ' '.join(rng.choice(words) for _ in range(rng.randint(*size)))
+    return text[:1].upper() + text[1:] + '.'
+
+def title(rng, words, size=(1, 3)):
+    return ' '.join(rng.choice(words).capitalize() for _ in range(rng.randint(*size)))
+
+def paragraph(rng, words):
+    sentences = [sentence(rng, words) for _ in range(rng.randint(3, 7))]
+    sentences[0] = f'<strong>{sentences[0]}</strong>'
+    if rng.random() < 0.5:
+        sentences[-1] = f'<a href="https://example.com/{rng.choice(words)}">{sentences[-1]}</a>'
+    return '<p>' + ' '.join(sentences) + '</p>'
+
+def body(rng, words, image):
+    """HTML the size and shape of what the CKEditor fields hold, a few kB."""
+    blocks = [paragraph(rng, words)]
+    for _ in range(rng.randint(2, 4)):
+        blocks.append(f'<h2>{title(rng, words, (2, 5))}</h2>')
+        blocks += [paragraph(rng, words) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.5:
+            blocks.append('<ul>' + ''.join(f'<li>{sentence(rng, words, (3, 8))}</li>' for _ in range(rng.randint(3, 6))) + '</ul>')
+    if image:
+        blocks.insert(2, f'<figure class="image"><img src="/media/{image}" alt="{title(rng, words)}"><figcaption>{sentence(rng, words, (4, 8))}</figcaption></figure>')
+    return '\n'.join(blocks)
+
+def generate_catalog(products, seed=0, shape=None, log=None):
+    """Insert a catalog of about `products` products, with everything around them. Returns row counts."""
+    shape = shape or load_shape()
+    rng = random.Random(seed)
+    words, langs = shape['words'], shape['langs']
+    per_lang = max(1, products // len(langs))
+
+    images = [Image(image=f'images/synthetic/photo-{i}.jpg', alt_text=title(rng, words)) for i in range(max(12, products // PRODUCTS_PER_IMAGE))]
+    insert(Image, images)
+    image_ids = [image.pk for image in images]
+    image_names = {image.pk: image.image.name for image in images}
+
+    def content_fields(kind, lang, i, info_field):
+        image = rng.choice(image_ids)
+        name = title(rng, words)
+        fields = {
+            'title': f'{name} {i}', 'slug': f'{slugify(name)}-{kind}-{lang}-{i}', 'lang': lang, 'image_id': image,
+            info_field: sentence(rng, words), 'content': body(rng, words, image_names[image] if rng.random() < 0.5 else None),
+        }
+        fields['search_key'] = search_key(fields['title'], fields[info_field], fields['content'])
+        return fields
+
+    def translated(model, kind, i, info_field, **extra):
+        """The i-th object in every language, each linked to the next language's."""
+        objects = [model(order=i, **content_fields(kind, lang, i, info_field), **extra) for lang in langs]
+        if len(objects) > 1:
+            for n, obj in enumerate(objects):
+                obj.langslug = objects[(n + 1) % len(objects)].slug
+        return objects
+
+    def by_lang(objects):
+        return {lang: [obj for obj in objects if obj.lang == lang] for lang in langs}
+
+    categories = [obj for i in range(max(shape['categories'], per_lang // PRODUCTS_PER_CATEGORY)) for obj in translated(Category, 'category', i, 'categoryinfo')]
+    insert(Category, categories)
+    categories = by_lang(categories)
+    pages = [obj for i in range(max(shape['pages'], per_lang // PRODUCTS_PER_PAGE)) for obj in translated(Page, 'page', i, 'pageinfo')]
+    insert(Page, pages)
+    link(Page, 'images', ((page.pk, image) for page in pages for image in rng.sample(image_ids, 3)))
+    pages = by_lang(pages)
+
+    # Products go in chunk by chunk; only a few per category are kept, for the menu
+    homepage_products = {lang: [] for lang in langs}
+    menu_products = {}
+    count = 0
+    for start in range(0, per_lang, CHUNK_SIZE):
+        objects = [
+            obj for i in range(start, min(start + CHUNK_SIZE, per_lang))
+            for obj in translated(Product, 'product', i, 'pageinfo', shoplink='https://example.com/shop')
+        ]
+        insert(Product, objects)
+        count += len(objects)
+        category_pairs, image_pairs = [], []
+        for obj in objects:
+            for category in rng.sample(categories[obj.lang], min(shape['categories_per_product'], len(categories[obj.lang]))):
+                category_pairs.append((obj.pk, category.pk))
+                shown = menu_products.setdefault(category.pk, [])
+                if len(shown) < MENU_PRODUCTS:
+                    shown.append(obj)
+            image_pairs += [(obj.pk, image) for image in rng.sample(image_ids, rng.randint(0, 4))]
+            if len(homepage_products[obj.lang]) < shape['homepage_products']:
+                homepage_products[obj.lang].append(obj.pk)
+        link(Product, 'categories', category_pairs)
+        link(Product, 'images', image_pairs)
+        if log:
+            log(f'{count} products')
+
+    homepages = [HomePage(title=title(rng, words), pageinfo=sentence(rng, words), content=body(rng, words, None), lang=lang) for lang in langs]
+    insert(HomePage, homepages)
+    link(HomePage, 'images', ((home.pk, image) for home in homepages for image in rng.sample(image_ids, 3)))
+    link(HomePage, 'products', ((home.pk, pk) for home in homepages for pk in homepage_products[home.lang]))
+    if not Social.objects.exists():
+        insert(Social, [Social(facebook='https://facebook.com/example', instagram='https://instagram.com/example')])
+
+    # Roots as in the fixture: pages, then the product and category listings, which open on
+    # categories, which open on a few of their products
+    menu_count, order = 0, 0
+    for lang in langs:
+        roots = shape['menu_roots'].get(lang) or [title(rng, words) for _ in range(3)]
+        listings = []
+        for i, root in enumerate(roots):
+            page = pages[lang][i] if i < len(pages[lang]) else None
+            item = MenuItem(title=root, lang=lang, order=order, page=page, link=None if page else f'/{lang}/{slugify(root)}')
+            # save() fills in the page link
+            item.save()
+            order += 1
+            if page is None:
+                listings.append(item)
+        children = []
+        for listing in listings:
+            for category in categories[lang][:MENU_CATEGORIES]:
+                children.append((MenuItem(title=category.title, lang=lang, order=order, parent=listing, link=f'/{lang}/category/{category.slug}'), category))
+                order += 1
+        insert(MenuItem, [item for item, _ in children])
+        leaves = []
+        for item, category in children:
+            for product in menu_products.get(category.pk, []):
+                leaves.append(MenuItem(title=product.title, lang=lang, order=order, parent=item, link=f'/{lang}/product/{product.slug}'))
+                order += 1
+        insert(MenuItem, leaves)
+        menu_count += len(roots) + len(children) + len(leaves)
+
+    return {
+        'products': count,
+        'categories': sum(len(objects) for objects in categories.values()),
+        'pages': sum(len(objects) for objects in pages.values()),
+        'images': len(image_ids),
+        'menu_items': menu_count,
+    }
@@ -1,3 +1,1531 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.db import DatabaseError, connection, transaction
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from .cache import content_cache
+from .models import Category, Product, Page, Image, HomePage, MenuItem, Social, Document, SearchTrigram
+from .menu import get_menu_tree
+from .translations import translations_of
+from . import benchmark, bulk, catalog, compression, fixtures, loadtest, middleware, search, snapshot, suggest, synthetic, versioning
 
-# Create your tests here.
+def create_catalog(products=5, prefix=''):
+    images = [Image.objects.create(image=f'images/photo-{i}.jpg', alt_text=f'Photo {i}') for i in range(3)]
+    categories = []
+    for lang in ('en', 'tr'):
+        for i in range(2):
+            categories.append(Category.objects.create(title=f'{prefix}Category {lang} {i}', lang=lang, image=images[i], order=i))
+    for lang in ('en', 'tr'):
+        home = HomePage.objects.create(title=f'Home {lang}', content='<p>Home</p>', lang=lang)
+        home.images.set(images[:2])
+        for i in range(products):
+            product = Product.objects.create(title=f'{prefix}Product {lang} {i}', content='<p>Body</p>', lang=lang, image=images[i % 3], order=i)
+            product.categories.set([c for c in categories if c.lang == lang])
+            product.images.set(images)
+            home.products.add(product)
+        page = Page.objects.create(title=f'{prefix}Page {lang}', content='<p>Page</p>', lang=lang, image=images[0])
+        page.images.set(images)
+    if not Social.objects.exists():
+        Social.objects.create(facebook='https://facebook.com/citrus')
+
+class MenuTreeTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        self.about = Page.objects.create(title='About Us', content='<p>About</p>', lang='en')
+        self.root = MenuItem.objects.create(title='About', page=self.about, order=1, lang='en')
+        self.child = MenuItem.objects.create(title='Team', parent=self.root, link='/en/team/', order=2, lang='en')
+        self.grandchild = MenuItem.objects.create(title='Jobs', parent=self.child, link='/en/jobs/', order=3, lang='en')
+        MenuItem.objects.create(title='Hakkimizda', link='/tr/page/hakkimizda/', order=4, lang='tr')
+
+    def test_tree_is_built_from_one_query(self):
+        with self.assertNumQueries(1):
+            tree = get_menu_tree('en')
+        self.assertEqual(len(tree), 1)
+        self.assertEqual(tree[0]['page_slug'], 'about-us')
+        self.assertEqual(tree[0]['link'], '/en/page/about-us/')
+        self.assertEqual(tree[0]['children'][0]['title'], 'Team')
+        self.assertEqual(tree[0]['children'][0]['children'][0]['title'], 'Jobs')
+        self.assertIsNone(tree[0]['children'][0]['children'][0]['children'])
+
+    def test_tree_is_cached_per_language(self):
+        get_menu_tree('en')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_menu_tree('en')), 1)
+        self.assertEqual([item['title'] for item in get_menu_tree('tr')], ['Hakkimizda'])
+
+    def test_trees_cached_before_the_commit_are_dropped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.root.title = 'About us'
+            self.root.save()
+            # Stands in for a request that read the menu while the edit was uncommitted
+            get_menu_tree('en')
+        with self.assertNumQueries(1):
+            get_menu_tree('en')
+
+    def test_endpoint_matches_per_node_serialization(self):
+        response = self.client.get('/api/menuitems/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['title'] for item in response.json()], ['About', 'Hakkimizda'])
+        response = self.client.get('/api/menuitems/', {'lang': 'tr'})
+        self.assertEqual([item['title'] for item in response.json()], ['Hakkimizda'])
+
+    def test_saving_menu_item_or_page_invalidates(self):
+        get_menu_tree('en')
+        self.child.title = 'Our Team'
+        self.child.save()
+        self.assertEqual(get_menu_tree('en')[0]['children'][0]['title'], 'Our Team')
+        self.about.slug = 'about'
+        self.about.save()
+        self.assertEqual(get_menu_tree('en')[0]['page_slug'], 'about')
+
+class QueryBudgetTests(TestCase):
+    # Query counts must not grow with the number of rows rendered
+    budgets = {
+        '/api/menuitems/': 1,
+        '/api/en/products/': 2,
+        '/api/en/product/product-en-1/': 3,
+        '/api/products/': 2,
+        '/api/en/pages/': 1,
+        '/api/en/page/page-en/': 2,
+        '/api/categories/': 1,
+        '/api/en/categories/': 1,
+        '/api/en/category/category-en-0/': 1,
+        '/api/en/homepage/': 4,
+        '/api/homepage/': 4,
+        '/api/images/': 1,
+        '/api/social/': 1,
+        '/api/en/bundle/': 7,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(products=8)
+
+    def setUp(self):
+        content_cache().clear()
+        # Budgets cover the steady state; seeding a version stamp costs one query per language,
+        # building the catalog snapshot a handful once per worker and content version
+        for lang in (None, 'en', 'tr'):
+            versioning.get_version(lang)
+        catalog.get_catalog()
+
+    def assertWithinBudget(self, url, budget):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertLessEqual(len(context.captured_queries), budget, f'{url} ran {len(context.captured_queries)} queries: ' + '\n'.join(q['sql'] for q in context.captured_queries))
+        return response
+
+    def test_routes_stay_within_query_budget(self):
+        for url, budget in self.budgets.items():
+            with self.subTest(url=url):
+                self.assertWithinBudget(url, budget)
+
+    def test_sparse_fieldsets_skip_unrequested_relations(self):
+        response = self.assertWithinBudget('/api/en/product/product-en-1/?fields=title,slug,image', 1)
+        self.assertEqual(set(response.json()), {'title', 'slug', 'image'})
+        response = self.assertWithinBudget('/api/en/product/product-en-1/?omit=images,categories,content', 1)
+        self.assertNotIn('content', response.json())
+        response = self.assertWithinBudget('/api/en/products/?fields=slug,categories.slug', 2)
+        self.assertEqual(response.json()[0], {'slug': 'product-en-0', 'categories': [{'slug': 'category-en-0'}, {'slug': 'category-en-1'}]})
+        response = self.assertWithinBudget('/api/en/homepage/?fields=title,products.slug', 2)
+        self.assertEqual(set(response.json()[0]['products'][0]), {'slug'})
+
+    def test_list_routes_render_cards(self):
+        product = self.client.get('/api/en/products/').json()[0]
+        self.assertNotIn('content', product)
+        self.assertNotIn('images', product)
+        self.assertEqual(product['categories'][0], {'title': 'Category en 0', 'lang': 'en', 'slug': 'category-en-0'})
+        self.assertIn('content', self.client.get('/api/en/product/product-en-0/').json())
+        self.assertNotIn('content', self.client.get('/api/en/homepage/').json()[0]['products'][0])
+
+    def test_budget_does_not_depend_on_catalog_size(self):
+        create_catalog(products=20, prefix='more ')
+        self.assertWithinBudget('/api/products/', self.budgets['/api/products/'])
+        self.assertWithinBudget('/api/homepage/', self.budgets['/api/homepage/'])
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.soup = Product.objects.create(title='Tomato Soup', pageinfo='Warm and red', content='<p>Made with <strong>fresh</strong> tomatoes&nbsp;and basil</p>', lang='en')
+        self.sauce = Product.objects.create(title='Pasta Sauce', content='<p>Tomato base with garlic</p>', lang='en')
+        self.corba = Product.objects.create(title='Domates Çorbası', content='<p>Taze domates</p>', lang='tr')
+        self.vegetables = Category.objects.create(title='Vegetables', categoryinfo='Tomatoes, peppers and more', lang='en')
+
+    def test_html_is_stripped_and_title_hits_rank_first(self):
+        hits = search.search(search.resolve_match('tomato'))
+        self.assertEqual(len(hits), 3)
+        self.assertEqual((hits[0]['kind'], hits[0]['object_id']), ('product', self.soup.pk))
+        self.assertIn('<mark>', hits[0]['snippet'])
+        self.assertEqual(search.search(search.resolve_match('strong')), [])
+        self.assertEqual(len(search.search(search.resolve_match('fresh tomatoes'))), 1)
+
+    def test_language_and_kind_filters(self):
+        self.assertEqual([hit['object_id'] for hit in search.search(search.resolve_match('domates'), lang='tr')], [self.corba.pk])
+        self.assertEqual(search.search(search.resolve_match('domates'), lang='en'), [])
+        self.assertEqual([hit['kind'] for hit in search.search(search.resolve_match('tomatoes', ['category']), kinds=['category'])], ['category'])
+
+    def test_index_follows_save_and_delete(self):
+        self.sauce.title = 'Garlic Sauce'
+        self.sauce.content = '<p>Garlic only</p>'
+        self.sauce.save()
+        self.assertNotIn(self.sauce.pk, [hit['object_id'] for hit in search.search(search.resolve_match('tomato'), kinds=['product'])])
+        self.soup.delete()
+        self.assertEqual(search.search(search.resolve_match('basil')), [])
+
+    def test_vocabulary_follows_edits_and_deletes(self):
+        def terms():
+            return set(SearchTrigram.objects.values_list('term', flat=True))
+        self.sauce.content = '<p>Tomato base with chili</p>'
+        self.sauce.save()
+        self.assertIn('chili', terms())
+        self.assertNotIn('garlic', terms())
+        self.soup.delete()
+        self.assertNotIn('basil', terms())
+        # The sauce still has it
+        self.assertIn('tomato', terms())
+        with CaptureQueriesContext(connection) as queries:
+            self.sauce.save()
+        self.assertEqual([query['sql'] for query in queries if 'content_searchtrigram' in query['sql']], [])
+        kept = set(SearchTrigram.objects.values_list('trigram', 'term'))
+        search.rebuild_index()
+        self.assertEqual(set(SearchTrigram.objects.values_list('trigram', 'term')), kept)
+
+    def test_rebuild_reproduces_the_index_kept_on_save(self):
+        def stored():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid, kind, object_id, lang, title, body FROM {search.SEARCH_TABLE} ORDER BY rowid')
+                rows = cursor.fetchall()
+            return rows, set(SearchTrigram.objects.values_list('trigram', 'term'))
+        before = stored()
+        # Batches smaller than the catalog, so the chunked inserts are exercised
+        with mock.patch.object(search, 'REBUILD_CHUNK_SIZE', 2):
+            self.assertEqual(search.rebuild_index(), 4)
+        self.assertEqual(stored(), before)
+
+    def test_viewset_search_param_uses_index(self):
+        response = self.client.get('/api/products/', {'search': 'tomato'})
+        self.assertEqual([item['slug'] for item in response.json()], ['tomato-soup', 'pasta-sauce'])
+        response = self.client.get('/api/categories/', {'search': 'pepper'})
+        self.assertEqual([item['slug'] for item in response.json()], ['vegetables'])
+
+    def test_search_endpoint_returns_ranked_hits_across_models(self):
+        response = self.client.get('/api/en/search/', {'q': 'tomat', 'page_size': 2})
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        first_page = [(hit['type'], hit['slug']) for hit in data['results']]
+        self.assertEqual(first_page[0], ('product', 'tomato-soup'))
+        self.assertIsNotNone(data['next'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual({hit for hit in first_page} | {(hit['type'], hit['slug']) for hit in data['results']}, {('product', 'tomato-soup'), ('product', 'pasta-sauce'), ('category', 'vegetables')})
+
+class NormalizedSearchTests(TestCase):
+    def setUp(self):
+        self.corba = Product.objects.create(title='Kırmızı Mercimek Çorbası', pageinfo='Şefin önerisi', content='<p>Geleneksel <em>İstanbul</em> tarifi</p>', lang='tr')
+        self.ikram = Category.objects.create(title='IĞDIR Ürünleri', categoryinfo='Doğal', lang='tr')
+        self.tomato = Product.objects.create(title='Tomato Soup', content='<p>Fresh tomatoes</p>', lang='en')
+
+    def test_normalize_folds_turkish_case_and_diacritics(self):
+        self.assertEqual(search.normalize('<b>İSTANBUL</b> Işık ŞEKER ğüöç'), 'istanbul isik seker guoc')
+        self.assertEqual(search.normalize('IĞDIR'), search.normalize('ığdır'))
+
+    def test_search_key_is_not_exposed(self):
+        self.assertNotIn('search_key', self.client.get(f'/api/tr/product/{self.corba.slug}/').json())
+
+    def test_search_key_is_stored_on_save(self):
+        self.assertEqual(self.corba.search_key, 'kirmizi mercimek corbasi sefin onerisi geleneksel istanbul tarifi')
+        self.ikram.title = 'Iğdır'
+        self.ikram.save()
+        self.assertEqual(Category.objects.get(pk=self.ikram.pk).search_key, 'igdir dogal')
+
+    def test_turkish_queries_match_regardless_of_case_and_accents(self):
+        for query in ('KIRMIZI', 'kırmızı', 'kirmizi', 'ÇORBA', 'istanbul', 'İSTANBUL'):
+            with self.subTest(query=query):
+                self.assertEqual([hit['object_id'] for hit in search.search(search.resolve_match(query), kinds=['product'])], [self.corba.pk])
+        self.assertEqual([hit['object_id'] for hit in search.search(search.resolve_match('ığdır'))], [self.ikram.pk])
+
+    def test_misspelled_queries_are_corrected_from_trigram_index(self):
+        self.assertIn(search.correct_term('tomatoe'), ['tomato', 'tomatoes'])
+        self.assertEqual(search.correct_term('mercimk'), 'mercimek')
+        self.assertIsNone(search.correct_term('xyzzy'))
+        response = self.client.get('/api/search/', {'q': 'mercimk corbasi'})
+        self.assertEqual([hit['slug'] for hit in response.json()['results']], [self.corba.slug])
+        response = self.client.get('/api/products/', {'search': 'tomatos soup'})
+        self.assertEqual([item['slug'] for item in response.json()], ['tomato-soup'])
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        suggest.suggestions._tries.clear()
+        Product.objects.create(title='Tomato Soup', content='<p>Soup</p>', lang='en', order=2)
+        Product.objects.create(title='Tomato Paste', content='<p>Paste</p>', lang='en', order=1)
+        Category.objects.create(title='Soups', lang='en')
+        Page.objects.create(title='Şirket Hakkında', content='<p>Biz</p>', lang='tr')
+
+    def test_prefix_matches_title_and_word_starts(self):
+        results = suggest.suggestions.suggest('en', 'toma')
+        self.assertEqual(results, [
+            {'title': 'Tomato Paste', 'slug': 'tomato-paste', 'type': 'product'},
+            {'title': 'Tomato Soup', 'slug': 'tomato-soup', 'type': 'product'},
+        ])
+        self.assertEqual([item['title'] for item in suggest.suggestions.suggest('en', 'sou')], ['Soups', 'Tomato Soup'])
+        self.assertEqual([item['title'] for item in suggest.suggestions.suggest('en', 'tomato s')], ['Tomato Soup'])
+        self.assertEqual([item['type'] for item in suggest.suggestions.suggest('tr', 'SIRKET')], ['page'])
+
+    def test_trie_is_reused_until_content_version_changes(self):
+        suggest.suggestions.suggest('en', 'toma')
+        with self.assertNumQueries(0):
+            suggest.suggestions.suggest('en', 'tomato')
+        Product.objects.create(title='Tomatillo', content='', lang='en')
+        self.assertIn('Tomatillo', [item['title'] for item in suggest.suggestions.suggest('en', 'toma')])
+
+    def test_endpoint(self):
+        response = self.client.get('/api/en/suggest/', {'q': 'Tom', 'limit': 1})
+        self.assertEqual(response.json(), [{'title': 'Tomato Paste', 'slug': 'tomato-paste', 'type': 'product'}])
+        self.assertEqual(self.client.get('/api/en/suggest/').json(), [])
+        # A negative limit would slice from the end
+        for limit in (-3, -1):
+            self.assertEqual(self.client.get('/api/en/suggest/', {'q': 'Tom', 'limit': limit}).json(), [])
+
+    def test_unknown_languages_get_no_trie(self):
+        self.assertEqual(self.client.get('/api/xx/suggest/', {'q': 'Tom'}).status_code, 404)
+        with self.assertRaises(KeyError):
+            suggest.suggestions.get('xx')
+        self.assertNotIn('xx', suggest.suggestions._tries)
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        # Duplicate order values exercise the id tiebreaker
+        self.products = [Product.objects.create(title=f'Product {i}', content='', lang='en', order=i // 2) for i in range(7)]
+
+    def collect(self, url, params, key='slug'):
+        values, response = [], self.client.get(url, params).json()
+        values += [item[key] for item in response['results']]
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            values += [item[key] for item in response['results']]
+        return values, response
+
+    def test_unpaginated_without_opt_in(self):
+        self.assertEqual(len(self.client.get('/api/en/products/').json()), 7)
+
+    def test_pages_follow_order_then_id(self):
+        slugs, last = self.collect('/api/en/products/', {'page_size': 3})
+        self.assertEqual(slugs, [product.slug for product in self.products])
+        backwards = self.client.get(last['previous']).json()
+        self.assertEqual([item['slug'] for item in backwards['results']], slugs[3:6])
+        self.assertIsNotNone(backwards['next'])
+
+    def test_pages_are_stable_while_items_are_reordered(self):
+        first = self.client.get('/api/en/products/', {'page_size': 3}).json()
+        moved = self.products[0]
+        moved.order = 10
+        moved.save()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['slug'] for item in second['results']], [p.slug for p in self.products[3:6]])
+
+    def test_page_size_is_capped_and_cursor_validated(self):
+        Product.objects.bulk_create([Product(title=f'Bulk {i}', slug=f'bulk-{i}', lang='en', order=100 + i) for i in range(120)])
+        response = self.client.get('/api/products/', {'page_size': 1000}).json()
+        self.assertEqual(len(response['results']), 100)
+        self.assertEqual(self.client.get('/api/products/', {'cursor': 'garbage'}).status_code, 404)
+        for position in (['x', 1], [None, 1], [[1], 1], 'ab'):
+            cursor = urlsafe_b64encode(json.dumps({'p': position, 'r': 0}).encode()).decode()
+            self.assertEqual(self.client.get('/api/products/', {'cursor': cursor}).status_code, 404)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 ranking is SQLite specific')
+    def test_search_pages_follow_the_rank(self):
+        # Ranked above the other hits by its title, below them by order
+        best = Product.objects.create(title='Tomato', content='', lang='en', order=10)
+        for product in self.products[:3]:
+            product.content = '<p>Tomato</p>'
+            product.save()
+        slugs, _ = self.collect('/api/en/products/', {'search': 'tomato', 'page_size': 2})
+        self.assertEqual(slugs[0], best.slug)
+        self.assertEqual(slugs, [item['slug'] for item in self.client.get('/api/en/products/', {'search': 'tomato'}).json()])
+        self.assertCountEqual(slugs, [best.slug] + [product.slug for product in self.products[:3]])
+
+    def test_images_paginate_by_id(self):
+        for i in range(3):
+            Image.objects.create(image=f'images/{i}.jpg')
+        ids, _ = self.collect('/api/images/', {'page_size': 2}, key='id')
+        self.assertEqual(ids, sorted(Image.objects.values_list('id', flat=True)))
+
+@override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        self.product = Product.objects.create(title='Tomato', content='<p>Red</p>', lang='en')
+        Product.objects.create(title='Domates', content='<p>Kırmızı</p>', lang='tr')
+
+    def test_routes_emit_strong_etag_and_last_modified(self):
+        for url in ('/api/en/products/', '/api/en/product/tomato/', '/api/products/', '/products/', '/api/menuitems/', '/api/social/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['ETag'].startswith('"'))
+                self.assertIn('Last-Modified', response)
+
+    def test_matching_etag_gets_304_without_running_the_view(self):
+        etag = self.client.get('/api/en/products/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/en/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        last_modified = self.client.get('/api/en/products/')['Last-Modified']
+        self.assertEqual(self.client.get('/api/en/products/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_etag_follows_the_language_content_version(self):
+        en = self.client.get('/api/en/products/')['ETag']
+        tr = self.client.get('/api/tr/products/')['ETag']
+        self.assertNotEqual(en, tr)
+        Product.objects.create(title='Biber', content='', lang='tr')
+        self.assertEqual(self.client.get('/api/en/products/', HTTP_IF_NONE_MATCH=en).status_code, 304)
+        self.assertEqual(self.client.get('/api/tr/products/', HTTP_IF_NONE_MATCH=tr).status_code, 200)
+        self.product.save()
+        self.assertEqual(self.client.get('/api/en/products/', HTTP_IF_NONE_MATCH=en).status_code, 200)
+
+    def test_version_never_goes_backwards_when_the_cache_is_flushed(self):
+        last_modified = self.client.get('/api/en/products/')['Last-Modified']
+        version = versioning.get_version('en')
+        content_cache().clear()
+        self.assertGreater(versioning.get_version('en'), version)
+        self.assertGreaterEqual(parse_http_date(self.client.get('/api/en/products/')['Last-Modified']), parse_http_date(last_modified))
+        # A later updated_at (a clock ahead, an imported row) still wins
+        later = timezone.now() + timedelta(days=1)
+        Product.objects.filter(pk=self.product.pk).update(updated_at=later)
+        content_cache().clear()
+        self.assertEqual(versioning.get_version('en'), int(later.timestamp() * 1_000_000))
+
+class FakeRedis:
+    """In-process stand-in for the redis-py client; instances for the same URL share one keyspace."""
+    servers = {}
+
+    def __init__(self, url):
+        self.data = self.servers.setdefault(url, {})
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def pexpire(self, key, ms):
+        return key in self.data
+
+    def persist(self, key):
+        return key in self.data
+
+    def flushdb(self):
+        self.data.clear()
+
+FAKE_REDIS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'content': {
+        'BACKEND': 'content.cache_backends.RedisCompatibleCache',
+        'LOCATION': 'redis://stand-in/0',
+        'OPTIONS': {'CLIENT_FACTORY': 'content.tests.FakeRedis'},
+    },
+}
+
+@override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        self.product = Product.objects.create(title='Tomato', content='<p>Red</p>', lang='en')
+        self.category = Category.objects.create(title='Vegetables', lang='en')
+        Product.objects.create(title='Domates', content='<p>Kırmızı</p>', lang='tr')
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get('/api/en/products/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/en/products/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_key_includes_query_string_and_language(self):
+        self.client.get('/api/en/products/')
+        self.assertEqual(self.client.get('/api/en/products/', {'fields': 'title'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/tr/products/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/menuitems/', {'lang': 'en'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/menuitems/', {'lang': 'tr'})['X-Cache'], 'MISS')
+
+    def test_save_delete_and_relation_changes_invalidate(self):
+        self.client.get('/api/en/products/')
+        self.client.get('/api/tr/products/')
+        self.product.title = 'Cherry Tomato'
+        self.product.save()
+        response = self.client.get('/api/en/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Cherry Tomato')
+        self.assertEqual(self.client.get('/api/tr/products/')['X-Cache'], 'HIT')
+
+        self.product.categories.add(self.category)
+        response = self.client.get('/api/en/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'vegetables')
+
+        self.product.delete()
+        self.assertNotContains(self.client.get('/api/en/products/'), 'Cherry Tomato')
+
+    def test_routes_listing_every_language_follow_edits_in_any(self):
+        etag = self.client.get('/api/en/categories/')['ETag']
+        Category.objects.create(title='Sebzeler', lang='tr')
+        response = self.client.get('/api/en/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Sebzeler')
+
+    def test_errors_and_browsable_api_are_not_cached(self):
+        self.client.get('/api/en/product/missing/')
+        self.assertEqual(self.client.get('/api/en/product/missing/')['X-Cache'], 'MISS')
+        self.client.get('/api/en/products/', HTTP_ACCEPT='text/html')
+        self.assertEqual(self.client.get('/api/en/products/', HTTP_ACCEPT='text/html')['X-Cache'], 'MISS')
+
+@override_settings(CACHES=FAKE_REDIS_CACHES, CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+class RedisCompatibleCacheTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        self.product = Product.objects.create(title='Tomato', content='<p>Red</p>', lang='en')
+
+    def test_cache_api(self):
+        cache = content_cache()
+        self.assertTrue(cache.add('a', {'x': 1}))
+        self.assertFalse(cache.add('a', 2))
+        self.assertEqual(cache.get('a'), {'x': 1})
+        cache.set_many({'b': 2, 'c': 3})
+        self.assertEqual(cache.get_many(['a', 'b', 'missing']), {'a': {'x': 1}, 'b': 2})
+        self.assertTrue(cache.delete('a'))
+        self.assertIsNone(cache.get('a'))
+        cache.clear()
+        self.assertFalse(cache.has_key('b'))
+
+    def test_versions_and_responses_are_shared_through_the_server(self):
+        self.assertEqual(self.client.get('/api/en/products/')['X-Cache'], 'MISS')
+        self.assertTrue(any(key.startswith(':1:content:version:') for key in FakeRedis.servers['redis://stand-in/0']))
+        self.assertEqual(self.client.get('/api/en/products/')['X-Cache'], 'HIT')
+        self.product.save()
+        self.assertEqual(self.client.get('/api/en/products/')['X-Cache'], 'MISS')
+
+def run_inline(self, func, *args):
+    func(*args)
+
+class CoalescingTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        middleware.response_cache_stats(reset=True)
+        self.product = Product.objects.create(title='Tomato', content='<p>Red</p>', lang='en')
+        self.key = middleware.response_cache_key('/api/en/products/', '', 'en')
+
+    @override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+    def test_concurrent_miss_waits_for_the_lock_holder(self):
+        self.client.get('/api/en/products/')
+        entry = content_cache().get(self.key)
+        self.product.save()
+        version = versioning.get_version('en')
+        # Another worker holds the lock for the new version and stores its entry a moment later
+        content_cache().add(middleware.response_lock_key(self.key, version), 1)
+        timer = threading.Timer(0.1, content_cache().set, (self.key, (version,) + entry[1:]))
+        timer.start()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/en/products/')
+        timer.join()
+        self.assertEqual(response['X-Cache'], 'COALESCED')
+        self.assertEqual(response.content, entry[2])
+        self.assertEqual(middleware.response_cache_stats(), {'hit': 0, 'miss': 1, 'stale': 0, 'coalesced': 1})
+
+    @override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False, CONTENT_RESPONSE_CACHE_LOCK_TIMEOUT=1)
+    def test_waiter_renders_itself_when_the_lock_is_released_without_an_entry(self):
+        version = versioning.get_version('en')
+        lock = middleware.response_lock_key(self.key, version)
+        content_cache().add(lock, 1)
+        threading.Timer(0.1, content_cache().delete, (lock,)).start()
+        response = self.client.get('/api/en/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Tomato')
+
+    def test_first_request_after_an_edit_is_fresh_by_default(self):
+        self.client.get('/api/en/products/')
+        self.product.title = 'Cherry Tomato'
+        self.product.save()
+        response = self.client.get('/api/en/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Cherry Tomato')
+
+    @override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=True)
+    @mock.patch.object(middleware.ResponseCacheMiddleware, 'run_in_background', run_inline)
+    def test_stale_body_is_served_while_one_request_refreshes(self):
+        first = self.client.get('/api/en/products/')
+        self.product.title = 'Cherry Tomato'
+        self.product.save()
+        stale = self.client.get('/api/en/products/')
+        self.assertEqual(stale['X-Cache'], 'STALE')
+        self.assertEqual(stale.content, first.content)
+        self.assertEqual(stale['ETag'], first['ETag'])
+        fresh = self.client.get('/api/en/products/')
+        self.assertEqual(fresh['X-Cache'], 'HIT')
+        self.assertContains(fresh, 'Cherry Tomato')
+        self.assertNotEqual(fresh['ETag'], first['ETag'])
+        self.assertEqual(middleware.response_cache_stats(reset=True), {'hit': 1, 'miss': 1, 'stale': 1, 'coalesced': 0})
+        self.assertEqual(middleware.response_cache_stats()['hit'], 0)
+
+    @override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=True)
+    def test_only_the_lock_holder_refreshes(self):
+        self.client.get('/api/en/products/')
+        self.product.save()
+        refreshes = []
+        with mock.patch.object(middleware.ResponseCacheMiddleware, 'run_in_background', lambda self, func, *args: refreshes.append(args)):
+            self.assertEqual(self.client.get('/api/en/products/')['X-Cache'], 'STALE')
+            self.assertEqual(self.client.get('/api/en/products/')['X-Cache'], 'STALE')
+        self.assertEqual(len(refreshes), 1)
+        # The refresh renders a copy of the request, not the one the request thread goes on with
+        refresh_request = refreshes[0][0]
+        self.assertEqual(refresh_request.get_full_path(), '/api/en/products/')
+        self.assertFalse(hasattr(refresh_request, '_response_cache'))
+
+class FakePurger:
+    purged = []
+
+    def __init__(self, **options):
+        pass
+
+    def purge(self, keys):
+        self.purged.append(set(keys))
+
+@override_settings(CONTENT_PURGER={'BACKEND': 'content.tests.FakePurger'}, CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+class SurrogateKeyTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.image = Image.objects.create(image='images/tomato.jpg')
+            self.category = Category.objects.create(title='Vegetables', lang='en')
+            self.product = Product.objects.create(title='Tomato', content='<p>Red</p>', lang='en', image=self.image)
+            self.product.categories.add(self.category)
+            self.home = HomePage.objects.create(title='Home', lang='en')
+            Social.objects.create()
+        FakePurger.purged.clear()
+
+    def keys(self, url, **params):
+        return set(self.client.get(url, params)['Surrogate-Key'].split())
+
+    def test_responses_name_the_objects_they_render(self):
+        self.assertEqual(self.keys('/api/en/product/tomato/'), {f'product:{self.product.pk}', f'category:{self.category.pk}', f'image:{self.image.pk}'})
+        self.assertEqual(self.keys('/api/en/products/'), {'products:en', f'product:{self.product.pk}', f'category:{self.category.pk}', f'image:{self.image.pk}'})
+        self.assertEqual(self.keys('/api/menuitems/', lang='tr'), {'menu:tr'})
+        self.assertIn('social', self.keys('/api/social/'))
+        self.assertIn(f'homepage:{self.home.pk}', self.keys('/api/en/homepage/'))
+        self.assertIn(f'product:{self.product.pk}', self.keys('/api/en/search/', q='tomato'))
+        self.assertEqual(self.client.get('/api/en/product/tomato/')['X-Cache'], 'HIT')
+        self.assertIn(f'product:{self.product.pk}', self.keys('/api/en/product/tomato/'))
+
+    def purged(self):
+        return set().union(*FakePurger.purged)
+
+    def test_saving_purges_the_object_and_its_lists_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = 'Cherry Tomato'
+            self.product.save()
+            self.product.categories.remove(self.category)
+        self.assertEqual(len(FakePurger.purged), 1)
+        purged = self.purged()
+        self.assertTrue({f'product:{self.product.pk}', 'products:en', 'products', 'search:en'} <= purged)
+        self.assertNotIn('products:tr', purged)
+        self.assertNotIn(f'category:{self.category.pk}', purged)
+
+    def test_reverse_relation_change_purges_the_related_objects(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Product.objects.create(title='Pepper', content='', lang='en')
+        FakePurger.purged.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.product_set.add(other)
+        purged = self.purged()
+        self.assertTrue({f'category:{self.category.pk}', f'product:{other.pk}', 'products:en'} <= purged)
+        self.assertNotIn('categories:en', purged)
+
+    def test_category_routes_follow_categories_of_every_language(self):
+        keys = self.keys('/api/en/categories/') | self.keys(f'/api/en/category/{self.category.slug}/')
+        self.assertIn('categories', keys)
+        self.assertNotIn('categories:en', keys)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title='Sebzeler', lang='tr')
+        self.assertTrue(keys & self.purged())
+
+    def test_menu_and_social_edits_purge_their_keys(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(title='About', lang='tr')
+            Social.objects.get().save()
+        self.assertTrue({'menu', 'menu:en', 'menu:tr', 'social'} <= self.purged())
+
+    def test_failing_purger_does_not_break_saving(self):
+        with mock.patch.object(FakePurger, 'purge', side_effect=OSError), self.assertLogs('content.surrogate', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+
+class RevalidationStandIn(BaseHTTPRequestHandler):
+    """Plays the frontend's revalidation route, answering with the queued statuses (200 once they run out)."""
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.received.append((self.headers['X-Revalidate-Secret'], body))
+        self.send_response(self.server.statuses.pop(0) if self.server.statuses else 200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class RevalidationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), RevalidationStandIn)
+        cls.server.received, cls.server.statuses = [], []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = override_settings(
+            FRONTEND_REVALIDATE_URL=f'http://127.0.0.1:{cls.server.server_port}/api/revalidate',
+            FRONTEND_REVALIDATE_SECRET='sekret',
+            FRONTEND_REVALIDATE_DEBOUNCE=0.1,
+            FRONTEND_REVALIDATE_BACKOFF=0.01,
+            # The queue thread can't see this test's uncommitted rows, see RevalidationWarmingTests
+            FRONTEND_REVALIDATE_WARM=False,
+        )
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(title='Vegetables', lang='en')
+            self.product = Product.objects.create(title='Tomato', content='', lang='en')
+            self.product.categories.add(self.category)
+            HomePage.objects.create(title='Home', lang='en').products.add(self.product)
+        self.wait_for(1)
+        self.server.received.clear()
+        self.server.statuses = []
+
+    def wait_for(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.server.received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Give a wrongly split batch the chance to show up
+        time.sleep(0.2)
+        return [body for _, body in self.server.received]
+
+    def test_saving_a_product_revalidates_its_pages(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        [body] = self.wait_for(1)
+        self.assertEqual(set(body['paths']), {'/en/product/tomato', '/en/products', '/en/category/vegetables', '/en'})
+        self.assertFalse(body['layout'])
+        self.assertEqual(self.server.received[0][0], 'sekret')
+
+    def test_edits_in_quick_succession_are_sent_together(self):
+        for title in ('Pepper', 'Cucumber'):
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.create(title=title, content='', lang='tr')
+        [body] = self.wait_for(1)
+        self.assertEqual(set(body['paths']), {'/tr/product/pepper', '/tr/product/cucumber', '/tr/products'})
+
+    def test_renamed_slug_revalidates_the_old_path(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.slug = 'cherry-tomato'
+            self.product.save()
+        [body] = self.wait_for(1)
+        self.assertTrue({'/en/product/tomato', '/en/product/cherry-tomato'} <= set(body['paths']))
+
+    def test_menu_changes_revalidate_the_layout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(title='About', lang='en')
+        [body] = self.wait_for(1)
+        self.assertEqual(body, {'paths': [], 'layout': True})
+
+    def test_failed_calls_are_retried(self):
+        self.server.statuses = [503, 502]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        bodies = self.wait_for(3)
+        self.assertEqual(len(bodies), 3)
+        self.assertEqual(bodies[0], bodies[2])
+
+    @override_settings(FRONTEND_REVALIDATE_BATCH_SIZE=2)
+    def test_paths_are_sent_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        bodies = self.wait_for(2)
+        self.assertEqual([len(body['paths']) for body in bodies], [2, 2])
+
+    def test_a_failed_flush_leaves_the_queue_running(self):
+        # Anything but a requests error escapes send()
+        with mock.patch('content.revalidation.requests.post', side_effect=RuntimeError), self.assertLogs('content.revalidation', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.category.save()
+            time.sleep(0.3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        [body] = self.wait_for(1)
+        self.assertIn('/en/product/tomato', body['paths'])
+
+class RevalidationWarmingTests(TransactionTestCase):
+    # The queue thread renders with its own connection, so the edits have to be committed
+    def setUp(self):
+        content_cache().clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RevalidationStandIn)
+        self.server.received, self.server.statuses = [], []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings = override_settings(
+            FRONTEND_REVALIDATE_URL=f'http://127.0.0.1:{self.server.server_port}/api/revalidate',
+            FRONTEND_REVALIDATE_DEBOUNCE=0.1,
+            CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=True,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def wait_for(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.server.received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.server.received), count)
+
+    def test_the_frontend_fetches_the_edited_body_after_revalidation(self):
+        product = Product.objects.create(title='Tomato', content='<p>Green</p>', lang='en')
+        self.wait_for(1)
+        self.client.get('/api/en/product/tomato/', HTTP_ACCEPT='*/*')
+        product.content = '<p>Ripe</p>'
+        product.save()
+        self.wait_for(2)
+        response = self.client.get('/api/en/product/tomato/', HTTP_ACCEPT='*/*')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['content'], '<p>Ripe</p>')
+
+class BundleTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        create_catalog(products=3)
+
+    def test_parts_match_their_own_routes(self):
+        bundle = self.client.get('/api/en/bundle/').json()
+        self.assertEqual(list(bundle), ['menu', 'categories', 'social', 'homepage'])
+        self.assertEqual(bundle['menu'], self.client.get('/api/menuitems/', {'lang': 'en'}).json())
+        # /api/<lang>/categories/ lists every language, the bundle only the requested one
+        self.assertEqual(bundle['categories'], [item for item in self.client.get('/api/en/categories/').json() if item['lang'] == 'en'])
+        self.assertEqual(bundle['social'], self.client.get('/api/social/').json())
+        self.assertEqual(bundle['homepage'], self.client.get('/api/en/homepage/').json())
+
+    def test_include_selects_parts(self):
+        bundle = self.client.get('/api/tr/bundle/', {'include': 'social,menu'}).json()
+        self.assertEqual(list(bundle), ['social', 'menu'])
+        self.assertEqual(self.client.get('/api/en/bundle/', {'include': 'menu,prices'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/de/bundle/').status_code, 404)
+
+    def test_query_count_does_not_grow_with_the_catalog(self):
+        for lang in (None, 'en'):
+            versioning.get_version(lang)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/en/bundle/')
+        create_catalog(products=10, prefix='More ')
+        content_cache().clear()
+        versioning.get_version('en')
+        with CaptureQueriesContext(connection) as large:
+            self.client.get('/api/en/bundle/')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_cached_as_one_response_and_tagged(self):
+        first = self.client.get('/api/en/bundle/')
+        self.assertTrue({'menu:en', 'categories:en', 'social', 'homepages:en'} <= set(first['Surrogate-Key'].split()))
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/en/bundle/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+@override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+class BatchTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        create_catalog(products=2)
+
+    def batch(self, payload, **extra):
+        return self.client.post('/api/batch/', payload, content_type='application/json', **extra)
+
+    def test_results_match_separate_requests(self):
+        paths = ['/api/en/products/', '/api/en/product/product-en-1/', '/api/menuitems/?lang=tr']
+        response = self.batch({'paths': paths})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual([item['path'] for item in results], paths)
+        for item in results:
+            self.assertEqual(item['status'], 200)
+            self.assertEqual(item['body'], self.client.get(item['path']).json())
+
+    def test_per_item_status(self):
+        results = self.batch(['/api/en/product/missing/', '/api/nowhere/', 'relative/', '/api/batch/']).json()
+        self.assertEqual([item['status'] for item in results], [404, 404, 400, 400])
+
+    def test_parts_go_through_the_response_cache(self):
+        # Parts are always rendered as JSON
+        self.client.get('/api/en/products/', HTTP_ACCEPT='application/json')
+        [item] = self.batch(['/api/en/products/']).json()
+        self.assertEqual(item['headers']['X-Cache'], 'HIT')
+        self.assertIn('ETag', item['headers'])
+
+    def test_conditional_headers_of_the_batch_call_are_not_forwarded(self):
+        etag = self.client.get('/api/en/products/')['ETag']
+        [item] = self.batch(['/api/en/products/'], HTTP_IF_NONE_MATCH=etag).json()
+        self.assertEqual(item['status'], 200)
+
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.batch({'paths': []}).status_code, 400)
+        self.assertEqual(self.batch({'paths': ['/api/social/'] * 21}).status_code, 400)
+        self.assertEqual(self.client.get('/api/batch/').status_code, 405)
+
+class ParallelBatchTests(TransactionTestCase):
+    # Worker threads use their own connections, so the data has to be committed
+    def test_parallel_results_keep_their_order(self):
+        content_cache().clear()
+        create_catalog(products=2)
+        paths = ['/api/en/products/', '/api/tr/products/', '/api/en/categories/', '/api/social/']
+        results = self.client.post('/api/batch/', {'paths': paths, 'parallel': True}, content_type='application/json').json()
+        self.assertEqual([item['path'] for item in results], paths)
+        self.assertEqual([item['status'] for item in results], [200] * 4)
+        self.assertEqual(results[1]['body'], self.client.get('/api/tr/products/').json())
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_catalog(products=2)
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(__import__('shutil').rmtree, self.root)
+
+    def export(self, incremental=False):
+        return snapshot.export_snapshot(self.root, 'testserver', incremental=incremental)
+
+    def read(self, path):
+        with open(snapshot.file_for(self.root, path), 'rb') as f:
+            return f.read()
+
+    def test_every_route_is_written_with_a_gzipped_copy(self):
+        result = self.export()
+        self.assertEqual(result['failed'], [])
+        for path in ('/api/en/products/', '/api/tr/product/product-tr-1/', '/api/en/page/page-en/', '/api/en/category/category-en-0/', '/api/menuitems/', '/api/social/', '/api/en/homepage/', '/api/tr/bundle/'):
+            with self.subTest(path=path):
+                body = self.read(path)
+                self.assertEqual(json.loads(body), self.client.get(path).json())
+                with open(snapshot.file_for(self.root, path) + '.gz', 'rb') as f:
+                    self.assertEqual(gzip.decompress(f.read()), body)
+
+    def test_incremental_run_rewrites_only_affected_files(self):
+        total = self.export()['rendered']
+        product = Product.objects.get(slug='product-en-1')
+        product.title = 'Renamed'
+        product.save()
+        result = self.export(incremental=True)
+        self.assertLess(result['rendered'], total / 2)
+        self.assertEqual(json.loads(self.read('/api/en/product/product-en-1/'))['title'], 'Renamed')
+        self.assertIn('Renamed', self.read('/api/en/products/').decode())
+        self.assertNotIn('Renamed', self.read('/api/tr/products/').decode())
+        self.assertEqual(self.export(incremental=True)['rendered'], len([p for p in snapshot.snapshot_routes() if 'social' in p or 'bundle' in p]))
+
+    def test_incremental_run_handles_new_and_deleted_objects(self):
+        self.export()
+        Product.objects.get(slug='product-en-0').delete()
+        Product.objects.create(title='Pepper', content='', lang='en')
+        result = self.export(incremental=True)
+        self.assertEqual(result['removed'], 1)
+        self.assertFalse(os.path.exists(snapshot.file_for(self.root, '/api/en/product/product-en-0/')))
+        self.assertIn('pepper', self.read('/api/en/product/pepper/').decode())
+        self.assertNotIn('product-en-0', self.read('/api/en/products/').decode())
+
+    def test_committed_edits_remove_the_files_rendering_them(self):
+        self.export()
+        product = Product.objects.get(slug='product-en-1')
+        with override_settings(STATIC_API_ROOT=self.root), self.captureOnCommitCallbacks(execute=True):
+            product.title = 'Renamed'
+            product.save()
+            # Until the commit the snapshot is still current
+            self.assertTrue(os.path.exists(snapshot.file_for(self.root, '/api/en/product/product-en-1/')))
+        for path in ('/api/en/product/product-en-1/', '/api/en/products/', '/api/en/homepage/'):
+            self.assertFalse(os.path.exists(snapshot.file_for(self.root, path)), path)
+            self.assertFalse(os.path.exists(snapshot.file_for(self.root, path) + '.gz'), path)
+        self.assertNotIn('Renamed', self.read('/api/tr/products/').decode())
+        self.export(incremental=True)
+        self.assertEqual(json.loads(self.read('/api/en/product/product-en-1/'))['title'], 'Renamed')
+
+@override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+class CompressionTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        create_catalog()
+
+    def test_gzip_is_negotiated_and_cached_compressed(self):
+        first = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertIn('compress;dur=', first['Server-Timing'])
+        plain = self.client.get('/api/en/products/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(gzip.decompress(first.content), plain.content)
+
+        with mock.patch('content.compression.gzip.compress') as compress:
+            second = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertIn('desc="cached"', second['Server-Timing'])
+
+    def test_refused_encodings_are_not_used(self):
+        response = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='*')
+        self.assertIn(response['Content-Encoding'], ('br', 'gzip'))
+
+    def test_weak_etag_still_revalidates(self):
+        etag = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        response = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_uncached_responses_are_compressed_on_the_fly(self):
+        response = self.client.post('/api/batch/', ['/api/en/products/', '/api/tr/products/'], content_type='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        parts = json.loads(gzip.decompress(response.content))
+        # Parts are rendered uncompressed whatever the batch call accepts
+        self.assertEqual([part['status'] for part in parts], [200, 200])
+
+    def test_small_bodies_and_level_setting(self):
+        with override_settings(CONTENT_COMPRESS_MIN_SIZE=10 ** 7):
+            self.assertFalse(self.client.get('/api/social/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        content_cache().clear()
+        with override_settings(CONTENT_GZIP_LEVEL=1):
+            fast = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip').content
+        content_cache().clear()
+        with override_settings(CONTENT_GZIP_LEVEL=9):
+            small = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip').content
+        self.assertEqual(gzip.decompress(fast), gzip.decompress(small))
+        self.assertLessEqual(len(small), len(fast))
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli_is_preferred_when_installed(self):
+        response = self.client.get('/api/en/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), self.client.get('/api/en/products/').content)
+
+@override_settings(CONTENT_DOCUMENTS=False, CONTENT_CATALOG=False)
+class FastPathTests(TestCase):
+    routes = [
+        '/api/en/products/', '/api/products/', '/api/en/products/?page_size=3', '/api/en/product/product-en-1/',
+        '/api/en/product/plain/', '/api/en/product/missing/', '/api/en/pages/', '/api/en/page/page-en/',
+        '/api/categories/', '/api/en/categories/?page_size=1', '/api/en/homepage/', '/api/homepage/', '/api/tr/bundle/',
+    ]
+
+    def setUp(self):
+        create_catalog()
+        # Rows without a cover image or relations
+        Product.objects.create(title='Plain', content='', lang='en', order=9)
+        Category.objects.create(title='Bare', lang='en', order=9)
+
+    def render(self, path, fast):
+        content_cache().clear()
+        with override_settings(CONTENT_FAST_READ_PATH=fast):
+            return self.client.get(path)
+
+    def test_routes_match_the_serializers_field_for_field(self):
+        for path in self.routes:
+            with self.subTest(path=path):
+                slow, fast = self.render(path, False), self.render(path, True)
+                self.assertEqual(fast.status_code, slow.status_code)
+                # Same keys in the same order, so the bodies are byte for byte equal
+                self.assertEqual(fast.content, slow.content)
+                self.assertEqual(fast.get('Surrogate-Key'), slow.get('Surrogate-Key'))
+
+    def test_renderers_match_the_serializers(self):
+        from . import fastpath, serializers
+        cases = [
+            (fastpath.product_details, serializers.ProductSerializer, Product.objects.all()),
+            (fastpath.product_cards, serializers.ProductCardSerializer, Product.objects.all()),
+            (fastpath.page_details, serializers.PageSerializer, Page.objects.all()),
+            (fastpath.page_cards, serializers.PageCardSerializer, Page.objects.all()),
+            (fastpath.category_details, serializers.CategorySerializer, Category.objects.all()),
+            (fastpath.homepages, serializers.HomePageSerializer, HomePage.objects.all()),
+        ]
+        for render, serializer_class, queryset in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = json.loads(json.dumps(serializer_class(queryset, many=True).data))
+                fast = json.loads(json.dumps(render(queryset)))
+                self.assertEqual(len(fast), len(expected))
+                for fast_item, expected_item in zip(fast, expected):
+                    self.assertEqual(list(fast_item), list(expected_item))
+                    for name in expected_item:
+                        self.assertEqual(fast_item[name], expected_item[name], f'{serializer_class.__name__}.{name}')
+
+    def test_sparse_fieldsets_use_the_serializers(self):
+        response = self.client.get('/api/en/products/', {'fields': 'slug'})
+        self.assertEqual(set(response.json()[0]), {'slug'})
+
+class DocumentTests(TestCase):
+    routes = FastPathTests.routes
+
+    def setUp(self):
+        create_catalog()
+        Product.objects.create(title='Plain', content='', lang='en', order=9)
+        Category.objects.create(title='Bare', lang='en', order=9)
+
+    def render(self, path, documents=True):
+        content_cache().clear()
+        with override_settings(CONTENT_DOCUMENTS=documents, CONTENT_FAST_READ_PATH=documents, CONTENT_CATALOG=False):
+            return self.client.get(path)
+
+    def assertServedLikeSerializers(self, paths=None):
+        for path in paths or self.routes:
+            with self.subTest(path=path):
+                slow, fast = self.render(path, documents=False), self.render(path)
+                self.assertEqual(fast.status_code, slow.status_code)
+                self.assertEqual(fast.content, slow.content)
+                self.assertEqual(fast.get('Surrogate-Key'), slow.get('Surrogate-Key'))
+                self.assertEqual(fast.get('Content-Type'), slow.get('Content-Type'))
+
+    def test_routes_match_the_serializers(self):
+        self.assertServedLikeSerializers()
+
+    def test_lists_are_read_without_building_objects(self):
+        content_cache().clear()
+        versioning.get_version('en')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/en/products/')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertIn('content_document', context.captured_queries[0]['sql'])
+
+    def test_edits_re_render_embedding_documents(self):
+        category = Category.objects.get(slug='category-en-0')
+        category.title = 'Renamed'
+        category.save()
+        image = Image.objects.create(image='images/new.jpg', alt_text='New')
+        product = Product.objects.get(slug='product-en-1')
+        product.image = image
+        product.save()
+        product.images.remove(Image.objects.get(alt_text='Photo 0'))
+        Image.objects.get(alt_text='Photo 1').delete()
+        HomePage.objects.get(lang='en').products.remove(Product.objects.get(slug='product-en-0'))
+        Product.objects.get(slug='product-en-2').delete()
+        self.assertIn('Renamed', self.render('/api/en/product/product-en-3/').content.decode())
+        self.assertServedLikeSerializers()
+
+    def test_edits_re_render_in_chunks(self):
+        from . import documents
+        category = Category.objects.get(slug='category-en-0')
+        with mock.patch.object(documents, 'CHUNK_SIZE', 2), mock.patch.object(documents, 'write_documents', wraps=documents.write_documents) as write:
+            category.title = 'Renamed'
+            category.save()
+        self.assertTrue(all(len(call.args[1]) <= 2 for call in write.call_args_list))
+        self.assertGreater(write.call_count, 2)
+        self.assertServedLikeSerializers()
+
+    def test_failed_edit_leaves_documents_alone(self):
+        before = self.render('/api/en/product/product-en-1/').content
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Category.objects.filter(slug='category-en-0').get().delete()
+            raise RuntimeError
+        self.assertEqual(self.render('/api/en/product/product-en-1/').content, before)
+
+    def test_rebuild_from_scratch(self):
+        Document.objects.all().delete()
+        call_command('rebuild_documents', stdout=io.StringIO())
+        self.assertServedLikeSerializers()
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        create_catalog(products=3)
+        with self.assertLogs('content.translations', 'WARNING'):
+            Product.objects.create(title='Plain', content='', lang='en', order=9, langslug='duz')
+        Product.objects.create(title='Duz', content='', lang='tr', order=9, langslug='plain')
+        MenuItem.objects.create(title='Products', link='/en/products/', order=1, lang='en')
+
+    def render(self, path, snapshot=True):
+        content_cache().clear()
+        with override_settings(CONTENT_CATALOG=snapshot, CONTENT_DOCUMENTS=False, CONTENT_FAST_READ_PATH=False):
+            return self.client.get(path)
+
+    def category_products(self, slug, snapshot=True):
+        from rest_framework.test import APIRequestFactory
+        from .views import CategoryProductsView
+        with override_settings(CONTENT_CATALOG=snapshot, CONTENT_FAST_READ_PATH=False):
+            response = CategoryProductsView.as_view()(APIRequestFactory().get('/'), slug=slug)
+            response.render()
+        return response
+
+    def test_routes_match_the_serializers(self):
+        for path in ('/api/en/product/product-en-1/', '/api/tr/product/duz/', '/api/products/plain/', '/api/en/product/duz/',
+                     '/api/en/page/page-en/', '/api/en/product/missing/', '/api/menuitems/', '/api/menuitems/?lang=tr'):
+            with self.subTest(path=path):
+                slow, fast = self.render(path, snapshot=False), self.render(path)
+                self.assertEqual(fast.status_code, slow.status_code)
+                self.assertEqual(fast.content, slow.content)
+                self.assertEqual(fast.get('Surrogate-Key'), slow.get('Surrogate-Key'))
+        self.assertEqual(self.category_products('category-en-1').content, self.category_products('category-en-1', snapshot=False).content)
+        self.assertEqual(self.category_products('missing').status_code, 404)
+
+    def test_reads_need_no_queries_once_built(self):
+        self.render('/api/en/product/product-en-1/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/en/product/product-en-2/').status_code, 200)
+            self.assertEqual(len(self.category_products('category-tr-0').data), 3)
+
+    def test_indexes(self):
+        snapshot = catalog.get_catalog()
+        self.assertEqual([record.slug for record in snapshot.category_products('category-en-0')], ['product-en-0', 'product-en-1', 'product-en-2'])
+        self.assertEqual([record.slug for record in snapshot.translations('product', 'plain')], ['duz'])
+        self.assertEqual(snapshot.get('page', 'page-tr', 'tr').data['title'], 'Page tr')
+        self.assertIsNone(snapshot.get('page', 'page-tr', 'en'))
+        with self.assertRaises(AttributeError):
+            snapshot.get('product', 'plain').extra = 1
+        with self.assertRaises(TypeError):
+            snapshot.by_slug['product', 'en', 'new'] = None
+
+    def test_snapshot_is_swapped_when_the_version_moves(self):
+        before = catalog.get_catalog()
+        self.assertIs(catalog.get_catalog(), before)
+        product = Product.objects.get(slug='product-en-0')
+        product.title = 'Renamed'
+        product.save()
+        after = catalog.get_catalog()
+        self.assertIsNot(after, before)
+        self.assertEqual(after.get('product', 'product-en-0').data['title'], 'Renamed')
+        self.assertEqual(before.get('product', 'product-en-0').data['title'], 'Product en 0')
+
+    def test_edits_render_again_only_the_records_they_change(self):
+        before = catalog.get_catalog()
+        category = Category.objects.get(slug='category-tr-0')
+        category.title = 'Sebzeler'
+        category.save()
+        Product.objects.get(slug='product-en-2').delete()
+        after = catalog.get_catalog()
+        self.assertIs(after.get('product', 'product-en-0'), before.get('product', 'product-en-0'))
+        self.assertIs(after.get('page', 'page-tr'), before.get('page', 'page-tr'))
+        self.assertEqual(after.get('product', 'product-tr-1').data['categories'][0]['title'], 'Sebzeler')
+        self.assertIsNone(after.get('product', 'product-en-2'))
+        self.assertEqual([record.slug for record in after.category_products('category-en-0')], ['product-en-0', 'product-en-1'])
+        # A bump that doesn't say what changed reads everything again
+        versioning.bump_version()
+        self.assertIsNot(catalog.get_catalog().get('product', 'product-en-0'), after.get('product', 'product-en-0'))
+
+class TranslationTests(TestCase):
+    def setUp(self):
+        content_cache().clear()
+        with self.assertLogs('content.translations', 'WARNING') as logs:
+            self.tomato = Product.objects.create(title='Tomato', content='', lang='en', langslug='domates')
+            self.domates = Product.objects.create(title='Domates', content='', lang='tr')
+            Page.objects.create(title='About Us', content='', lang='en', langslug='hakkimizda')
+            Page.objects.create(title='Hakkimizda', content='', lang='tr', langslug='about-us')
+            Category.objects.create(title='Tea', lang='en', langslug='missing')
+        # Links are only dangling until their counterpart is saved
+        self.assertEqual(len(logs.output), 3)
+
+    def test_links_resolve_in_both_directions(self):
+        self.assertEqual(self.client.get('/api/en/translations/product/tomato/').json(), {'en': 'tomato', 'tr': 'domates'})
+        # Domates has no langslug of its own, Tomato's link is enough
+        self.assertEqual(self.client.get('/api/tr/translations/product/domates/').json(), {'en': 'tomato', 'tr': 'domates'})
+        self.assertEqual(self.client.get('/api/tr/translations/category/tea/').status_code, 404)
+        self.assertEqual(self.client.get('/api/en/translations/category/tea/').json(), {'en': 'tea'})
+        self.assertEqual(self.client.get('/api/en/translations/post/tea/').status_code, 404)
+        with self.assertNumQueries(1):
+            from .translations import translations_of
+            translations_of('page', 'en', 'about-us')
+
+    def test_map_lists_every_object(self):
+        data = self.client.get('/api/translations/').json()
+        self.assertEqual(data['page']['tr']['hakkimizda'], {'en': 'about-us', 'tr': 'hakkimizda'})
+        self.assertEqual(data['product']['en']['tomato']['tr'], 'domates')
+        self.assertEqual(data['category'], {'en': {'tea': {'en': 'tea'}}})
+
+    def test_dangling_links_are_reported(self):
+        from .translations import rebuild_translations
+        with self.assertLogs('content.translations', 'WARNING'):
+            Product.objects.create(title='Biber', content='', lang='tr', langslug='pepper')
+            Product.objects.create(title='Cherry', content='', lang='en', langslug='tomato')
+        changed, dangling = rebuild_translations()
+        self.assertEqual(changed, set())
+        reasons = {(kind, slug): reason for kind, lang, slug, langslug, reason in dangling}
+        self.assertEqual(reasons[('category', 'tea')], 'no such slug')
+        self.assertEqual(reasons[('product', 'biber')], 'no such slug')
+        self.assertEqual(reasons[('product', 'cherry')], 'same language')
+        out = io.StringIO()
+        call_command('rebuild_translations', stdout=out)
+        self.assertIn('3 dangling', out.getvalue())
+
+    def test_saves_resolve_only_their_group(self):
+        from . import translations
+        Product.objects.bulk_create([Product(title=f'Other {i}', slug=f'other-{i}', lang='en', langslug=f'diger-{i}') for i in range(20)])
+        translations.rebuild_translations()
+        with mock.patch.object(translations, 'resolve', wraps=translations.resolve) as resolve:
+            self.tomato.slug = 'tomatoes'
+            self.tomato.save()
+            Product.objects.create(title='Pomodoro', content='', lang='it', langslug='tomatoes')
+            self.domates.delete()
+        self.assertEqual([sorted(row[2] for row in call.args[1]) for call in resolve.call_args_list], [
+            ['domates', 'tomatoes'], ['domates', 'pomodoro', 'tomatoes'], ['pomodoro', 'tomatoes'],
+        ])
+        self.assertEqual(translations.translations_of('product', 'it', 'pomodoro'), {'en': 'tomatoes', 'it': 'pomodoro'})
+        # The rows are those a full rebuild stores
+        self.assertEqual(translations.rebuild_translations()[0], set())
+
+    @override_settings(CONTENT_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=False)
+    def test_link_changes_refresh_every_language(self):
+        self.assertEqual(self.client.get('/api/tr/translations/product/domates/').json()['en'], 'tomato')
+        self.tomato.slug = 'tomatoes'
+        self.tomato.save()
+        self.assertEqual(self.client.get('/api/tr/translations/product/domates/').json()['en'], 'tomatoes')
+        self.tomato.langslug = ''
+        self.tomato.save()
+        self.assertEqual(self.client.get('/api/tr/translations/product/domates/').json(), {'tr': 'domates'})
+        self.domates.delete()
+        self.assertEqual(self.client.get('/api/tr/translations/product/domates/').status_code, 404)
+        # Content edits that leave the links alone don't touch the other language
+        tr = versioning.get_version('tr')
+        self.tomato.content = '<p>Red</p>'
+        self.tomato.save()
+        self.assertEqual(versioning.get_version('tr'), tr)
+
+def plan_problems(sql, params=()):
+    """
+    Full table scans and temporary sorts in the SQLite plan of a SELECT. A scan is fine when the
+    query has no WHERE clause (the route reads the whole table), a sort when the rows are fetched
+    by a list of keys (prefetches, a page of ids) and so bounded by it. FTS5 tables can't be
+    read any other way.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = [row[3] for row in cursor.fetchall()]
+    problems = []
+    for step in plan:
+        if 'VIRTUAL TABLE' in step:
+            continue
+        if step.startswith('SCAN') and ' WHERE ' in sql:
+            problems.append(step)
+        if 'TEMP B-TREE' in step and ' IN (' not in sql and not any('VIRTUAL TABLE' in other for other in plan):
+            problems.append(step)
+    return problems
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    routes = list(QueryBudgetTests.budgets) + [
+        '/api/menuitems/?lang=en',
+        '/api/en/products/?page_size=3',
+        '/api/en/pages/?page_size=1',
+        '/api/images/?page_size=2',
+        '/api/en/search/?q=product',
+        '/api/en/suggest/?q=pro',
+        '/api/en/products/?search=product',
+        '/api/translations/',
+        '/api/en/translations/product/product-en-1/',
+    ]
+    # Every read path, from the catalog snapshot down to the serializers
+    configurations = [
+        {},
+        {'CONTENT_CATALOG': False},
+        {'CONTENT_CATALOG': False, 'CONTENT_DOCUMENTS': False},
+        {'CONTENT_CATALOG': False, 'CONTENT_DOCUMENTS': False, 'CONTENT_FAST_READ_PATH': False},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(products=8)
+
+    def test_harness_flags_scans_and_sorts(self):
+        self.assertTrue(plan_problems(*Product.objects.filter(title='x').query.sql_with_params()))
+        self.assertTrue(plan_problems(*Product.objects.filter(lang='en').order_by('title').query.sql_with_params()))
+        self.assertEqual(plan_problems(*Product.objects.filter(lang='en').order_by('order', 'id').query.sql_with_params()), [])
+
+    def test_routes_use_indexes(self):
+        for settings in self.configurations:
+            with override_settings(**settings):
+                for url in self.routes:
+                    content_cache().clear()
+                    for lang in (None, 'en', 'tr'):
+                        versioning.get_version(lang)
+                    catalog.get_catalog()
+                    with CaptureQueriesContext(connection) as context:
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200, url)
+                    for query in context.captured_queries:
+                        if not query['sql'].lstrip().upper().startswith('SELECT'):
+                            continue
+                        with self.subTest(settings=settings, url=url, sql=query['sql']):
+                            self.assertEqual(plan_problems(query['sql']), [])
+
+class SyntheticCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rows = synthetic.generate_catalog(40)
+        bulk.rebuild_derived()
+
+    def test_catalog_follows_the_fixture(self):
+        shape = synthetic.load_shape()
+        self.assertEqual(self.rows['products'], 40)
+        self.assertEqual(Product.objects.filter(lang='tr').count(), 20)
+        product = Product.objects.filter(lang='en').order_by('order').first()
+        self.assertEqual(product.categories.count(), shape['categories_per_product'])
+        self.assertGreater(len(product.content), 1000)
+        self.assertEqual(translations_of('product', 'en', product.slug)['tr'], product.langslug)
+        self.assertEqual(HomePage.objects.get(lang='en').products.count(), shape['homepage_products'])
+        # Listing, category, product
+        self.assertTrue(MenuItem.objects.filter(parent__parent__isnull=False).exists())
+        response = self.client.get('/api/en/search/', {'q': product.title.split()[0]})
+        self.assertGreater(response.json()['count'], 0)
+
+    def test_benchmark_fills_in_every_route(self):
+        values = benchmark.sample_values()
+        paths = [path for _, _, path, _ in benchmark.benchmark_cases(values)]
+        self.assertIn(f'/api/en/product/{values["product", "slug"]}/', paths)
+        self.assertIn(f'/api/en/translations/product/{values["product", "slug"]}/', paths)
+        self.assertIn(f'/api/en/suggest/?q={values["prefix"]}', paths)
+        self.assertFalse([path for path in paths if '(?P' in path or '<' in path])
+        result = benchmark.RouteBenchmark(repeat=2).run('GET', '/api/en/products/', None)
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(set(result['miss_ms']), {'p50', 'p90', 'p95', 'p99', 'min', 'max', 'mean'})
+        self.assertIn('hit_ms', result)
+
+    def test_load_test_page_views_resolve(self):
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('checkout=5')
+        mix = loadtest.TrafficMix(loadtest.parse_mix('product=1,home=0'))
+        self.assertNotIn('home', mix.names)
+        rng = random.Random(0)
+        for _ in range(20):
+            view, fetches = mix.page_view(rng)
+            self.assertEqual([route for route, _ in fetches[:2]], list(loadtest.LAYOUT_FETCHES))
+            for route, path in fetches:
+                self.assertEqual(self.client.get(path, follow=True).status_code, 200, path)
+        product = Product.objects.first()
+        loadtest.admin_save(Product, product.pk, 'Changed by an admin.')
+        self.assertEqual(self.client.get(f'/api/{product.lang}/product/{product.slug}/').json()['pageinfo'], 'Changed by an admin.')
+
+
+class FixtureImportTests(TestCase):
+    def test_reads_arrays_and_lines_across_chunks(self):
+        objects = [{'model': 'content.image', 'pk': n, 'fields': {'alt_text': 'x' * n + ' ] , ['}} for n in range(1, 40)]
+        for text in (json.dumps(objects, indent=4), '\n'.join(json.dumps(obj) for obj in objects)):
+            self.assertEqual(list(fixtures.read_objects(io.StringIO(text), read_size=7)), objects)
+
+    def test_loads_the_datadump(self):
+        counts = fixtures.load_fixtures([synthetic.DATADUMP], log=lambda message: None)
+        self.assertEqual(counts['content.Product'], 8)
+        product = Product.objects.order_by('pk').first()
+        self.assertEqual(product.date_posted.year, 2023)
+        self.assertTrue(product.categories.exists())
+        self.assertTrue(product.search_key)
+        self.assertEqual(self.client.get('/api/en/search/', {'q': product.title.split()[0]}).status_code, 200)
+        page_item = MenuItem.objects.filter(page__isnull=False).select_related('page').first()
+        self.assertEqual(page_item.link, page_item.page_link())
+        # Loading again updates the rows in place and replaces the relations
+        Product.categories.through.objects.filter(product=product).delete()
+        product.categories.add(Category.objects.exclude(lang=product.lang).first())
+        fixtures.load_fixtures([synthetic.DATADUMP])
+        self.assertEqual(Product.objects.count(), 8)
+        self.assertFalse(product.categories.exclude(lang=product.lang).exists())
+
+    def test_dumped_timestamps_are_kept_and_a_failed_rebuild_loads_nothing(self):
+        def fixture(directory, pk):
+            path = os.path.join(directory, f'{pk}.jsonl')
+            with open(path, 'w') as f:
+                f.write(json.dumps({'model': 'content.product', 'pk': pk, 'fields': {'title': 'Dumped', 'content': '', 'lang': 'en', 'updated_at': '2020-01-02T03:04:05Z'}}))
+            return path
+        with tempfile.TemporaryDirectory() as directory:
+            # The second load updates the row in place
+            for _ in range(2):
+                fixtures.load_fixtures([fixture(directory, 900)])
+                self.assertEqual(Product.objects.get(pk=900).updated_at.year, 2020)
+            # Saves elsewhere in the process keep stamping while the rows go in
+            upsert = fixtures.upsert
+
+            def save_during_upsert(model, instances):
+                upsert(model, instances)
+                other = Product.objects.create(title='Saved meanwhile', content='', lang='en', updated_at=timezone.now() - timedelta(days=400))
+                self.assertEqual(Product.objects.get(pk=other.pk).updated_at.date(), timezone.now().date())
+                other.delete()
+
+            with mock.patch.object(fixtures, 'upsert', side_effect=save_during_upsert):
+                fixtures.load_fixtures([fixture(directory, 900)])
+            self.assertEqual(Product.objects.get(pk=900).updated_at.year, 2020)
+            with mock.patch.object(fixtures, 'rebuild_derived', side_effect=DatabaseError('disk full')):
+                with self.assertRaisesMessage(CommandError, 'nothing was loaded'):
+                    call_command('import_content', fixture(directory, 901), verbosity=0)
+        self.assertFalse(Product.objects.filter(pk=901).exists())
+
+    def test_export_since_sees_relation_changes(self):
+        product = Product.objects.create(title='Tomato', content='', lang='en')
+        category = Category.objects.create(title='Vegetables', lang='en')
+        home = HomePage.objects.create(title='Home', lang='en')
+
+        def exported_since(since, *relate):
+            for change in relate:
+                change()
+            out = io.StringIO()
+            call_command('export_content', since=since.isoformat(), stdout=out, verbosity=0)
+            return {(obj['model'], obj['pk']) for obj in map(json.loads, out.getvalue().splitlines())}
+
+        self.assertIn(('content.product', product.pk), exported_since(timezone.now(), lambda: product.categories.add(category)))
+        self.assertIn(('content.homepage', home.pk), exported_since(timezone.now(), lambda: product.homepage_set.add(home)))
+        self.assertIn(('content.product', product.pk), exported_since(timezone.now(), category.product_set.clear))
+        self.assertEqual(exported_since(timezone.now()), set())
+
+    def test_export_reads_back(self):
+        fixtures.load_fixtures([synthetic.DATADUMP])
+        product = Product.objects.filter(categories__isnull=False).order_by('pk').first()
+        categories = set(product.categories.values_list('pk', flat=True))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'content.jsonl.gz')
+            call_command('export_content', output=path, verbosity=0)
+            with fixtures.open_fixture(path) as stream:
+                objects = list(fixtures.read_objects(stream))
+            self.assertEqual({obj['model'] for obj in objects}, {'content.category', 'content.page', 'content.product', 'content.homepage', 'content.menuitem'})
+            dumped = next(obj for obj in objects if obj['model'] == 'content.product' and obj['pk'] == product.pk)
+            self.assertEqual(set(dumped['fields']['categories']), categories)
+
+            Product.objects.all().delete()
+            fixtures.load_fixtures([path])
+            self.assertEqual(Product.objects.count(), 8)
+            self.assertEqual(set(Product.objects.get(pk=product.pk).categories.values_list('pk', flat=True)), categories)
+
+        out = io.StringIO()
+        call_command('export_content', lang='tr', stdout=out, verbosity=0)
+        self.assertEqual({json.loads(line)['fields']['lang'] for line in out.getvalue().splitlines()}, {'tr'})
+        Product.objects.filter(pk=product.pk).update(updated_at=timezone.now() + timedelta(days=1))
+        out = io.StringIO()
+        call_command('export_content', since=(timezone.now() + timedelta(hours=1)).isoformat(), stdout=out, verbosity=0)
+        self.assertEqual([json.loads(line)['pk'] for line in out.getvalue().splitlines()], [product.pk])
@@ -0,0 +1,142 @@
+import logging
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q
+from .models import Category, Product, Page, Translation
+
+# Translation links. `langslug` is free text holding the slug of the object's counterpart in the
+# other language. Links are resolved when a product, page or category is saved or deleted:
+# objects joined by a link in either direction form a group, and every member gets one row per
+# language of its group (its own included), so the counterpart of (type, lang, slug) in any
+# language is one indexed lookup. Links that can't be resolved are reported as dangling. A save
+# resolves only the group of the object; rebuild_translations resolves every object.
+
+logger = logging.getLogger(__name__)
+
+TRANSLATABLE = {'product': Product, 'page': Page, 'category': Category}
+LINK_FIELDS = ('lang', 'slug', 'langslug')
+
+def kind_of(instance):
+    name = instance._meta.model_name
+    return name if name in TRANSLATABLE else None
+
+def link_group(kind, slugs):
+    """
+    The (pk, lang, slug, langslug) rows of the objects joined to the given slugs by links in either
+    direction, sorted by pk, and every slug met on the way.
+    """
+    model = TRANSLATABLE[kind]
+    rows, seen, frontier = {}, set(), {slug for slug in slugs if slug}
+    while frontier:
+        seen |= frontier
+        found = model.objects.filter(Q(slug__in=frontier) | Q(langslug__in=frontier)).values_list('pk', 'lang', 'slug', 'langslug')
+        frontier = set()
+        for row in found:
+            rows[row[0]] = row
+            frontier |= {slug for slug in row[2:] if slug} - seen
+    return [rows[pk] for pk in sorted(rows)], seen
+
+def resolve(kind, objects=None):
+    """
+    The {(lang, slug): {lang: slug}} map of the objects of kind (every one by default), and the
+    dangling links as (kind, lang, slug, langslug, reason).
+    """
+    if objects is None:
+        objects = list(TRANSLATABLE[kind].objects.order_by('pk').values_list('pk', 'lang', 'slug', 'langslug'))
+    by_slug = {slug: (pk, lang) for pk, lang, slug, _ in objects}
+    parent = {pk: pk for pk, _, _, _ in objects}
+
+    def find(pk):
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    dangling, linked = [], {}
+    for pk, lang, slug, langslug in objects:
+        if not langslug:
+            continue
+        target = by_slug.get(langslug)
+        if target is None:
+            dangling.append((kind, lang, slug, langslug, 'no such slug'))
+        elif target[1] == lang:
+            dangling.append((kind, lang, slug, langslug, 'same language'))
+        else:
+            linked[pk] = (target[1], langslug)
+            parent[find(pk)] = find(target[0])
+
+    groups = defaultdict(list)
+    for pk, lang, slug, _ in objects:
+        groups[find(pk)].append((pk, lang, slug))
+    translations = {}
+    for members in groups.values():
+        first = {}
+        for pk, lang, slug in members:
+            first.setdefault(lang, slug)
+        if len(first) < len(members):
+            slugs = ', '.join(f'{lang}/{slug}' for _, lang, slug in members)
+            dangling += [(kind, lang, slug, '', f'several {lang} objects linked together: {slugs}') for pk, lang, slug in members if first[lang] != slug]
+        for pk, lang, slug in members:
+            # An object's own link wins over the rest of its group
+            mapping = dict(first, **{lang: slug})
+            if pk in linked:
+                mapping[linked[pk][0]] = linked[pk][1]
+            translations[lang, slug] = mapping
+    return translations, dangling
+
+def rebuild_translations(kinds=None):
+    """
+    Resolve the links of the given kinds (all by default) and store the rows that changed.
+    Returns the languages whose rows changed and the dangling links.
+    """
+    changed, dangling = set(), []
+    with transaction.atomic():
+        for kind in kinds or TRANSLATABLE:
+            translations, kind_dangling = resolve(kind)
+            dangling += kind_dangling
+            changed |= store(kind, translations)
+    return changed, dangling
+
+def store(kind, translations, slugs=None):
+    """Store the rows of resolved translations, replacing those of the given slugs (all of kind by default). Returns the languages whose rows changed."""
+    rows = {(lang, slug, target_lang, target_slug) for (lang, slug), mapping in translations.items() for target_lang, target_slug in mapping.items()}
+    stored = Translation.objects.filter(kind=kind)
+    if slugs is not None:
+        stored = stored.filter(slug__in=slugs)
+    stored = {row[1:]: row[0] for row in stored.values_list('pk', 'lang', 'slug', 'target_lang', 'target_slug')}
+    removed = {row: pk for row, pk in stored.items() if row not in rows}
+    added = [row for row in rows if row not in stored]
+    Translation.objects.filter(pk__in=removed.values()).delete()
+    Translation.objects.bulk_create([Translation(kind=kind, lang=row[0], slug=row[1], target_lang=row[2], target_slug=row[3]) for row in added], batch_size=500)
+    return {row[0] for row in added} | {row[0] for row in removed}
+
+def link_changed(instance):
+    """Whether a save changes the instance's language, slug or link, as remembered by remember_links."""
+    return getattr(instance, '_previous_links', None) != tuple(getattr(instance, name) for name in LINK_FIELDS)
+
+def update_translations(instance):
+    """Re-resolve the links of the instance's group, before and after the save. Returns the languages whose links changed."""
+    kind = kind_of(instance)
+    previous = getattr(instance, '_previous_links', None) or ()
+    objects, slugs = link_group(kind, {instance.slug, instance.langslug, *previous[1:]})
+    translations, dangling = resolve(kind, objects)
+    with transaction.atomic():
+        changed = store(kind, translations, slugs)
+    for link in dangling:
+        if link[1:3] == (getattr(instance, 'lang', None), getattr(instance, 'slug', None)):
+            logger.warning('Dangling translation link on %s %s/%s: %r (%s)', *link)
+    return changed
+
+def translation_map():
+    """{type: {lang: {slug: {lang: slug}}}} of every object."""
+    data = {kind: {} for kind in TRANSLATABLE}
+    for kind, lang, slug, target_lang, target_slug in Translation.objects.order_by('kind', 'lang', 'slug', 'target_lang').values_list(
+        'kind', 'lang', 'slug', 'target_lang', 'target_slug',
+    ):
+        data[kind].setdefault(lang, {}).setdefault(slug, {})[target_lang] = target_slug
+    return data
+
+def translations_of(kind, lang, slug):
+    """{lang: slug} of the object, or None when there is no such object."""
+    rows = Translation.objects.filter(kind=kind, lang=lang, slug=slug).order_by('target_lang').values_list('target_lang', 'target_slug')
+    return dict(rows) or None
@@ -0,0 +1,124 @@
+import time
+from datetime import timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from .cache import content_cache
+
+# Per-language content version stamps. Anything derived from content (prefix tries, cached
+# responses, ETags, ...) records the version it was built from and is rebuilt when the stamp moves.
+# Stamps are microsecond timestamps rather than counters, so they double as the Last-Modified
+# time. A missing stamp (a new or flushed cache) is seeded from the current time, or the newest
+# updated_at of the language's content when that is later, so the stamp, the ETags and
+# Last-Modified never go backwards; the first worker to seed it wins, the others read its value.
+#
+# Each bump is logged, before the stamps move, with the surrogate keys of what it was for, so an
+# in-process snapshot (content/catalog.py) can catch up by reading only those objects again.
+# A bump without keys, or a gap in the log, means anything may have changed.
+
+VERSION_KEY = 'content:version:{lang}'
+ALL_LANGUAGES = 'all'
+CHANGE_COUNT_KEY = 'content:changes'
+CHANGE_KEY = 'content:changes:{number}'
+CHANGE_LOG_TIMEOUT = 60 * 60
+# Further behind than this, a reader starts over rather than read the log back
+CHANGE_LOG_READ_LIMIT = 1000
+ANY_CHANGE = '*'
+
+def languages():
+    return [code for code, _ in settings.LANGUAGES]
+
+def _key(lang):
+    return VERSION_KEY.format(lang=lang or ALL_LANGUAGES)
+
+def _stamp():
+    return time.time_ns() // 1000
+
+def _seed(lang):
+    from .models import Category, Product, Page, HomePage, MenuItem, Image
+    selects, params = [], []
+    for model in (Category, Product, Page, HomePage, MenuItem, Image):
+        sql = f'SELECT MAX(updated_at) AS latest FROM {model._meta.db_table}'
+        if lang and model is not Image:
+            sql += ' WHERE lang = %s'
+            params.append(lang)
+        selects.append(sql)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MAX(latest) FROM (%s) AS updates' % ' UNION ALL '.join(selects), params)
+        latest = cursor.fetchone()[0]
+    if isinstance(latest, str):
+        latest = parse_datetime(latest)
+    if latest is None:
+        return _stamp()
+    if latest.tzinfo is None:
+        latest = latest.replace(tzinfo=timezone.utc)
+    return max(int(latest.timestamp() * 1_000_000), _stamp())
+
+def get_version(lang=None):
+    key, cache = _key(lang), content_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(lang), None)
+        version = cache.get(key)
+    return version
+
+def version_timestamp(version):
+    """The time a version stamp was taken, as a Unix timestamp in seconds."""
+    return version / 1_000_000
+
+def get_versions(langs):
+    keys = {_key(lang): lang for lang in langs}
+    found = content_cache().get_many(keys)
+    return {lang: found[key] if key in found else get_version(lang) for key, lang in keys.items()}
+
+def _log_change(stamp, keys):
+    cache, entry = content_cache(), (stamp, sorted(keys) if keys is not None else ANY_CHANGE)
+    cache.add(CHANGE_COUNT_KEY, 0, None)
+    try:
+        number = cache.incr(CHANGE_COUNT_KEY)
+        if not cache.add(CHANGE_KEY.format(number=number), entry, CHANGE_LOG_TIMEOUT):
+            # Not every backend increments atomically: with the number taken, make readers start over
+            cache.set(CHANGE_KEY.format(number=cache.incr(CHANGE_COUNT_KEY)), (stamp, ANY_CHANGE), CHANGE_LOG_TIMEOUT)
+    except ValueError:
+        # Evicted between add and incr: readers find no count and start over
+        pass
+
+def changes_since(position):
+    """
+    The surrogate keys logged since a position in the change log, and the current position, a
+    (number, stamp) pair. Keys are None when the log can't tell: no position, a gap, a change
+    logged without keys, or a log that was evicted and started over since.
+    """
+    cache = content_cache()
+    count = cache.get(CHANGE_COUNT_KEY)
+    if count is None:
+        return None, None
+    if position is not None and not 0 <= count - position[0] <= CHANGE_LOG_READ_LIMIT:
+        position = None
+    first = position[0] if position else count
+    names = [CHANGE_KEY.format(number=number) for number in range(first, count + 1)]
+    found = cache.get_many(names)
+    entries = [found.get(name) for name in names]
+    current = (count, entries[-1][0]) if entries[-1] is not None else None
+    if position is None or None in entries or entries[0][0] != position[1] or any(keys == ANY_CHANGE for _, keys in entries[1:]):
+        return None, current
+    return set().union(*(keys for _, keys in entries[1:])), current
+
+def _bump(langs, keys=None):
+    stamp = _stamp()
+    _log_change(stamp, keys)
+    content_cache().set_many({_key(lang): stamp for lang in set(langs) | {None}}, None)
+
+def bump_version(langs=None, keys=None):
+    """
+    Move the version stamp of the given languages (all of them by default), logging the surrogate
+    keys of what changed. The stamp is moved again when the surrounding transaction commits, so
+    nothing built from uncommitted data survives.
+    """
+    langs = [lang for lang in (langs or languages()) if lang]
+    _bump(langs, keys)
+    transaction.on_commit(lambda: _bump(langs, keys))
+
+def affected_languages(instance):
+    lang = getattr(instance, 'lang', None)
+    return [lang] if lang else languages()
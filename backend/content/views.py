@@ -1,25 +1,60 @@
 from rest_framework import viewsets, generics
+from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from .models import Category, Tag, Page, Product, Image, HomePage, MenuItem, Social
-from .serializers import CategorySerializer, TagSerializer, ProductSerializer, PageSerializer, ImageSerializer, HomePageSerializer, MenuItemSerializer, SocialSerializer
+from .serializers import CategorySerializer, TagSerializer, ProductSerializer, ProductCardSerializer, PageSerializer, PageCardSerializer, ImageSerializer, HomePageSerializer, MenuItemSerializer, SocialSerializer, SearchHitSerializer
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
+from .menu import get_menu_tree
+from .planner import QueryPlannerMixin
+from .catalog import CatalogReadMixin
+from .documents import DocumentReadMixin
+from .fastpath import FastReadMixin, category_details, product_details, product_cards, page_details, page_cards, homepages
+from .pagination import KeysetCursorPagination, IdCursorPagination, SearchPagination
+from .search import FullTextSearchFilter, SearchHits, KIND_CODES
+from .suggest import suggestions, MAX_SUGGESTIONS
+from .surrogate import SurrogateKeyViewMixin, collection_key
+from .bundle import BUNDLE_PARTS, build_bundle
+from .batch import BATCH_MAX_REQUESTS, run_batch
+from .translations import TRANSLATABLE, translation_map, translations_of
 
-class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
+class MenuItemViewSet(SurrogateKeyViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+    def get_surrogate_keys(self):
+        return {collection_key('menu', self.request.query_params.get('lang'))}
+
+    def list(self, request, *args, **kwargs):
+        # The tree is built from one query and cached per language, see content/menu.py
+        return Response(get_menu_tree(request.query_params.get('lang')))
+
+class CategoryViewSet(SurrogateKeyViewMixin, DocumentReadMixin, FastReadMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    fast_renderers = {'list': category_details}
+    document_kinds = {'list': 'category'}
+    # The category routes list every language, whatever the <lang> of the URL; the response cache
+    # and ETags follow the version of all languages (see middleware.request_language)
+    language_scoped = False
+    surrogate_collection = 'categories'
+    pagination_class = KeysetCursorPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['title', 'content', 'categoryinfo']
 
-class CategoryProductsView(generics.ListAPIView):
+class CategoryProductsView(SurrogateKeyViewMixin, CatalogReadMixin, FastReadMixin, QueryPlannerMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
+    fast_renderers = {'list': product_details}
+    surrogate_collection = 'products'
 
-    def get_queryset(self):
+    def list(self, request, *args, **kwargs):
+        if self.use_catalog() and not request.query_params:
+            return self.catalog_category_products(self.kwargs['slug'])
+        return super().list(request, *args, **kwargs)
+
+    def get_base_queryset(self):
         slug = self.kwargs['slug']
         category = Category.objects.get(slug=slug)
         return Product.objects.filter(categories=category)
@@ -36,12 +71,23 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(SurrogateKeyViewMixin, CatalogReadMixin, DocumentReadMixin, FastReadMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    fast_renderers = {'list': product_cards, 'by_slug': product_details}
+    document_kinds = {'list': 'product_card'}
+    catalog_kind = 'product'
+    surrogate_collection = 'products'
+    pagination_class = KeysetCursorPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['title', 'content', 'pageinfo']
 
-    def get_queryset(self):
+    def get_serializer_class(self):
+        # List routes render compact cards, detail routes the full object
+        if self.action == 'list':
+            return ProductCardSerializer
+        return super().get_serializer_class()
+
+    def get_base_queryset(self):
         queryset = Product.objects.all()
         if 'lang' in self.kwargs:
             queryset = queryset.filter(lang=self.kwargs['lang'])
@@ -53,17 +99,34 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, url_path='(?P<slug>[-\w]+)', methods=['get'])
     def by_slug(self, request, slug=None, *args, **kwargs):
-        product = self.get_queryset().filter(slug=slug).first()
-        if product:
-            serializer = self.get_serializer(product)
-            return Response(serializer.data)
-        else:
+        response = self.catalog_detail(slug)
+        if response is None:
+            # Slugs are unique, so the lookup needs no ordering
+            response = self.fast_detail(self.get_base_queryset().filter(slug=slug).order_by())
+        if response is not None:
+            return response
+        try:
+            product = self.get_queryset().get(slug=slug)
+        except Product.DoesNotExist:
             return Response({"detail": "Not found."}, status=404)
+        serializer = self.get_serializer(product)
+        return Response(serializer.data)
 
-class PageViewSet(viewsets.ReadOnlyModelViewSet):
+class PageViewSet(SurrogateKeyViewMixin, CatalogReadMixin, DocumentReadMixin, FastReadMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PageSerializer
+    fast_renderers = {'list': page_cards, 'by_slug': page_details}
+    document_kinds = {'list': 'page_card'}
+    catalog_kind = 'page'
+    surrogate_collection = 'pages'
+    pagination_class = KeysetCursorPagination
 
-    def get_queryset(self):
+    def get_serializer_class(self):
+        # List routes render compact cards, detail routes the full object
+        if self.action == 'list':
+            return PageCardSerializer
+        return super().get_serializer_class()
+
+    def get_base_queryset(self):
         queryset = Page.objects.all()
         if 'lang' in self.kwargs:
             queryset = queryset.filter(lang=self.kwargs['lang'])
@@ -75,26 +138,126 @@ class PageViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, url_path='(?P<slug>[-\w]+)', methods=['get'])
     def by_slug(self, request, slug=None, *args, **kwargs):
-        product = self.get_queryset().filter(slug=slug).first()
-        if product:
-            serializer = self.get_serializer(product)
-            return Response(serializer.data)
-        else:
+        response = self.catalog_detail(slug)
+        if response is None:
+            # Slugs are unique, so the lookup needs no ordering
+            response = self.fast_detail(self.get_base_queryset().filter(slug=slug).order_by())
+        if response is not None:
+            return response
+        try:
+            product = self.get_queryset().get(slug=slug)
+        except Page.DoesNotExist:
             return Response({"detail": "Not found."}, status=404)
+        serializer = self.get_serializer(product)
+        return Response(serializer.data)
 
-class ImageViewSet(viewsets.ReadOnlyModelViewSet):
+class ImageViewSet(SurrogateKeyViewMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Image.objects.all()
     serializer_class = ImageSerializer
+    surrogate_collection = 'images'
+    pagination_class = IdCursorPagination
 
-class HomePageViewSet(viewsets.ReadOnlyModelViewSet):
+class HomePageViewSet(SurrogateKeyViewMixin, DocumentReadMixin, FastReadMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = HomePageSerializer
+    fast_renderers = {'list': homepages}
+    document_kinds = {'list': 'homepage'}
+    surrogate_collection = 'homepages'
 
-    def get_queryset(self):
+    def get_base_queryset(self):
         queryset = HomePage.objects.all()
         if 'lang' in self.kwargs:
             queryset = queryset.filter(lang=self.kwargs['lang'])
         return queryset
 
-class SocialViewSet(viewsets.ReadOnlyModelViewSet):
+class SocialViewSet(SurrogateKeyViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Social.objects.all()
-    serializer_class = SocialSerializer
\ No newline at end of file
+    serializer_class = SocialSerializer
+    surrogate_collection = 'social'
+
+class SearchView(SurrogateKeyViewMixin, generics.GenericAPIView):
+    """Ranked full-text search across products and categories (and pages with ?type=page) in one call."""
+    serializer_class = SearchHitSerializer
+    pagination_class = SearchPagination
+    models = {'product': Product, 'category': Category, 'page': Page}
+    default_kinds = ['product', 'category']
+
+    def get_surrogate_keys(self):
+        return {collection_key('search', self.kwargs.get('lang') or self.request.query_params.get('lang'))}
+
+    def get(self, request, lang=None, *args, **kwargs):
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind in KIND_CODES] or self.default_kinds
+        hits = SearchHits(request.query_params.get('q', ''), kinds=kinds, lang=lang or request.query_params.get('lang'))
+        page = self.paginate_queryset(hits)
+        ids = {}
+        for hit in page:
+            ids.setdefault(hit['kind'], []).append(hit['object_id'])
+        # Hits keep their rank order, the rows need none
+        objects = {
+            (kind, obj.pk): obj
+            for kind, pks in ids.items()
+            for obj in self.models[kind].objects.select_related('image').filter(pk__in=pks).order_by()
+        }
+        page = [dict(hit, object=objects[hit['kind'], hit['object_id']]) for hit in page if (hit['kind'], hit['object_id']) in objects]
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+class SuggestView(SurrogateKeyViewMixin, APIView):
+    """Typeahead suggestions as {title, slug, type} records, answered from an in-memory prefix trie."""
+    def get_surrogate_keys(self):
+        return {collection_key('search', self.kwargs.get('lang'))}
+
+    def get(self, request, lang, *args, **kwargs):
+        if lang not in dict(settings.LANGUAGES):
+            raise NotFound()
+        try:
+            limit = max(0, min(int(request.query_params.get('limit', MAX_SUGGESTIONS)), MAX_SUGGESTIONS))
+        except ValueError:
+            limit = MAX_SUGGESTIONS
+        return Response(suggestions.suggest(lang, request.query_params.get('q', ''), limit))
+
+
+class BundleView(SurrogateKeyViewMixin, APIView):
+    """Menu, categories, social links and homepage of one language in a single response, see content/bundle.py."""
+    def get(self, request, lang, *args, **kwargs):
+        if lang not in dict(settings.LANGUAGES):
+            raise NotFound()
+        include = request.query_params.get('include')
+        parts = [name.strip() for name in include.split(',') if name.strip()] if include else list(BUNDLE_PARTS)
+        unknown = [name for name in parts if name not in BUNDLE_PARTS]
+        if unknown:
+            raise ValidationError({'include': [f'Unknown part "{name}", choose from {", ".join(BUNDLE_PARTS)}' for name in unknown]})
+        context = {'request': request, 'view': self, 'surrogate_keys': self.surrogate_keys}
+        return Response(build_bundle(lang, dict.fromkeys(parts), context))
+
+class BatchView(APIView):
+    """
+    POST {"paths": ["/api/en/products/", ...], "parallel": false} runs each GET route in-process
+    and returns [{path, status, headers, body}] in the same order, see content/batch.py.
+    """
+    def post(self, request, *args, **kwargs):
+        data = request.data
+        paths = data if isinstance(data, list) else data.get('paths')
+        if not isinstance(paths, list) or not paths:
+            raise ValidationError({'paths': ['Expected a non-empty list of paths.']})
+        if len(paths) > BATCH_MAX_REQUESTS:
+            raise ValidationError({'paths': [f'At most {BATCH_MAX_REQUESTS} paths per batch.']})
+        parallel = not isinstance(data, list) and bool(data.get('parallel'))
+        return Response(run_batch(request._request, paths, parallel=parallel))
+
+class TranslationsView(SurrogateKeyViewMixin, APIView):
+    """Every resolved translation link as {type: {lang: {slug: {lang: slug}}}}, see content/translations.py."""
+    def get_surrogate_keys(self):
+        return {collection_key('translations')}
+
+    def get(self, request, *args, **kwargs):
+        return Response(translation_map())
+
+class ObjectTranslationsView(SurrogateKeyViewMixin, APIView):
+    """{lang: slug} of one product, page or category in every language it exists in."""
+    def get_surrogate_keys(self):
+        return {collection_key('translations')}
+
+    def get(self, request, lang, kind, slug, *args, **kwargs):
+        translations = translations_of(kind, lang, slug) if kind in TRANSLATABLE else None
+        if translations is None:
+            raise NotFound()
+        return Response(translations)
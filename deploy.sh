@@ -74,7 +74,7 @@ update_frontend() {
 update_backend() {
     printf "Updating Backend on remote server\n"
     full_width_line '-'
-    run_on_remote "cd $SERVER_PATH && git pull && docker-compose -f docker-compose.prod.yml up --build -d backend && docker-compose exec backend python manage.py migrate && docker-compose exec backend python manage.py collectstatic --no-input"
+    run_on_remote "cd $SERVER_PATH && git pull && docker-compose -f docker-compose.prod.yml up --build -d backend && docker-compose exec backend python manage.py migrate && docker-compose exec backend python manage.py rebuild_documents && docker-compose exec backend python manage.py rebuild_translations && docker-compose exec backend python manage.py collectstatic --no-input && docker-compose exec backend python manage.py export_static_api --incremental"
     full_width_line '-'
     printf "Backend updated.\n"
 }
@@ -83,7 +83,7 @@ update_backend() {
 update_all() {
     printf "Updating Frontend and Backend on remote server\n"
     full_width_line '-'
-    run_on_remote "cd $SERVER_PATH && git pull && docker-compose -f docker-compose.prod.yml up --build -d && docker-compose exec backend python manage.py migrate && docker-compose exec backend python manage.py collectstatic --no-input"
+    run_on_remote "cd $SERVER_PATH && git pull && docker-compose -f docker-compose.prod.yml up --build -d && docker-compose exec backend python manage.py migrate && docker-compose exec backend python manage.py rebuild_documents && docker-compose exec backend python manage.py rebuild_translations && docker-compose exec backend python manage.py collectstatic --no-input && docker-compose exec backend python manage.py export_static_api --incremental"
     full_width_line '-'
     printf "Frontend and Backend updated.\n"
 }
@@ -0,0 +1,19 @@
+import { revalidatePath } from "next/cache";
+import { NextRequest, NextResponse } from "next/server";
+
+// Called by the backend when content changes, with the paths to rebuild.
+// `layout` is set when the menu or social links changed, which every page renders.
+export async function POST(request: NextRequest) {
+  if (!process.env.REVALIDATE_SECRET || request.headers.get("x-revalidate-secret") !== process.env.REVALIDATE_SECRET) {
+    return NextResponse.json({ message: "Invalid secret" }, { status: 401 });
+  }
+
+  const { paths = [], layout = false }: { paths?: string[]; layout?: boolean } = await request.json();
+  if (layout) {
+    revalidatePath("/", "layout");
+  }
+  for (const path of paths) {
+    revalidatePath(path);
+  }
+  return NextResponse.json({ revalidated: paths.length, layout, now: Date.now() });
+}
@@ -61,12 +61,13 @@ export default function LocaleSwitcher() {
       }
 
       if (type) {
-        const endpoint = `/api/${nextLocale}/${type}/${slug}`;
+        // {lang: slug} of the current page in every language, resolved by the backend on save
+        const endpoint = `/api/${nextLocale}/translations/${type}/${slug}/`;
 
         try {
-          const data = await fetchData(SERVER_IP, endpoint);
-          const langSlug = data.langslug;
-          setLangSlug(langSlug);
+          const translations = await fetchData(SERVER_IP, endpoint);
+          const otherLocale = Object.keys(translations).find((code) => code !== nextLocale);
+          setLangSlug(otherLocale ? translations[otherLocale] : "");
         } catch (error) {
           console.error("Error!:", error);
         }
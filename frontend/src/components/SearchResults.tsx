@@ -26,13 +26,23 @@ const SearchResults = () => {
     const filteredProducts = productsResponse.filter((product: Product) => product.lang === currentLocale);
     const filteredCategories = categoriesResponse.filter((category: Category) => category.lang === currentLocale);
   
-    setResults([...filteredProducts, ...filteredCategories].map(item => ({
-      title: item.title,
-      snippet: stripHtmlTags(item.pageinfo || item.content || item.categoryinfo),
-      type: item.pageinfo ? 'Product' : 'Category',
-      link: item.slug,
-      locale: item.lang
-    })));
+    // The product list returns cards, which carry pageinfo but not content
+    setResults([
+      ...filteredProducts.map((product: Product) => ({
+        title: product.title,
+        snippet: stripHtmlTags(product.pageinfo || ''),
+        type: 'Product',
+        link: product.slug,
+        locale: product.lang
+      })),
+      ...filteredCategories.map((category: Category) => ({
+        title: category.title,
+        snippet: stripHtmlTags(category.categoryinfo || category.content || ''),
+        type: 'Category',
+        link: category.slug,
+        locale: category.lang
+      })),
+    ]);
     setSearchPerformed(true);
   };
 
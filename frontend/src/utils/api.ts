@@ -4,11 +4,13 @@ export const SERVER_IP = process.env.NEXT_PUBLIC_SERVER!;
 export const API_URL = process.env.NEXT_PUBLIC_API!;
 export const API_PORT = process.env.API_PORT!;
 export const API_BASE_URL = process.env.API_BASE_URL!;
+// The backend revalidates changed paths on demand (see app/api/revalidate), so this is only a fallback
+export const REVALIDATE_SECONDS = Number(process.env.REVALIDATE_SECONDS ?? 3600);
 
 export const fetchData = async (baseUrl: string, endpoint: string) => {
   try {
     const response = await fetch(`${baseUrl}${endpoint}`, {
-      next: { revalidate: 3600 }
+      next: { revalidate: REVALIDATE_SECONDS }
     });
 
     if (!response.ok) {